@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import random
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional, Tuple, TypeVar
+
+from google.api_core import exceptions
+
+from metrics import gcs_operation
+from single_flight import SingleFlight
+from worker_pool import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Failures worth another attempt: throttling, server errors and network trouble
+TRANSIENT_ERRORS = (
+    exceptions.TooManyRequests,
+    exceptions.InternalServerError,
+    exceptions.BadGateway,
+    exceptions.ServiceUnavailable,
+    exceptions.GatewayTimeout,
+    ConnectionError,
+    TimeoutError,
+)
+
+@lru_cache()
+def transient_errors() -> Tuple[type, ...]:
+    """TRANSIENT_ERRORS plus the network errors of requests, which the google client raises"""
+    # Imported on the first failure rather than at startup; the google client has loaded it by then
+    import requests
+
+    return TRANSIENT_ERRORS + (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+# Extra time the await allows beyond the client's own timeout, so the client
+# normally gives up first and releases its worker thread
+DEADLINE_GRACE_SECONDS = 1.0
+
+class RetryPolicy(NamedTuple):
+    attempts: int = 3
+    base_delay: float = 0.1
+    max_delay: float = 2.0
+    timeout: Optional[float] = 10.0
+
+    def delay(self, attempt: int, rng: Callable[[], float] = random.random) -> float:
+        """Full-jitter exponential backoff before retry number ``attempt + 1``"""
+        return rng() * min(self.max_delay, self.base_delay * 2 ** attempt)
+
+def download_blob(blob, timeout: Optional[float] = None) -> bytes:
+    with gcs_operation("download"):
+        return blob.download_as_string(timeout=timeout) if timeout else blob.download_as_string()
+
+def blob_exists(blob, timeout: Optional[float] = None) -> bool:
+    with gcs_operation("exists"):
+        return blob.exists(timeout=timeout) if timeout else blob.exists()
+
+class AsyncStorage:
+    """
+    Awaitable GCS calls for request handlers.
+
+    The google client is blocking, so every call runs on the shared
+    WorkerPool and the event loop stays free to serve other requests while
+    it waits. Each attempt passes ``policy.timeout`` to the client as its
+    HTTP timeout and is also bounded on the awaiting side. Transient
+    failures are retried with jittered exponential backoff, so requests
+    retrying after a GCS hiccup do not all retry at the same moment.
+    Independent calls can be awaited together with ``asyncio.gather``.
+    Identical concurrent refreshes and downloads share one call through
+    ``flights``; blobs are keyed by name, as a worker reads a single bucket.
+    """
+
+    def __init__(
+        self,
+        pool: WorkerPool,
+        policy: RetryPolicy = RetryPolicy(),
+        sleep=asyncio.sleep,
+        rng: Callable[[], float] = random.random,
+        flights: Optional[SingleFlight] = None
+    ):
+        self.pool = pool
+        self.policy = policy
+        self.flights = flights or SingleFlight()
+        self._sleep = sleep
+        self._rng = rng
+
+    async def call(self, fn: Callable[..., T], *args) -> T:
+        """
+        Run ``fn(*args)`` on the pool with the retry policy. ``fn`` must be
+        safe to repeat. Only errors raised by ``fn`` are retried: an attempt
+        that outlives its deadline raises ``asyncio.TimeoutError`` at once,
+        as it may still hold its pool thread.
+        """
+        deadline = self.policy.timeout + DEADLINE_GRACE_SECONDS if self.policy.timeout else None
+        attempt = 0
+        while True:
+            task = asyncio.ensure_future(self.pool.run(fn, *args))
+            try:
+                finished, _ = await asyncio.wait({task}, timeout=deadline)
+            finally:
+                if not task.done():
+                    task.cancel()
+            if not finished:
+                raise asyncio.TimeoutError(f"{getattr(fn, '__name__', fn)} did not finish within {deadline}s")
+            try:
+                return task.result()
+            except Exception as e:
+                if not isinstance(e, transient_errors()):
+                    raise
+                attempt += 1
+                if attempt >= self.policy.attempts:
+                    raise
+                delay = self.policy.delay(attempt - 1, self._rng)
+                logger.warning(f"Retrying {getattr(fn, '__name__', fn)} in {delay:.2f}s after {type(e).__name__}: {e}")
+                await self._sleep(delay)
+
+    async def refresh(self, index, bucket, stale_seconds: float = 0, fresh_seconds: float = 0):
+        """
+        Refresh a BlobIndex or ImageCatalog, listing only new names. An index
+        refreshed less than ``fresh_seconds`` ago is used as it is; one
+        refreshed less than ``stale_seconds`` ago is used while one background
+        refresh brings it up to date.
+        """
+        await self.flights.do(
+            ("refresh", index),
+            lambda: self.call(index.refresh, bucket, self.policy.timeout),
+            stale_seconds,
+            fresh_seconds
+        )
+
+    async def download(self, blob) -> bytes:
+        return await self.flights.do(
+            ("download", blob.name),
+            lambda: self.call(download_blob, blob, self.policy.timeout)
+        )
+
+    async def exists(self, blob) -> bool:
+        return await self.flights.do(
+            ("exists", blob.name),
+            lambda: self.call(blob_exists, blob, self.policy.timeout)
+        )
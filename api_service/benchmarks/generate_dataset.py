@@ -0,0 +1,139 @@
+"""
+Generate a synthetic bucket for the local storage backend.
+
+Sensor readings are named ``sensor_data/%Y%m%d_%H%M%S.json`` as
+crates/monitor writes them and images ``images/capture_%Y%m%d_%H%M%S.jpg``
+as crates/camera writes them, under ``<root>/<bucket>/``. With
+``--archive`` every closed day of readings is written as a
+``sensor_archive/<day>.npy`` file, as compaction would, and only the last
+day stays as loose JSON, which keeps very large datasets to a manageable
+number of files.
+
+    python -m benchmarks.generate_dataset --root /tmp/selfhydro --readings 100000 --images 10000
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import numpy as np
+
+from models import from_epoch_us, to_epoch_us
+from sensor_archive import archive_name, encode_archive
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+def synthetic_readings(count: int, start: datetime, interval_seconds: int, seed: int = 0):
+    """Return timestamps (epoch microseconds) and an (n, 3) array of plausible daily-cycle readings"""
+    rng = np.random.default_rng(seed)
+    offsets = np.arange(count, dtype=np.int64) * interval_seconds * 1_000_000
+    timestamps = to_epoch_us(start) + offsets
+    day_phase = (offsets / 86_400_000_000) * 2 * math.pi
+    temperature = 22 + 4 * np.sin(day_phase) + rng.normal(0, 0.3, count)
+    humidity = 60 - 10 * np.sin(day_phase) + rng.normal(0, 1.0, count)
+    pressure = 1013 + rng.normal(0, 2.0, count)
+    return timestamps, np.column_stack((temperature, humidity, pressure))
+
+def synthetic_jpeg(width: int = 640, height: int = 480) -> bytes:
+    from PIL import Image
+
+    image = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+def _write(root: str, bucket: str, name: str, data: bytes):
+    path = os.path.join(root, bucket, *name.split("/"))
+    with open(path, "wb") as f:
+        f.write(data)
+
+def generate(
+    root: str,
+    bucket: str,
+    readings: int,
+    images: int,
+    start: datetime = DEFAULT_START,
+    reading_interval_seconds: int = 60,
+    image_interval_seconds: int = 1800,
+    archive: bool = False,
+    image_size: tuple = (640, 480),
+    seed: int = 0
+) -> dict:
+    """Write the dataset and return a summary of what was written"""
+    for prefix in ("sensor_data", "sensor_archive", "images"):
+        os.makedirs(os.path.join(root, bucket, prefix), exist_ok=True)
+
+    timestamps, values = synthetic_readings(readings, start, reading_interval_seconds, seed)
+    days = np.char.replace(np.datetime_as_string(timestamps.astype("datetime64[us]"), unit="D"), "-", "")
+    last_day: Optional[str] = days[-1] if readings else None
+
+    first_loose = int(np.searchsorted(days, last_day)) if archive and readings else 0
+    loose = archived_days = 0
+    for i in range(first_loose, readings):
+        timestamp = from_epoch_us(timestamps[i])
+        payload = {
+            "temperature": float(values[i, 0]),
+            "humidity": float(values[i, 1]),
+            "pressure": float(values[i, 2]),
+            "timestamp": timestamp.isoformat(),
+        }
+        _write(root, bucket, f"sensor_data/{timestamp.strftime('%Y%m%d_%H%M%S')}.json", json.dumps(payload).encode())
+        loose += 1
+
+    if archive and readings:
+        boundaries = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1], [True])))
+        for lo, hi in zip(boundaries[:-1], boundaries[1:]):
+            if days[lo] == last_day:
+                continue
+            _write(root, bucket, archive_name(days[lo], 0), encode_archive(timestamps[lo:hi], values[lo:hi]))
+            archived_days += 1
+
+    jpeg = synthetic_jpeg(*image_size) if images else b""
+    for i in range(images):
+        captured = start + timedelta(seconds=i * image_interval_seconds)
+        _write(root, bucket, f"images/capture_{captured.strftime('%Y%m%d_%H%M%S')}.jpg", jpeg)
+
+    summary = {
+        "bucket": bucket,
+        "readings": readings,
+        "loose_readings": loose,
+        "archived_days": archived_days,
+        "images": images,
+        "start": start.isoformat(),
+    }
+    logger.info(f"Generated dataset: {summary}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", required=True, help="Directory used as STORAGE_LOCAL_DIR")
+    parser.add_argument("--bucket", default="selfhydro-bench")
+    parser.add_argument("--readings", type=int, default=10_000)
+    parser.add_argument("--images", type=int, default=1_000)
+    parser.add_argument("--reading-interval", type=int, default=60, help="Seconds between sensor readings")
+    parser.add_argument("--image-interval", type=int, default=1800, help="Seconds between captures")
+    parser.add_argument("--archive", action="store_true", help="Write closed days as sensor_archive/ files")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    summary = generate(
+        args.root,
+        args.bucket,
+        args.readings,
+        args.images,
+        reading_interval_seconds=args.reading_interval,
+        image_interval_seconds=args.image_interval,
+        archive=args.archive,
+        seed=args.seed
+    )
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
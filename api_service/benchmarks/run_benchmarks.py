@@ -0,0 +1,161 @@
+"""
+Measure API latency and throughput against a local dataset.
+
+Requests go through the ASGI app in-process (httpx's ASGITransport) with
+the local storage backend, so results reflect the service itself rather
+than the network or GCS. For every endpoint and concurrency level the
+runner records the cold first-request latency, then latency percentiles
+and throughput over ``--requests`` calls, and can save the results as JSON
+and compare them with a previous run.
+
+    python -m benchmarks.generate_dataset --root /tmp/selfhydro --readings 100000 --images 10000 --archive
+    python -m benchmarks.run_benchmarks --root /tmp/selfhydro --output results.json
+    python -m benchmarks.run_benchmarks --root /tmp/selfhydro --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DEFAULT_ENDPOINTS = [
+    "/sensor/latest",
+    "/sensor/history?limit=100",
+    "/sensor/history?limit=5000",
+    "/sensor/aggregate?bucket=1h",
+    "/images?limit=24",
+]
+DEFAULT_CONCURRENCY = [1, 8, 32]
+
+def summarize(latencies_ms: List[float], errors: int, elapsed_s: float) -> dict:
+    latencies = np.array(latencies_ms) if latencies_ms else np.zeros(1)
+    return {
+        "requests": len(latencies_ms) + errors,
+        "errors": errors,
+        "throughput_rps": round((len(latencies_ms) + errors) / elapsed_s, 1) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p90_ms": round(float(np.percentile(latencies, 90)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "max_ms": round(float(latencies.max()), 3),
+    }
+
+async def measure(client, path: str, total: int, concurrency: int) -> dict:
+    """Issue ``total`` GETs of ``path`` from ``concurrency`` concurrent workers"""
+    latencies: List[float] = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await client.get(path)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if response.status_code == 200:
+                latencies.append(elapsed_ms)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+async def run(endpoints: List[str], concurrency_levels: List[int], total: int) -> Dict[str, dict]:
+    import httpx
+    from main import app
+
+    # Per-request access logs would dominate the output and the timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    results: Dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for path in endpoints:
+            started = time.perf_counter()
+            response = await client.get(path)
+            cold_ms = (time.perf_counter() - started) * 1000
+            if response.status_code != 200:
+                print(f"{path}: HTTP {response.status_code} {response.text[:200]}", file=sys.stderr)
+            results[path] = {"cold_ms": round(cold_ms, 3), "concurrency": {}}
+            for concurrency in concurrency_levels:
+                stats = await measure(client, path, total, concurrency)
+                results[path]["concurrency"][str(concurrency)] = stats
+                print(
+                    f"{path:40s} c={concurrency:<3d} p50={stats['p50_ms']:9.2f}ms p90={stats['p90_ms']:9.2f}ms "
+                    f"p99={stats['p99_ms']:9.2f}ms {stats['throughput_rps']:9.1f} req/s errors={stats['errors']}"
+                )
+    return results
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(current: dict, baseline: dict):
+    """Print p50/p99 changes per endpoint and concurrency level against a previous run"""
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for path, result in current["results"].items():
+        previous = baseline.get("results", {}).get(path)
+        if previous is None:
+            continue
+        for concurrency, stats in result["concurrency"].items():
+            before = previous["concurrency"].get(concurrency)
+            if before is None:
+                continue
+            changes = []
+            for key in ("p50_ms", "p99_ms", "throughput_rps"):
+                delta = (stats[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+                changes.append(f"{key} {before[key]:.2f} -> {stats[key]:.2f} ({delta:+.1f}%)")
+            print(f"{path:40s} c={concurrency:<3s} " + "  ".join(changes))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", required=True, help="Dataset directory from generate_dataset")
+    parser.add_argument("--bucket", default="selfhydro-bench")
+    parser.add_argument("--endpoint", action="append", dest="endpoints", help="Path to benchmark; repeatable")
+    parser.add_argument("--concurrency", type=int, action="append", help="Concurrency level; repeatable")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    args = parser.parse_args()
+
+    # The app reads its settings on first use, so the backend is chosen before importing it
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_DIR"] = args.root
+    os.environ["GCS_BUCKET"] = args.bucket
+    os.environ.setdefault("SENSOR_COMPACTION_INTERVAL_SECONDS", "0")
+
+    endpoints = args.endpoints or DEFAULT_ENDPOINTS
+    concurrency_levels = args.concurrency or DEFAULT_CONCURRENCY
+    results = asyncio.run(run(endpoints, concurrency_levels, args.requests))
+    report = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "bucket": args.bucket,
+        "requests_per_level": args.requests,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Measure worker start-up time against a local dataset.
+
+Each run starts a fresh interpreter, as a new worker would, and records how
+long importing the app takes, how long the lifespan warm-up takes until
+/ready reports ready, and the latency of the first request to each
+endpoint after that. Runs use the local storage backend, so the warm-up
+times cover listing the indexes but not GCS authentication.
+
+    python -m benchmarks.generate_dataset --root /tmp/selfhydro --readings 100000 --images 10000 --archive
+    python -m benchmarks.startup --root /tmp/selfhydro --runs 10 --output startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+DEFAULT_ENDPOINTS = ["/sensor/latest", "/sensor/history?limit=100", "/images?limit=24"]
+
+async def _start_worker(endpoints: List[str]) -> Dict[str, float]:
+    """Import the app, run its lifespan until ready and time the first request to each endpoint"""
+    started = time.perf_counter()
+    import main
+
+    timings = {"import_ms": (time.perf_counter() - started) * 1000}
+
+    import httpx
+
+    started = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        readiness = main.get_readiness()
+        while not readiness.ready:
+            await asyncio.sleep(0.001)
+        timings["ready_ms"] = (time.perf_counter() - started) * 1000
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for path in endpoints:
+                started = time.perf_counter()
+                response = await client.get(path)
+                timings[path] = (time.perf_counter() - started) * 1000
+                if response.status_code != 200:
+                    print(f"{path}: HTTP {response.status_code} {response.text[:200]}", file=sys.stderr)
+    return timings
+
+def run(endpoints: List[str], runs: int) -> Dict[str, dict]:
+    """Start ``runs`` workers one after another and summarize each timing across them"""
+    from benchmarks.run_benchmarks import summarize
+
+    samples: Dict[str, List[float]] = {}
+    for _ in range(runs):
+        started = time.perf_counter()
+        output = subprocess.check_output(
+            [sys.executable, "-m", "benchmarks.startup", "--child", json.dumps(endpoints)],
+            text=True
+        )
+        timings = json.loads(output.strip().splitlines()[-1])
+        timings["process_ms"] = (time.perf_counter() - started) * 1000
+        for name, value in timings.items():
+            samples.setdefault(name, []).append(value)
+
+    results = {}
+    for name, values in samples.items():
+        stats = summarize(values, 0, 0)
+        results[name] = {key: stats[key] for key in ("mean_ms", "p50_ms", "p90_ms", "max_ms")}
+        print(f"{name:40s} p50={stats['p50_ms']:9.2f}ms p90={stats['p90_ms']:9.2f}ms max={stats['max_ms']:9.2f}ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", help="Dataset directory from generate_dataset")
+    parser.add_argument("--bucket", default="selfhydro-bench")
+    parser.add_argument("--endpoint", action="append", dest="endpoints", help="Path to request once ready; repeatable")
+    parser.add_argument("--runs", type=int, default=5, help="Workers to start")
+    parser.add_argument("--no-warmup", action="store_true", help="Report ready at once and let the first requests warm up")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # The parent has set up the environment; print the timings as the last line
+        print(json.dumps(asyncio.run(_start_worker(json.loads(args.child)))))
+        return
+    if not args.root:
+        parser.error("--root is required")
+
+    # Inherited by every worker, which reads its settings on first use
+    os.environ["STORAGE_BACKEND"] = "local"
+    os.environ["STORAGE_LOCAL_DIR"] = args.root
+    os.environ["GCS_BUCKET"] = args.bucket
+    os.environ.setdefault("SENSOR_COMPACTION_INTERVAL_SECONDS", "0")
+    os.environ.setdefault("DERIVATIVE_PREGENERATION_INTERVAL_SECONDS", "0")
+    os.environ["WARMUP_ON_STARTUP"] = "false" if args.no_warmup else "true"
+
+    from benchmarks.run_benchmarks import git_commit
+
+    results = run(args.endpoints or DEFAULT_ENDPOINTS, args.runs)
+    report = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "bucket": args.bucket,
+        "runs": args.runs,
+        "warmup": not args.no_warmup,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.output}")
+
+if __name__ == "__main__":
+    main()
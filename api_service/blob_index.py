@@ -0,0 +1,165 @@
+import bisect
+import gzip
+import logging
+import os
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from metrics import gcs_operation
+
+logger = logging.getLogger(__name__)
+
+class BlobIndex:
+    """
+    Sorted index of blob names under a bucket prefix.
+
+    Both the monitor and camera crates name objects after their
+    ``%Y%m%d_%H%M%S`` timestamp, so name order is time order. The index is
+    kept incrementally by listing only the names after the last one seen
+    (``start_offset``), which makes the newest name O(1) and the newest
+    ``k`` names O(k). When ``snapshot_path`` is set the names are persisted
+    to a small gzip file so a restarted worker only lists what is new.
+
+    Names that can arrive sorting below the newest one, such as camera
+    captures named in local time after a DST fall-back, need ``relist_from``:
+    given the newest name it returns where each listing starts, so the
+    overlap is listed again and late names are added where they sort.
+    ``names_from`` returns names in the order they were added, so consumers
+    reading by position see late names too.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        prefix: str,
+        suffix: Optional[str] = None,
+        delimiter: Optional[str] = None,
+        snapshot_path: Optional[str] = None,
+        snapshot_interval_seconds: float = 60,
+        relist_from: Optional[Callable[[str], str]] = None
+    ):
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.suffix = suffix
+        self.delimiter = delimiter
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval_seconds = snapshot_interval_seconds
+        self.relist_from = relist_from
+        self._last_snapshot = 0.0
+        self._names: List[str] = []
+        # The same names in the order they were added, for names_from
+        self._added: List[str] = []
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        if snapshot_path:
+            self._load_snapshot()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            position = bisect.bisect_left(self._names, name)
+            return position < len(self._names) and self._names[position] == name
+
+    def _matches(self, name: str) -> bool:
+        return self.suffix is None or name.endswith(self.suffix)
+
+    def refresh(self, bucket, timeout: Optional[float] = None) -> int:
+        """
+        List blobs from the last indexed name, or from ``relist_from`` of it,
+        and add the ones not indexed yet. Returns the number of new names.
+        """
+        with self._refresh_lock:
+            last = self.latest()
+            kwargs = {"prefix": self.prefix}
+            if timeout:
+                kwargs["timeout"] = timeout
+            if self.delimiter:
+                kwargs["delimiter"] = self.delimiter
+            if last is not None:
+                kwargs["start_offset"] = self.relist_from(last) if self.relist_from else last
+            with gcs_operation("list"):
+                listed = [blob.name for blob in bucket.list_blobs(**kwargs) if self._matches(blob.name)]
+            return self.extend(listed)
+
+    def extend(self, names: Iterable[str]) -> int:
+        """Add the names not indexed yet. Returns the number added."""
+        with self._lock:
+            last = self._names[-1] if self._names else None
+            added = []
+            for name in sorted(set(names)):
+                if last is not None and name <= last:
+                    # A late name: insert it where it sorts unless it is already there
+                    position = bisect.bisect_left(self._names, name)
+                    if position < len(self._names) and self._names[position] == name:
+                        continue
+                    self._names.insert(position, name)
+                else:
+                    self._names.append(name)
+                    last = name
+                added.append(name)
+            self._added.extend(added)
+        if added and self.snapshot_path:
+            if time.monotonic() - self._last_snapshot >= self.snapshot_interval_seconds:
+                self.save_snapshot()
+        return len(added)
+
+    def latest(self) -> Optional[str]:
+        with self._lock:
+            return self._names[-1] if self._names else None
+
+    def newest(self, limit: int) -> List[str]:
+        """Return up to ``limit`` names, newest first"""
+        with self._lock:
+            return self._names[:-limit - 1:-1] if limit > 0 else []
+
+    def range(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """Return names in ``[start, end)`` in ascending order"""
+        with self._lock:
+            lo = bisect.bisect_left(self._names, start) if start is not None else 0
+            hi = bisect.bisect_left(self._names, end) if end is not None else len(self._names)
+            return self._names[lo:hi]
+
+    def names_from(self, position: int) -> List[str]:
+        """Return the names added after the first ``position`` ones, in the order they were added"""
+        with self._lock:
+            return self._added[position:]
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._names)
+
+    def _snapshot_header(self) -> str:
+        return f"{self.bucket_name}\t{self.prefix}\t{self.suffix or ''}"
+
+    def _load_snapshot(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                if f.readline().rstrip("\n") != self._snapshot_header():
+                    logger.warning(f"Ignoring index snapshot {self.snapshot_path} for a different bucket or prefix")
+                    return
+                names = [self.prefix + line.rstrip("\n") for line in f if line.strip()]
+            self._names = sorted(set(names))
+            self._added = list(self._names)
+        except (OSError, EOFError, UnicodeDecodeError) as e:
+            logger.warning(f"Failed to load index snapshot {self.snapshot_path}: {e}")
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        self._last_snapshot = time.monotonic()
+        names = self.names()
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(self._snapshot_header() + "\n")
+                for name in names:
+                    f.write(name[len(self.prefix):] + "\n")
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Failed to save index snapshot {self.snapshot_path}: {e}")
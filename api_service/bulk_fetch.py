@@ -0,0 +1,73 @@
+import contextvars
+import json
+import logging
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+from google.api_core.exceptions import NotFound
+
+from metrics import gcs_operation
+from models import SensorData, parse_sensor_data
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Failures that only affect a single blob and are skipped rather than raised
+SKIPPABLE_ERRORS = (json.JSONDecodeError, KeyError, ValueError, NotFound)
+
+def _download(bucket, blob_name: str, parse: Callable[[bytes], T]) -> T:
+    with gcs_operation("download"):
+        raw = bucket.blob(blob_name).download_as_string()
+    return parse(raw)
+
+def fetch_blobs(
+    bucket,
+    names: Iterable[str],
+    parse: Callable[[bytes], T],
+    max_in_flight: int = 16,
+    executor: Optional[Executor] = None
+) -> Iterator[Tuple[str, T]]:
+    """
+    Download and parse blobs concurrently, yielding ``(name, parsed)`` in the
+    order of ``names``.
+
+    At most ``max_in_flight`` downloads are outstanding at once, so memory
+    stays bounded however many names are passed. Blobs that are missing or
+    fail to parse are logged and skipped; any other error is raised.
+    """
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="bulk-fetch")
+    names = iter(names)
+    pending = deque(
+        (name, executor.submit(contextvars.copy_context().run, _download, bucket, name, parse))
+        for name in islice(names, max_in_flight)
+    )
+    try:
+        while pending:
+            name, future = pending.popleft()
+            for next_name in islice(names, 1):
+                pending.append((next_name, executor.submit(contextvars.copy_context().run, _download, bucket, next_name, parse)))
+            try:
+                result = future.result()
+            except SKIPPABLE_ERRORS as e:
+                logger.warning(f"Skipping blob {name}: {e}")
+                continue
+            yield name, result
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False)
+
+def fetch_sensor_data(
+    bucket,
+    names: Iterable[str],
+    max_in_flight: int = 16,
+    executor: Optional[Executor] = None
+) -> Iterator[Tuple[str, SensorData]]:
+    """Stream parsed sensor_data/ readings in key order"""
+    return fetch_blobs(bucket, names, parse_sensor_data, max_in_flight=max_in_flight, executor=executor)
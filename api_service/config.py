@@ -1,3 +1,5 @@
+import os
+import tempfile
 from typing import Optional
 from pydantic_settings import BaseSettings
 from functools import lru_cache
@@ -15,6 +17,85 @@ class Settings(BaseSettings):
     INFLUX_HOST: Optional[str] = None
     INFLUX_DB: Optional[str] = None
     INFLUX_TOKEN: Optional[str] = None
+    # Sensor queries go to InfluxDB when INFLUX_HOST and INFLUX_DB are set, falling back to GCS
+    INFLUX_MEASUREMENT: str = "environment"
+    INFLUX_TIMEOUT_SECONDS: float = 5.0
+    INFLUX_MAX_CONNECTIONS: int = 20
+    # How long to stay on GCS after a failed InfluxDB query before trying it again
+    INFLUX_RETRY_AFTER_SECONDS: int = 30
+
+    # Seconds before token expiry at which shared credentials are refreshed
+    CREDENTIALS_REFRESH_MARGIN_SECONDS: int = 300
+
+    # Object storage backend: "gcs", "local" (files under STORAGE_LOCAL_DIR) or "memory"
+    STORAGE_BACKEND: str = "gcs"
+    STORAGE_LOCAL_DIR: Optional[str] = None
+
+    # Service account key file used to sign URLs locally instead of via IAM signBlob
+    GCS_SIGNING_KEY_FILE: Optional[str] = None
+
+    # Directory for local blob index snapshots; unset keeps indexes in memory only
+    INDEX_SNAPSHOT_DIR: Optional[str] = None
+
+    # Directory for the hourly and daily sensor summary tile files; unset keeps tiles in memory only
+    SENSOR_TILE_DIR: Optional[str] = None
+
+    # Maximum concurrent blob downloads for bulk reads
+    BULK_FETCH_CONCURRENCY: int = 16
+
+    # How often closed days of sensor readings are rolled into sensor_archive/; 0 disables
+    SENSOR_COMPACTION_INTERVAL_SECONDS: int = 3600
+    # How long after a UTC day ends before it is compacted, so late uploads are still included
+    SENSOR_COMPACTION_GRACE_SECONDS: int = 21600
+
+    # Shared worker pool for blocking GCS calls; requests beyond the queue limit get a 503
+    WORKER_POOL_SIZE: int = 32
+    WORKER_POOL_MAX_QUEUE: int = 256
+
+    # Per-call timeout for handler GCS calls, and retries with jittered backoff on transient errors
+    GCS_CALL_TIMEOUT_SECONDS: float = 10.0
+    GCS_RETRY_ATTEMPTS: int = 3
+    GCS_RETRY_BASE_DELAY_SECONDS: float = 0.1
+    GCS_RETRY_MAX_DELAY_SECONDS: float = 2.0
+
+    # Concurrent identical GCS calls are shared. A listing younger than the fresh window is reused
+    # as is; up to the stale window it is served while one background refresh runs
+    # (stale-while-revalidate). 0 for both always waits for a new listing.
+    SENSOR_LATEST_FRESH_SECONDS: float = 0.5
+    SENSOR_LATEST_STALE_SECONDS: float = 1.0
+    SENSOR_HISTORY_FRESH_SECONDS: float = 2.0
+    SENSOR_HISTORY_STALE_SECONDS: float = 5.0
+    IMAGE_LIST_FRESH_SECONDS: float = 2.0
+    IMAGE_LIST_STALE_SECONDS: float = 5.0
+
+    # Authenticate and list the sensor and image indexes at startup before /ready reports ready,
+    # retrying every WARMUP_RETRY_SECONDS on failure; disabled, /ready is ready as soon as the app starts
+    WARMUP_ON_STARTUP: bool = True
+    WARMUP_RETRY_SECONDS: float = 5.0
+
+    # How often new captures get their resized derivatives rendered in the background; 0 disables
+    DERIVATIVE_PREGENERATION_INTERVAL_SECONDS: int = 60
+    # Processes used to render derivatives; unset uses every available core
+    DERIVATIVE_WORKER_PROCESSES: Optional[int] = None
+    # Only the gunicorn worker holding a lock on this file renders derivatives; unset renders in every worker
+    DERIVATIVE_LOCK_FILE: Optional[str] = os.path.join(tempfile.gettempdir(), "selfhydro-derivatives.lock")
+
+    # Live sensor stream: how often the shared poller checks for a new reading, and idle keepalive interval
+    SENSOR_STREAM_POLL_SECONDS: int = 15
+    SENSOR_STREAM_KEEPALIVE_SECONDS: int = 15
+
+    # Signed URL cache
+    SIGNED_URL_CACHE_SIZE: int = 4096
+    SIGNED_URL_MIN_TTL_SECONDS: int = 3600
+
+    # Serialized responses kept for repeated identical queries, and how long browsers may reuse an /images page
+    RESPONSE_CACHE_SIZE: int = 512
+    IMAGE_LIST_MAX_AGE_SECONDS: int = 60
+
+    # Opt-in sampling profiler: requests slower than this are written to PROFILE_OUTPUT_DIR as folded stacks; 0 disables
+    PROFILE_SLOW_REQUEST_MS: int = 0
+    PROFILE_SAMPLE_INTERVAL_MS: int = 5
+    PROFILE_OUTPUT_DIR: str = "profiles"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,219 @@
+import asyncio
+import fcntl
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import BrokenExecutor, Executor, ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from blob_index import BlobIndex
+from bulk_fetch import fetch_blobs
+from image_catalog import ImageCatalog
+from image_derivatives import DERIVATIVE_PREFIX, PRESETS, DerivativeCache, Variant, derivative_name, render_variants
+
+logger = logging.getLogger(__name__)
+
+class DerivativePregenerator:
+    """
+    Renders every preset derivative of new captures in the background.
+
+    Each pass refreshes the image catalog used by /images and an index of
+    each derivatives/<size>/ prefix, then renders the captures that are
+    missing a size, newest first, on a process pool. Only captures and
+    derivatives listed since the last pass are examined, along with those
+    still pending. Originals are downloaded and derivatives uploaded from
+    the calling thread; a capture whose download or upload fails stays
+    pending, and only one whose original cannot be decoded is given up on.
+
+    With ``lock_path``, only the worker holding an exclusive lock on that
+    file renders; the others keep their derivative cache up to date from
+    the listings. The lock is released when its holder exits, so another
+    worker takes over on its next pass.
+    """
+
+    def __init__(
+        self,
+        catalog: ImageCatalog,
+        derivative_cache: DerivativeCache,
+        variants: Sequence[Variant] = tuple(PRESETS.values()),
+        processes: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_in_flight: int = 8,
+        executor: Optional[Executor] = None,
+        lock_path: Optional[str] = None,
+        clock=time.monotonic
+    ):
+        self.catalog = catalog
+        self.derivative_cache = derivative_cache
+        self.variants = list(variants)
+        self.processes = processes or os.cpu_count() or 1
+        self.batch_size = batch_size or 2 * self.processes
+        self.max_in_flight = max_in_flight
+        self._executor = executor
+        self._clock = clock
+        self._indexes = [
+            BlobIndex(catalog.index.bucket_name, f"{DERIVATIVE_PREFIX}{variant.key}/", suffix=".jpg", delimiter="/")
+            for variant in self.variants
+        ]
+        self.lock_path = lock_path
+        self._lock_file = None
+        # How many names of the catalog index and of each derivative index earlier passes have examined
+        self._captures_seen = 0
+        self._derivatives_seen = [0] * len(self._indexes)
+        self._first_seen: Dict[str, float] = {}
+        self._failed = set()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._last_pass_seconds = 0.0
+        self._passes = 0
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            # Forking a process that runs threads can leave a lock held in the child forever
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    @property
+    def leader(self) -> bool:
+        """Whether this worker renders: it holds the lock, or there is none to take"""
+        if self.lock_path is None:
+            return True
+        if self._lock_file is None:
+            lock_file = open(self.lock_path, "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+            logger.info(f"Rendering image derivatives in this worker (pid {os.getpid()})")
+        return True
+
+    def _is_warm(self, blob_name: str) -> bool:
+        return all(
+            self.derivative_cache.is_known(derivative_name(blob_name, variant))
+            for variant in self.variants
+        )
+
+    def _refresh(self, bucket) -> List[str]:
+        """Refresh the catalog and derivative indexes, mark new derivatives as warm and return new captures"""
+        self.catalog.refresh(bucket)
+        for i, index in enumerate(self._indexes):
+            index.refresh(bucket)
+            names = index.names_from(self._derivatives_seen[i])
+            self._derivatives_seen[i] += len(names)
+            self.derivative_cache.mark(names)
+        captures = self.catalog.index.names_from(self._captures_seen)
+        self._captures_seen += len(captures)
+        return captures
+
+    def pending(self, bucket) -> List[str]:
+        """Refresh the indexes and return captures missing a derivative, newest first"""
+        captures = self._refresh(bucket)
+        now = self._clock()
+        pending = []
+        with self._lock:
+            # Capture names sort by capture time
+            for blob_name in sorted(set(captures).union(self._first_seen), reverse=True):
+                if blob_name in self._failed or self._is_warm(blob_name):
+                    self._first_seen.pop(blob_name, None)
+                    continue
+                self._first_seen.setdefault(blob_name, now)
+                pending.append(blob_name)
+        return pending
+
+    def run_once(self, bucket) -> int:
+        """Render derivatives for every capture that is missing one. Returns the number of captures rendered."""
+        started = self._clock()
+        if not self.leader:
+            self._refresh(bucket)
+            return 0
+        pending = self.pending(bucket)
+        rendered = 0
+        for offset in range(0, len(pending), self.batch_size):
+            if self._stop.is_set():
+                break
+            rendered += self._render_batch(bucket, pending[offset:offset + self.batch_size])
+        with self._lock:
+            self._passes += 1
+            self._last_pass_seconds = self._clock() - started
+        if rendered:
+            logger.info(f"Pre-generated derivatives for {rendered} images, {len(pending) - rendered} still pending")
+        return rendered
+
+    def _render_batch(self, bucket, blob_names: List[str]) -> int:
+        pool = self._pool()
+        futures = {
+            blob_name: pool.submit(render_variants, original, self.variants)
+            for blob_name, original in fetch_blobs(bucket, blob_names, bytes, max_in_flight=self.max_in_flight)
+        }
+        rendered = 0
+        for blob_name in blob_names:
+            future = futures.get(blob_name)
+            if future is None:
+                # Left pending, so the next pass downloads it again
+                logger.warning(f"Failed to download {blob_name} to pre-generate its derivatives")
+                continue
+            try:
+                data = future.result()
+            except BrokenExecutor as e:
+                logger.warning(f"Failed to pre-generate derivatives of {blob_name}: {e}")
+                continue
+            except Exception as e:
+                # Only an original that cannot be decoded is never tried again
+                logger.warning(f"Failed to decode {blob_name} to pre-generate its derivatives: {e}")
+                self.derivative_cache.mark_failed(blob_name)
+                with self._lock:
+                    self._failed.add(blob_name)
+                    self._first_seen.pop(blob_name, None)
+                continue
+            try:
+                names = [derivative_name(blob_name, variant) for variant in self.variants]
+                self.derivative_cache.store(bucket, names, data)
+            except Exception as e:
+                logger.warning(f"Failed to upload derivatives of {blob_name}: {e}")
+                continue
+            with self._lock:
+                self._processed += 1
+                self._first_seen.pop(blob_name, None)
+            rendered += 1
+        return rendered
+
+    def stats(self) -> dict:
+        """Progress (images rendered, backlog, failures) and lag (how long the oldest pending capture has waited)"""
+        now = self._clock()
+        with self._lock:
+            oldest = min(self._first_seen.values(), default=None)
+            return {
+                "processed": self._processed,
+                "backlog": len(self._first_seen),
+                "failed": len(self._failed),
+                "lag_seconds": now - oldest if oldest is not None else 0.0,
+                "last_pass_seconds": self._last_pass_seconds,
+                "passes": self._passes,
+                "processes": self.processes,
+                "leader": self._lock_file is not None or self.lock_path is None,
+            }
+
+    def stop(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+async def run_pregeneration(get_bucket, pregenerator: DerivativePregenerator, interval_seconds: float):
+    """Pre-generate derivatives every ``interval_seconds`` until cancelled"""
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, lambda: pregenerator.run_once(get_bucket()))
+        except Exception as e:
+            logger.error(f"Error pre-generating image derivatives: {e}")
+        await asyncio.sleep(interval_seconds)
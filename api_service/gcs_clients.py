@@ -0,0 +1,150 @@
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+from config import get_settings
+from metrics import gcs_operation
+
+if TYPE_CHECKING:
+    from google.cloud import storage
+
+logger = logging.getLogger(__name__)
+
+# google.auth and google.cloud.storage (with requests) take a few hundred
+# milliseconds to import, so they are loaded on first use rather than when
+# a worker boots; the lifespan warm-up pays for them before /ready passes.
+def _default_credentials():
+    from google import auth
+    return auth.default()
+
+class CredentialsManager:
+    """
+    Holds the process-wide Google credentials and keeps their access token fresh.
+
+    A daemon thread refreshes the token ``refresh_margin_seconds`` before it
+    expires, so request handlers always find a valid token without paying for
+    auth discovery or a token round-trip.
+    """
+
+    def __init__(
+        self,
+        refresh_margin_seconds: int = 300,
+        retry_seconds: int = 30,
+        credentials_factory: Optional[Callable[[], Tuple[object, Optional[str]]]] = None
+    ):
+        self.refresh_margin = timedelta(seconds=refresh_margin_seconds)
+        self.retry_seconds = retry_seconds
+        self._credentials_factory = credentials_factory or _default_credentials
+        self._credentials = None
+        self.project: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def credentials(self):
+        """Return credentials with a valid token, refreshing inline only if the background refresh fell behind"""
+        with self._lock:
+            if self._credentials is None:
+                with gcs_operation("auth_default"):
+                    self._credentials, self.project = self._credentials_factory()
+            if self._needs_refresh():
+                self._refresh()
+            return self._credentials
+
+    def _needs_refresh(self) -> bool:
+        expiry = getattr(self._credentials, "expiry", None)
+        if not getattr(self._credentials, "token", None):
+            return True
+        return expiry is not None and expiry - self.refresh_margin <= datetime.utcnow()
+
+    def _refresh(self):
+        import google.auth.transport.requests
+
+        with gcs_operation("credentials_refresh"):
+            self._credentials.refresh(google.auth.transport.requests.Request())
+
+    def _seconds_until_refresh(self) -> float:
+        expiry = getattr(self._credentials, "expiry", None)
+        if expiry is None:
+            return self.refresh_margin.total_seconds()
+        remaining = (expiry - self.refresh_margin - datetime.utcnow()).total_seconds()
+        return max(remaining, 1.0)
+
+    def start(self):
+        """Start the background refresh thread if it is not already running"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="credentials-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.credentials
+                wait = self._seconds_until_refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing GCS credentials: {e}")
+                wait = self.retry_seconds
+            if self._stop.wait(wait):
+                return
+            with self._lock:
+                try:
+                    self._refresh()
+                except Exception as e:
+                    logger.error(f"Error refreshing GCS credentials: {e}")
+
+_lock = threading.Lock()
+_pid: Optional[int] = None
+_credentials_manager: Optional[CredentialsManager] = None
+_storage_client: Optional["storage.Client"] = None
+
+def _reset_after_fork():
+    global _pid, _credentials_manager, _storage_client
+    if _pid != os.getpid():
+        _pid = os.getpid()
+        _credentials_manager = None
+        _storage_client = None
+
+def get_credentials_manager() -> CredentialsManager:
+    """Return this worker's credentials manager, starting its refresh thread on first use"""
+    global _credentials_manager
+    with _lock:
+        _reset_after_fork()
+        if _credentials_manager is None:
+            settings = get_settings()
+            _credentials_manager = CredentialsManager(
+                refresh_margin_seconds=settings.CREDENTIALS_REFRESH_MARGIN_SECONDS
+            )
+            _credentials_manager.start()
+        return _credentials_manager
+
+def get_shared_storage_client() -> "storage.Client":
+    """Return this worker's storage client, built once from the shared credentials"""
+    from google.cloud import storage
+
+    global _storage_client
+    manager = get_credentials_manager()
+    with _lock:
+        if _storage_client is None:
+            credentials = manager.credentials
+            _storage_client = storage.Client(credentials=credentials, project=manager.project)
+        return _storage_client
+
+def shutdown():
+    """Stop the refresh thread and drop the shared client"""
+    global _credentials_manager, _storage_client
+    with _lock:
+        if _credentials_manager is not None:
+            _credentials_manager.stop()
+        _credentials_manager = None
+        _storage_client = None
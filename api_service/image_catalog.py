@@ -0,0 +1,119 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from blob_index import BlobIndex
+from models import from_epoch_us, to_epoch_us
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PREFIX = "images/"
+CAPTURE_PREFIX = "capture_"
+CAPTURE_TIME_FORMAT = "%Y%m%d_%H%M%S"
+# The camera names captures in local time, so after a DST fall-back new names sort up to an hour
+# below the newest one until the clock catches up
+CAPTURE_CLOCK_OVERLAP = timedelta(hours=1)
+
+def parse_capture_time(blob_name: str) -> datetime:
+    """Parse the capture time from an images/capture_%Y%m%d_%H%M%S.jpg name written by crates/camera"""
+    name = blob_name.split('/')[-1]
+    timestamp_str = name.split(CAPTURE_PREFIX)[1].split('.jpg')[0]
+    return datetime.strptime(timestamp_str, CAPTURE_TIME_FORMAT)
+
+def capture_relist_start(blob_name: str) -> str:
+    """Where to list images/ from so captures named up to CAPTURE_CLOCK_OVERLAP before ``blob_name`` are seen"""
+    try:
+        start = parse_capture_time(blob_name) - CAPTURE_CLOCK_OVERLAP
+    except (IndexError, ValueError):
+        return blob_name
+    return f"{blob_name.rsplit('/', 1)[0]}/{CAPTURE_PREFIX}{start.strftime(CAPTURE_TIME_FORMAT)}"
+
+class ImageCatalog:
+    """
+    Captured images with their timestamps parsed once.
+
+    Names come from a BlobIndex over images/, so refreshing only lists new
+    captures. Timestamps are kept in a sorted int64 array of epoch
+    microseconds alongside the names, so time queries are binary searches.
+    Capture times are camera-local and are returned as naive datetimes.
+    """
+
+    def __init__(self, index: BlobIndex):
+        self.index = index
+        self._names: List[str] = []
+        self._timestamps = np.empty(0, dtype=np.int64)
+        self._consumed = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def refresh(self, bucket, timeout: Optional[float] = None) -> int:
+        """Pick up new captures from the bucket. Returns the number added."""
+        self.index.refresh(bucket, timeout)
+        return self.sync()
+
+    def sync(self) -> int:
+        """Parse the names the index has gained since the last sync"""
+        with self._lock:
+            names = self.index.names_from(self._consumed)
+            self._consumed += len(names)
+            parsed = []
+            for blob_name in names:
+                try:
+                    parsed.append((blob_name, to_epoch_us(parse_capture_time(blob_name))))
+                except (IndexError, ValueError) as e:
+                    logger.warning(f"Failed to parse timestamp for image {blob_name}: {e}")
+            if not parsed:
+                return 0
+            timestamps = np.array([timestamp for _, timestamp in parsed], dtype=np.int64)
+            self._names.extend(blob_name for blob_name, _ in parsed)
+            self._timestamps = np.concatenate((self._timestamps, timestamps))
+            if np.any(np.diff(self._timestamps[-len(parsed) - 1:]) < 0):
+                order = np.argsort(self._timestamps, kind="stable")
+                self._timestamps = self._timestamps[order]
+                self._names = [self._names[i] for i in order]
+            return len(parsed)
+
+    def _entry(self, i: int) -> Tuple[str, datetime]:
+        return self._names[i], from_epoch_us(self._timestamps[i]).replace(tzinfo=None)
+
+    def _search(self, timestamp: Optional[datetime], side: str, default: int) -> int:
+        if timestamp is None:
+            return default
+        return int(np.searchsorted(self._timestamps, to_epoch_us(timestamp), side=side))
+
+    def query(
+        self,
+        before: Optional[datetime] = None,
+        after: Optional[datetime] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[str, datetime]]:
+        """Return ``(blob_name, timestamp)`` for captures strictly between ``after`` and ``before``, newest first"""
+        with self._lock:
+            lo = self._search(after, "right", 0)
+            hi = self._search(before, "left", len(self._names))
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            return [self._entry(i) for i in range(hi - 1, lo - 1, -1)]
+
+    def between(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Tuple[str, datetime]]:
+        """Return captures with ``start <= timestamp < end``, oldest first"""
+        with self._lock:
+            lo = self._search(start, "left", 0)
+            hi = self._search(end, "left", len(self._names))
+            return [self._entry(i) for i in range(lo, hi)]
+
+    def nearest(self, timestamp: datetime) -> Optional[Tuple[str, datetime]]:
+        """Return the capture closest in time to ``timestamp``"""
+        with self._lock:
+            if not self._names:
+                return None
+            target = to_epoch_us(timestamp)
+            position = int(np.searchsorted(self._timestamps, target))
+            candidates = [i for i in (position - 1, position) if 0 <= i < len(self._names)]
+            best = min(candidates, key=lambda i: abs(int(self._timestamps[i]) - target))
+            return self._entry(best)
@@ -0,0 +1,154 @@
+import io
+import logging
+import threading
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from google.api_core.exceptions import PreconditionFailed
+
+from metrics import gcs_operation
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_PREFIX = "derivatives/"
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class Variant(NamedTuple):
+    width: Optional[int]
+    height: Optional[int]
+    quality: int
+
+    @property
+    def key(self) -> str:
+        parts = []
+        if self.width:
+            parts.append(f"w{self.width}")
+        if self.height:
+            parts.append(f"h{self.height}")
+        parts.append(f"q{self.quality}")
+        return "_".join(parts)
+
+# Sizes exposed by /images/{image_name}/urls, largest first
+PRESETS: Dict[str, Variant] = {
+    "large": Variant(1280, None, 85),
+    "medium": Variant(640, None, 80),
+    "small": Variant(320, None, 75),
+    "thumbnail": Variant(128, None, 60),
+}
+
+# Custom sizes and qualities are rounded up to these, so clients can only ever create a few
+# derivatives of each image under derivatives/
+CUSTOM_SIZES = (64, 128, 256, 320, 480, 640, 800, 1024, 1280, 1600, 2048)
+CUSTOM_QUALITIES = (60, 75, 85, 95)
+
+def _round_up(value: int, steps: Sequence[int]) -> int:
+    return next((step for step in steps if step >= value), steps[-1])
+
+def custom_variant(width: Optional[int], height: Optional[int], quality: int) -> Variant:
+    """The stored variant for a requested size: each dimension and the quality rounded up to the next step"""
+    return Variant(
+        _round_up(width, CUSTOM_SIZES) if width else None,
+        _round_up(height, CUSTOM_SIZES) if height else None,
+        _round_up(quality, CUSTOM_QUALITIES)
+    )
+
+def derivative_name(blob_name: str, variant: Variant) -> str:
+    """``images/capture_x.jpg`` -> ``derivatives/w128_q60/capture_x.jpg``"""
+    return f"{DERIVATIVE_PREFIX}{variant.key}/{blob_name.split('/')[-1]}"
+
+def resize_jpeg(data: bytes, variant: Variant) -> bytes:
+    """
+    Downscale a JPEG to fit ``variant.width`` x ``variant.height`` (either may
+    be unset) and re-encode it at ``variant.quality``. Draft mode lets the
+    decoder produce a 1/2, 1/4 or 1/8 scale image directly, so most of the
+    full-resolution decode is skipped. Images are never upscaled.
+    """
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(data))
+    target = (variant.width or image.width, variant.height or image.height)
+    if image.format == "JPEG":
+        # Draft picks the smallest DCT scale that is still at least the target size
+        scale = min(target[0] / image.width, target[1] / image.height)
+        image.draft("RGB", (max(1, int(image.width * scale)), max(1, int(image.height * scale))))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail(target, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=variant.quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+def render_variants(original: bytes, variants: Sequence[Variant]) -> List[bytes]:
+    """Resize one original into every variant. Module level so it can run in a process pool."""
+    return [resize_jpeg(original, variant) for variant in variants]
+
+class DerivativeCache:
+    """
+    Creates resized copies of captures under derivatives/ on first use.
+
+    Derivative names are deterministic, so once a derivative exists it is
+    only ever signed. Names known to exist are remembered per worker to
+    skip the existence check on later requests, and originals that could not
+    be decoded are remembered so they are not downloaded again.
+    """
+
+    def __init__(self):
+        self._known = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def is_known(self, name: str) -> bool:
+        return name in self._known
+
+    def has_failed(self, blob_name: str) -> bool:
+        return blob_name in self._failed
+
+    def mark_failed(self, blob_name: str):
+        with self._lock:
+            self._failed.add(blob_name)
+
+    def mark(self, names: Sequence[str]):
+        with self._lock:
+            self._known.update(names)
+
+    def ensure(self, bucket, blob_name: str, variants: Sequence[Variant]) -> List[str]:
+        """
+        Return the derivative names for ``variants`` of ``blob_name``, creating
+        the missing ones. The original is downloaded at most once per call; if
+        it cannot be decoded it is marked failed and the error re-raised.
+        """
+        names = [derivative_name(blob_name, variant) for variant in variants]
+        missing = [
+            (name, variant) for name, variant in zip(names, variants)
+            if not self.is_known(name) and not self._exists(bucket, name)
+        ]
+        if missing:
+            with gcs_operation("download"):
+                original = bucket.blob(blob_name).download_as_bytes()
+            missing_names, missing_variants = zip(*missing)
+            try:
+                rendered = render_variants(original, missing_variants)
+            except Exception:
+                self.mark_failed(blob_name)
+                raise
+            self.store(bucket, missing_names, rendered)
+            logger.info(f"Created {len(missing)} derivatives of {blob_name}")
+        self.mark(names)
+        return names
+
+    def _exists(self, bucket, name: str) -> bool:
+        with gcs_operation("exists"):
+            return bucket.blob(name).exists()
+
+    def store(self, bucket, names: Sequence[str], rendered: Sequence[bytes]):
+        """Upload rendered derivatives and remember that they exist"""
+        for name, data in zip(names, rendered):
+            blob = bucket.blob(name)
+            blob.cache_control = DERIVATIVE_CACHE_CONTROL
+            try:
+                with gcs_operation("upload"):
+                    blob.upload_from_string(data, content_type="image/jpeg", if_generation_match=0)
+            except PreconditionFailed:
+                # Another worker created it first; derivatives are deterministic so either copy will do
+                pass
+        self.mark(names)
@@ -0,0 +1,355 @@
+"""
+Local storage backends for load testing and offline development.
+
+``LocalStorageClient`` mirrors the part of the ``google.cloud.storage``
+client the service uses: ``client.bucket(name)``, ``bucket.list_blobs``
+(with ``prefix``, ``delimiter``, ``start_offset`` and ``end_offset``),
+``bucket.blob(name)`` and, on blobs, ranged downloads, metadata,
+conditional uploads and ``generate_signed_url``. Handlers, ``BlobIndex``
+and ``bulk_fetch`` therefore run unchanged against it.
+
+Objects live in an ``ObjectStore``: ``MemoryStore`` keeps them in a dict,
+``DirectoryStore`` maps ``bucket/name`` onto files under a root directory
+so a synthetic ``sensor_data/`` and ``images/`` tree can be generated once
+and reused.
+"""
+import bisect
+import mimetypes
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Union
+from urllib.parse import quote, urlencode
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+class ObjectStat(NamedTuple):
+    size: int
+    updated: datetime
+    generation: int
+    content_type: Optional[str]
+
+def _check_generation(current: Optional[ObjectStat], if_generation_match: Optional[int], name: str):
+    if if_generation_match is None:
+        return
+    current_generation = current.generation if current is not None else 0
+    if current_generation != if_generation_match:
+        raise PreconditionFailed(f"Generation mismatch for {name}")
+
+class MemoryStore:
+    """Objects held in memory, with names kept sorted per bucket for fast listing"""
+
+    def __init__(self):
+        self._objects: Dict[str, Dict[str, bytes]] = {}
+        self._stats: Dict[str, Dict[str, ObjectStat]] = {}
+        self._names: Dict[str, List[str]] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def names(self, bucket: str, start: str = "", end: Optional[str] = None) -> List[str]:
+        with self._lock:
+            names = self._names.get(bucket, [])
+            lo = bisect.bisect_left(names, start)
+            hi = bisect.bisect_left(names, end) if end is not None else len(names)
+            return names[lo:hi]
+
+    def stat(self, bucket: str, name: str) -> Optional[ObjectStat]:
+        return self._stats.get(bucket, {}).get(name)
+
+    def read(self, bucket: str, name: str) -> bytes:
+        try:
+            return self._objects[bucket][name]
+        except KeyError:
+            raise NotFound(f"{bucket}/{name}")
+
+    def write(
+        self,
+        bucket: str,
+        name: str,
+        data: bytes,
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ):
+        with self._lock:
+            _check_generation(self.stat(bucket, name), if_generation_match, name)
+            objects = self._objects.setdefault(bucket, {})
+            if name not in objects:
+                bisect.insort(self._names.setdefault(bucket, []), name)
+            objects[name] = data
+            self._generation += 1
+            self._stats.setdefault(bucket, {})[name] = ObjectStat(
+                len(data), datetime.now(timezone.utc), self._generation, content_type
+            )
+
+class DirectoryStore:
+    """
+    Objects stored as files under ``root/<bucket>/<name>``.
+
+    Sorted listings are cached per directory and reused until the
+    directory's modification time changes or the store writes to it, so
+    repeated incremental listings of a large flat prefix do not rescan it.
+    Files starting with ``.`` are ignored.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._listings: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, bucket: str, name: str) -> str:
+        return os.path.join(self.root, bucket, *name.split("/"))
+
+    def _directory_names(self, bucket: str, directory: str) -> List[str]:
+        """Sorted object names directly inside ``directory`` (a prefix ending in / or empty)"""
+        path = self._path(bucket, directory.rstrip("/")) if directory else os.path.join(self.root, bucket)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        key = os.path.join(bucket, directory)
+        with self._lock:
+            cached = self._listings.get(key)
+            if cached is not None and cached[0] == mtime:
+                return cached[1]
+        with os.scandir(path) as entries:
+            names = sorted(
+                f"{directory}{entry.name}" for entry in entries
+                if entry.is_file() and not entry.name.startswith(".")
+            )
+        with self._lock:
+            self._listings[key] = (mtime, names)
+        return names
+
+    def _subdirectories(self, bucket: str, directory: str) -> List[str]:
+        path = self._path(bucket, directory.rstrip("/")) if directory else os.path.join(self.root, bucket)
+        try:
+            with os.scandir(path) as entries:
+                return sorted(f"{directory}{entry.name}/" for entry in entries if entry.is_dir())
+        except FileNotFoundError:
+            return []
+
+    def names(self, bucket: str, start: str = "", end: Optional[str] = None, directory: Optional[str] = None) -> List[str]:
+        """Sorted names from ``start`` up to ``end``; only those directly in ``directory`` when it is given"""
+        if directory is not None:
+            names = self._directory_names(bucket, directory)
+        else:
+            names = []
+            pending = [""]
+            while pending:
+                current = pending.pop()
+                names.extend(self._directory_names(bucket, current))
+                pending.extend(self._subdirectories(bucket, current))
+            names.sort()
+        lo = bisect.bisect_left(names, start)
+        hi = bisect.bisect_left(names, end) if end is not None else len(names)
+        return names[lo:hi]
+
+    def stat(self, bucket: str, name: str) -> Optional[ObjectStat]:
+        try:
+            st = os.stat(self._path(bucket, name))
+        except FileNotFoundError:
+            return None
+        return ObjectStat(
+            st.st_size,
+            datetime.fromtimestamp(st.st_mtime, timezone.utc),
+            st.st_mtime_ns,
+            mimetypes.guess_type(name)[0]
+        )
+
+    def read(self, bucket: str, name: str) -> bytes:
+        try:
+            with open(self._path(bucket, name), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, IsADirectoryError):
+            raise NotFound(f"{bucket}/{name}")
+
+    def read_range(self, bucket: str, name: str, start: int, length: Optional[int]) -> bytes:
+        try:
+            with open(self._path(bucket, name), "rb") as f:
+                f.seek(start)
+                return f.read() if length is None else f.read(length)
+        except (FileNotFoundError, IsADirectoryError):
+            raise NotFound(f"{bucket}/{name}")
+
+    def write(
+        self,
+        bucket: str,
+        name: str,
+        data: bytes,
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None
+    ):
+        path = self._path(bucket, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if if_generation_match == 0:
+                # Exclusive create is the atomic equivalent of GCS's "only if absent"
+                try:
+                    with open(path, "xb") as f:
+                        f.write(data)
+                except FileExistsError:
+                    raise PreconditionFailed(f"Generation mismatch for {name}")
+                return
+            _check_generation(self.stat(bucket, name), if_generation_match, name)
+            tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            with self._lock:
+                self._listings.pop(os.path.join(bucket, name[:name.rfind("/") + 1]), None)
+
+ObjectStore = Union[MemoryStore, DirectoryStore]
+
+class LocalBlob:
+    """Stand-in for ``google.cloud.storage.Blob`` backed by an ObjectStore"""
+
+    def __init__(self, bucket: "LocalBucket", name: str):
+        self.bucket = bucket
+        self.name = name
+        self._stat: Optional[ObjectStat] = None
+
+    def _metadata(self) -> ObjectStat:
+        if self._stat is None:
+            self.reload()
+        return self._stat
+
+    @property
+    def size(self) -> int:
+        return self._metadata().size
+
+    @property
+    def updated(self) -> datetime:
+        return self._metadata().updated
+
+    @property
+    def generation(self) -> int:
+        return self._metadata().generation
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self._metadata().content_type
+
+    def reload(self, **kwargs):
+        stat = self.bucket.store.stat(self.bucket.name, self.name)
+        if stat is None:
+            raise NotFound(f"{self.bucket.name}/{self.name}")
+        self._stat = stat
+
+    def exists(self, **kwargs) -> bool:
+        return self.bucket.store.stat(self.bucket.name, self.name) is not None
+
+    def download_as_bytes(self, start: Optional[int] = None, end: Optional[int] = None, **kwargs) -> bytes:
+        """Download the object, or bytes ``start`` to ``end`` inclusive like GCS ranged reads"""
+        store = self.bucket.store
+        if start is None and end is None:
+            return store.read(self.bucket.name, self.name)
+        start = start or 0
+        length = None if end is None else max(end - start + 1, 0)
+        if isinstance(store, DirectoryStore):
+            return store.read_range(self.bucket.name, self.name, start, length)
+        data = store.read(self.bucket.name, self.name)
+        return data[start:] if length is None else data[start:start + length]
+
+    download_as_string = download_as_bytes
+
+    def upload_from_string(
+        self,
+        data: Union[bytes, str],
+        content_type: Optional[str] = None,
+        if_generation_match: Optional[int] = None,
+        **kwargs
+    ):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self.bucket.store.write(self.bucket.name, self.name, data, content_type, if_generation_match)
+        self._stat = None
+
+    def generate_signed_url(
+        self,
+        expiration: Union[datetime, timedelta, None] = None,
+        method: str = "GET",
+        query_parameters: Optional[dict] = None,
+        **kwargs
+    ) -> str:
+        """
+        Return a URL under the client's ``base_url`` carrying the query
+        parameters and an ``Expires`` epoch. Nothing is signed: the URL is only
+        meant for local load tests.
+        """
+        if isinstance(expiration, timedelta):
+            expires_at = time.time() + expiration.total_seconds()
+        elif isinstance(expiration, datetime):
+            if expiration.tzinfo is None:
+                expiration = expiration.replace(tzinfo=timezone.utc)
+            expires_at = expiration.timestamp()
+        else:
+            expires_at = time.time() + 3600
+        parameters = dict(query_parameters or {})
+        parameters["Expires"] = str(int(expires_at))
+        return f"{self.bucket.client.base_url}/{self.bucket.name}/{quote(self.name)}?{urlencode(sorted(parameters.items()))}"
+
+class LocalBucket:
+    """Stand-in for ``google.cloud.storage.Bucket`` backed by an ObjectStore"""
+
+    def __init__(self, client: "LocalStorageClient", name: str):
+        self.client = client
+        self.name = name
+
+    @property
+    def store(self) -> ObjectStore:
+        return self.client.store
+
+    def blob(self, blob_name: str, **kwargs) -> LocalBlob:
+        return LocalBlob(self, blob_name)
+
+    def get_blob(self, blob_name: str, **kwargs) -> Optional[LocalBlob]:
+        blob = LocalBlob(self, blob_name)
+        return blob if blob.exists() else None
+
+    def list_blobs(
+        self,
+        prefix: Optional[str] = None,
+        delimiter: Optional[str] = None,
+        start_offset: Optional[str] = None,
+        end_offset: Optional[str] = None,
+        max_results: Optional[int] = None,
+        **kwargs
+    ) -> Iterator[LocalBlob]:
+        """List blobs in name order. With ``delimiter="/"`` only objects directly under ``prefix`` are listed."""
+        prefix = prefix or ""
+        start = max(prefix, start_offset or "")
+        if isinstance(self.store, DirectoryStore) and delimiter == "/":
+            directory = prefix[:prefix.rfind("/") + 1]
+            names = self.store.names(self.name, start, end_offset, directory=directory)
+        else:
+            names = self.store.names(self.name, start, end_offset)
+        count = 0
+        for name in names:
+            if not name.startswith(prefix):
+                break
+            if delimiter and delimiter in name[len(prefix):]:
+                continue
+            yield LocalBlob(self, name)
+            count += 1
+            if max_results is not None and count >= max_results:
+                return
+
+class LocalStorageClient:
+    """Stand-in for ``google.cloud.storage.Client`` over a MemoryStore or DirectoryStore"""
+
+    def __init__(self, store: ObjectStore, base_url: str = "http://localhost:8000/local-storage"):
+        self.store = store
+        self.base_url = base_url.rstrip("/")
+
+    @classmethod
+    def in_memory(cls, **kwargs) -> "LocalStorageClient":
+        return cls(MemoryStore(), **kwargs)
+
+    @classmethod
+    def from_directory(cls, root: str, **kwargs) -> "LocalStorageClient":
+        return cls(DirectoryStore(root), **kwargs)
+
+    def bucket(self, bucket_name: str) -> LocalBucket:
+        return LocalBucket(self, bucket_name)
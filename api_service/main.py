@@ -1,18 +1,50 @@
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from fastapi import FastAPI, HTTPException, Query, Depends
+import os
+import time
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import TypeAdapter
+from concurrent.futures import Future
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional
-from google.cloud import storage
-from google import auth
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence, Tuple, TypeVar
 import logging
-from dateutil import parser
-import json
-from urllib.parse import urlencode
+from functools import lru_cache
 
 from config import Settings, get_settings
+from models import (
+    ImageData, ImageUrlBatch, ImageUrlsRequest, SensorAggregate, SensorData, SensorStats, TimelapseData,
+    from_epoch_us, parse_sensor_data, to_epoch_us
+)
+from signed_url_cache import SignedUrlCache
+from gcs_clients import get_credentials_manager, get_shared_storage_client
+from url_signer import LocalUrlSigner, SignRequest
+from blob_index import BlobIndex
+from sensor_store import FIELDS, SensorSeries, to_sensor_data
+from sensor_archive import ARCHIVE_PREFIX, ARCHIVE_SUFFIX, relist_start, run_compaction
+from sensor_aggregate import aggregate, lttb, parse_bucket_width
+from sensor_tiles import SensorTiles
+from image_catalog import IMAGE_PREFIX, ImageCatalog, capture_relist_start
+from worker_pool import PoolSaturated, WorkerPool
+from async_storage import AsyncStorage, RetryPolicy
+from single_flight import SingleFlight
+from local_storage import LocalStorageClient
+from image_derivatives import PRESETS, DerivativeCache, Variant, custom_variant, derivative_name
+from derivative_worker import DerivativePregenerator, run_pregeneration
+from timelapse import SheetTooLarge, TimelapseRenderer, max_frames, timelapse_key
+from sensor_export import EXPORT_FORMATS, encode_rows, export_sources, iter_readings
+from sensor_stream import SensorBroadcaster, poll_latest, sse_events
+from response_cache import ResponseCache, http_date, is_not_modified, make_etag
+from sensor_influx import InfluxSensorBackend, InfluxUnavailable
+from metrics import (
+    CONTENT_TYPE, GCS_CALLS_PER_REQUEST, REGISTRY, REQUEST_SECONDS, family, gcs_operation, start_request_tally
+)
+from profiler import SamplingProfiler
+from warmup import Readiness, Step, run_warmup
+
+if TYPE_CHECKING:
+    from google.cloud import storage
 
 # Configure logging
 logging.basicConfig(
@@ -21,7 +53,58 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="SelfHydro API")
+SENSOR_PREFIX = "sensor_data/"
+MAX_AGGREGATE_BUCKETS = 10000
+# Sheets of default-width frames fit timelapse.MAX_SHEET_PIXELS up to about this many frames
+MAX_TIMELAPSE_FRAMES = 300
+# How often a streaming response that has already started checks for a free worker
+STREAM_WORKER_WAIT_SECONDS = 0.05
+
+T = TypeVar("T")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    background_tasks = []
+    if settings.SENSOR_COMPACTION_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_compaction(
+            lambda: get_storage_client().bucket(settings.GCS_BUCKET),
+            get_sensor_index(),
+            get_archive_index(),
+            settings.SENSOR_COMPACTION_INTERVAL_SECONDS,
+            grace_seconds=settings.SENSOR_COMPACTION_GRACE_SECONDS,
+            max_in_flight=settings.BULK_FETCH_CONCURRENCY
+        )))
+    if settings.DERIVATIVE_PREGENERATION_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_pregeneration(
+            lambda: get_storage_client().bucket(settings.GCS_BUCKET),
+            get_derivative_pregenerator(),
+            settings.DERIVATIVE_PREGENERATION_INTERVAL_SECONDS
+        )))
+    if settings.WARMUP_ON_STARTUP:
+        background_tasks.append(asyncio.create_task(run_warmup(
+            warmup_steps(settings), get_readiness(), settings.WARMUP_RETRY_SECONDS
+        )))
+    else:
+        get_readiness().mark_ready()
+    yield
+    for task in background_tasks:
+        task.cancel()
+    get_derivative_pregenerator().stop()
+    get_sensor_index().save_snapshot()
+    get_archive_index().save_snapshot()
+    get_image_catalog().index.save_snapshot()
+    get_worker_pool().shutdown(wait=False)
+    get_worker_pool.cache_clear()
+    get_async_storage.cache_clear()
+    get_single_flight.cache_clear()
+    get_readiness.cache_clear()
+    influx = get_influx_backend()
+    if influx is not None:
+        await influx.close()
+    get_influx_backend.cache_clear()
+
+app = FastAPI(title="SelfHydro API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -30,23 +113,372 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cross-origin scripts can only read response headers listed here
+    expose_headers=["X-Next-Cursor"],
 )
 
-# Models
-class SensorData(BaseModel):
-    temperature: float
-    humidity: float
-    pressure: float
-    timestamp: datetime
+@lru_cache()
+def get_profiler() -> Optional[SamplingProfiler]:
+    """Return the sampling profiler for slow requests, or None unless PROFILE_SLOW_REQUEST_MS is set"""
+    settings = get_settings()
+    if settings.PROFILE_SLOW_REQUEST_MS <= 0:
+        return None
+    return SamplingProfiler(
+        settings.PROFILE_OUTPUT_DIR,
+        slow_seconds=settings.PROFILE_SLOW_REQUEST_MS / 1000,
+        interval_seconds=settings.PROFILE_SAMPLE_INTERVAL_MS / 1000
+    )
 
-class ImageData(BaseModel):
-    id: str
-    url: str
-    thumbnail_url: str
-    timestamp: datetime
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time each request by route, record how many GCS operations it made and profile it if enabled"""
+    tally = start_request_tally()
+    profiler = get_profiler()
+    recording = profiler.begin() if profiler is not None else None
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        REQUEST_SECONDS.observe(elapsed, method=request.method, route=path, status=status)
+        GCS_CALLS_PER_REQUEST.observe(tally.total(), route=path)
+        if recording is not None:
+            profiler.end(recording, f"{request.method} {path}", elapsed)
 
 def get_storage_client():
-    return storage.Client()
+    if get_settings().STORAGE_BACKEND == "gcs":
+        return get_shared_storage_client()
+    return get_local_storage_client()
+
+@lru_cache()
+def get_local_storage_client() -> LocalStorageClient:
+    """Return the local stand-in for GCS used for load testing and offline development"""
+    settings = get_settings()
+    if settings.STORAGE_BACKEND == "local":
+        if not settings.STORAGE_LOCAL_DIR:
+            raise ValueError("STORAGE_LOCAL_DIR must be set for the local storage backend")
+        return LocalStorageClient.from_directory(settings.STORAGE_LOCAL_DIR)
+    if settings.STORAGE_BACKEND == "memory":
+        return LocalStorageClient.in_memory()
+    raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+
+def _snapshot_path(settings: Settings, name: str) -> Optional[str]:
+    if not settings.INDEX_SNAPSHOT_DIR:
+        return None
+    return os.path.join(settings.INDEX_SNAPSHOT_DIR, f"{name}.idx.gz")
+
+@lru_cache()
+def get_sensor_index() -> BlobIndex:
+    """Return the worker's index of sensor_data/ blob names"""
+    settings = get_settings()
+    return BlobIndex(
+        settings.GCS_BUCKET,
+        SENSOR_PREFIX,
+        suffix=".json",
+        delimiter="/",
+        snapshot_path=_snapshot_path(settings, "sensor_data"),
+        # Readings uploaded late sort below the newest name; list the grace period again to pick them up
+        relist_from=lambda newest: relist_start(newest, settings.SENSOR_COMPACTION_GRACE_SECONDS)
+    )
+
+@lru_cache()
+def get_archive_index() -> BlobIndex:
+    """Return the worker's index of per-day sensor_archive/ files"""
+    settings = get_settings()
+    return BlobIndex(
+        settings.GCS_BUCKET,
+        ARCHIVE_PREFIX,
+        suffix=ARCHIVE_SUFFIX,
+        delimiter="/",
+        snapshot_path=_snapshot_path(settings, "sensor_archive")
+    )
+
+@lru_cache()
+def get_influx_backend() -> Optional[InfluxSensorBackend]:
+    """Return the InfluxDB sensor backend, or None when INFLUX_HOST and INFLUX_DB are not both set"""
+    settings = get_settings()
+    if not settings.INFLUX_HOST or not settings.INFLUX_DB:
+        return None
+    return InfluxSensorBackend(
+        settings.INFLUX_HOST,
+        settings.INFLUX_DB,
+        token=settings.INFLUX_TOKEN,
+        measurement=settings.INFLUX_MEASUREMENT,
+        timeout_seconds=settings.INFLUX_TIMEOUT_SECONDS,
+        max_connections=settings.INFLUX_MAX_CONNECTIONS,
+        retry_after_seconds=settings.INFLUX_RETRY_AFTER_SECONDS
+    )
+
+async def query_influx(influx: Optional[InfluxSensorBackend], query):
+    """
+    Run ``query(influx)``, or return None when InfluxDB is not configured,
+    is failing, answers with something unexpected or has no data, so the
+    caller falls back to GCS.
+    """
+    if influx is None or not influx.available:
+        return None
+    try:
+        return await query(influx)
+    except InfluxUnavailable as e:
+        logger.warning(f"InfluxDB query failed, falling back to GCS: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected InfluxDB response, falling back to GCS: {e!r}")
+        return None
+
+@lru_cache()
+def get_sensor_series() -> SensorSeries:
+    """Return the worker's columnar store of sensor readings"""
+    return SensorSeries()
+
+@lru_cache()
+def get_sensor_tiles() -> SensorTiles:
+    """Return the worker's hourly and daily sensor summary tiles, mapped from SENSOR_TILE_DIR"""
+    settings = get_settings()
+    return SensorTiles(settings.SENSOR_TILE_DIR, grace_seconds=settings.SENSOR_COMPACTION_GRACE_SECONDS)
+
+@lru_cache()
+def get_image_catalog() -> ImageCatalog:
+    """Return the worker's catalog of captured images"""
+    settings = get_settings()
+    return ImageCatalog(BlobIndex(
+        settings.GCS_BUCKET,
+        IMAGE_PREFIX,
+        suffix=".jpg",
+        delimiter="/",
+        snapshot_path=_snapshot_path(settings, "images"),
+        relist_from=capture_relist_start
+    ))
+
+@lru_cache()
+def get_worker_pool() -> WorkerPool:
+    """Return the thread pool shared by all requests for blocking GCS work"""
+    settings = get_settings()
+    return WorkerPool(max_workers=settings.WORKER_POOL_SIZE, max_queue=settings.WORKER_POOL_MAX_QUEUE)
+
+async def run_blocking(fn, *args):
+    """Run blocking work on the shared worker pool, shedding load with a 503 when it is saturated"""
+    try:
+        return await get_worker_pool().run(fn, *args)
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+@lru_cache()
+def get_async_storage() -> AsyncStorage:
+    """Return the awaitable GCS layer handlers use for listing and downloads"""
+    settings = get_settings()
+    return AsyncStorage(get_worker_pool(), RetryPolicy(
+        attempts=settings.GCS_RETRY_ATTEMPTS,
+        base_delay=settings.GCS_RETRY_BASE_DELAY_SECONDS,
+        max_delay=settings.GCS_RETRY_MAX_DELAY_SECONDS,
+        timeout=settings.GCS_CALL_TIMEOUT_SECONDS
+    ), flights=get_single_flight())
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    """Return the worker's registry of in-flight GCS calls and response builds shared by identical requests"""
+    return SingleFlight()
+
+@lru_cache()
+def get_readiness() -> Readiness:
+    """Return whether this worker has warmed up, as reported by /ready"""
+    return Readiness()
+
+def warmup_steps(settings: Settings) -> List[Step]:
+    """Authenticate, list every index requests read and load sensor history, so the first requests find them warm"""
+    storage_io = get_async_storage()
+
+    async def authenticate():
+        # The google client is imported and the first token fetched on a worker thread, off the event loop
+        await run_blocking(get_storage_client)
+
+    async def list_indexes():
+        bucket = get_storage_client().bucket(settings.GCS_BUCKET)
+        await asyncio.gather(
+            refresh_sensor_indexes(bucket, get_sensor_index(), get_archive_index(), storage_io, settings),
+            storage_io.refresh(
+                get_image_catalog(), bucket, settings.IMAGE_LIST_STALE_SECONDS, settings.IMAGE_LIST_FRESH_SECONDS
+            )
+        )
+
+    async def load_sensor_series():
+        bucket = get_storage_client().bucket(settings.GCS_BUCKET)
+        await sync_sensor_series(
+            bucket, get_sensor_index(), get_archive_index(), get_sensor_series(), storage_io, settings
+        )
+
+    async def map_tiles():
+        await run_blocking(get_sensor_tiles)
+
+    return [
+        ("authenticate", authenticate),
+        ("indexes", list_indexes),
+        ("sensor_series", load_sensor_series),
+        ("sensor_tiles", map_tiles)
+    ]
+
+async def storage_call(operation: Awaitable[T]) -> T:
+    """Await an AsyncStorage call, shedding load with a 503 when the pool is saturated and a 504 on timeout"""
+    try:
+        return await operation
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Storage request timed out")
+
+@lru_cache()
+def get_derivative_cache() -> DerivativeCache:
+    return DerivativeCache()
+
+@lru_cache()
+def get_derivative_pregenerator() -> DerivativePregenerator:
+    """Return the background renderer that keeps derivatives of new captures warm"""
+    return DerivativePregenerator(
+        get_image_catalog(),
+        get_derivative_cache(),
+        processes=get_settings().DERIVATIVE_WORKER_PROCESSES,
+        lock_path=get_settings().DERIVATIVE_LOCK_FILE or None
+    )
+
+@lru_cache()
+def get_timelapse_renderer() -> TimelapseRenderer:
+    return TimelapseRenderer(get_derivative_cache(), max_in_flight=get_settings().BULK_FETCH_CONCURRENCY)
+
+@lru_cache()
+def get_sensor_broadcaster() -> SensorBroadcaster:
+    """Return the worker's single watcher for new sensor readings, shared by every /sensor/stream client"""
+    settings = get_settings()
+
+    async def poll(previous: Optional[str]):
+        bucket = get_storage_client().bucket(settings.GCS_BUCKET)
+        return await run_blocking(poll_latest, bucket, get_sensor_index(), previous)
+
+    return SensorBroadcaster(poll, interval_seconds=settings.SENSOR_STREAM_POLL_SECONDS)
+
+async def stream_blocking(iterator) -> AsyncIterator:
+    """
+    Drive a blocking iterator from the shared worker pool, one item per task.
+    The first item is fetched before the stream is returned, so a saturated
+    pool is still answered with a 503; once the response has started, later
+    items wait for a free worker rather than cutting the stream short.
+    """
+    pool = get_worker_pool()
+    done = object()
+    in_flight: List[Future] = []
+
+    async def pull(wait_for_worker: bool):
+        while True:
+            try:
+                future = pool.submit(next, iterator, done)
+                break
+            except PoolSaturated:
+                if not wait_for_worker:
+                    raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+                await asyncio.sleep(STREAM_WORKER_WAIT_SECONDS)
+        in_flight[:] = [future]
+        return await asyncio.wrap_future(future)
+
+    def close():
+        close_iterator = getattr(iterator, "close", None)
+        if close_iterator is None:
+            return
+        if in_flight and not in_flight[0].done():
+            # The client went away while next() runs on a pool thread; close the iterator there once it returns
+            in_flight[0].add_done_callback(lambda _: close_iterator())
+        else:
+            close_iterator()
+
+    try:
+        first = await pull(wait_for_worker=False)
+    except BaseException:
+        close()
+        raise
+
+    async def items():
+        try:
+            item = first
+            while item is not done:
+                yield item
+                item = await pull(wait_for_worker=True)
+        finally:
+            close()
+
+    return items()
+
+@lru_cache()
+def get_signed_url_cache() -> SignedUrlCache:
+    settings = get_settings()
+    return SignedUrlCache(
+        max_entries=settings.SIGNED_URL_CACHE_SIZE,
+        min_ttl_seconds=settings.SIGNED_URL_MIN_TTL_SECONDS
+    )
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    return ResponseCache(max_entries=get_settings().RESPONSE_CACHE_SIZE)
+
+@lru_cache()
+def _type_adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+async def conditional_json(
+    request: Request,
+    response_model,
+    validator: Hashable,
+    cache_control: str,
+    build: Callable[[], Awaitable[Tuple[object, Dict[str, str]]]]
+) -> Response:
+    """
+    Answer a GET whose body depends only on its query and on ``validator``.
+    Clients that already hold the current ETag get a 304 and repeated
+    queries are served from the response cache; ``build`` returning the
+    content and any extra headers runs only when neither applies, and once
+    for all identical requests that arrive while it is running.
+    """
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    etag = make_etag(key, validator)
+    cache = get_response_cache()
+    entry = cache.get(key, etag)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if entry is not None:
+        headers["Last-Modified"] = http_date(entry.last_modified)
+    if is_not_modified(request.headers, etag, entry.last_modified if entry is not None else None):
+        return Response(status_code=304, headers=headers)
+    if entry is None:
+        async def build_entry():
+            content, extra_headers = await build()
+            return cache.put(key, etag, _type_adapter(response_model).dump_json(content), extra_headers)
+
+        entry = await get_single_flight().do(("response", key, etag), build_entry)
+        headers["Last-Modified"] = http_date(entry.last_modified)
+    return Response(entry.body, media_type="application/json", headers={**entry.headers, **headers})
+
+@lru_cache()
+def get_url_signer() -> Optional[LocalUrlSigner]:
+    """Return the local URL signer when a signing key is configured"""
+    settings = get_settings()
+    if not settings.GCS_SIGNING_KEY_FILE:
+        return None
+    return LocalUrlSigner.from_service_account_file(settings.GCS_SIGNING_KEY_FILE)
+
+def _transformation_parameters(
+    width: Optional[int],
+    height: Optional[int],
+    quality: Optional[int]
+) -> dict:
+    query_parameters = {}
+    if width:
+        query_parameters['w'] = str(width)
+    if height:
+        query_parameters['h'] = str(height)
+    if quality:
+        query_parameters['q'] = str(quality)
+    return query_parameters
 
 def generate_signed_url(
     bucket_name: str, 
@@ -57,24 +489,40 @@ def generate_signed_url(
     expiration_hours: int = 24
 ) -> str:
     """
-    Generate a signed URL for GCS blob with optional image transformations
+    Generate a signed URL for GCS blob with optional image transformations.
+    URLs are served from the signed URL cache until they get close to expiring.
     """
+    cache_key = (bucket_name, blob_name, width, height, quality)
+    return get_signed_url_cache().get_or_sign(
+        cache_key,
+        expiration_hours * 3600,
+        lambda: _sign_url(bucket_name, blob_name, width, height, quality, expiration_hours)
+    )
+
+@gcs_operation("sign")
+def _sign_url(
+    bucket_name: str,
+    blob_name: str,
+    width: Optional[int],
+    height: Optional[int],
+    quality: Optional[int],
+    expiration_hours: int
+) -> str:
     try:
-        credentials, project = auth.default()
-        credentials.refresh(auth.transport.requests.Request())
-        storage_client = storage.Client(credentials=credentials)
+        query_parameters = _transformation_parameters(width, height, quality)
+        if get_settings().STORAGE_BACKEND != "gcs":
+            blob = get_local_storage_client().bucket(bucket_name).blob(blob_name)
+            return blob.generate_signed_url(expiration=timedelta(hours=expiration_hours), query_parameters=query_parameters)
+
+        signer = get_url_signer()
+        if signer is not None:
+            return signer.sign(bucket_name, blob_name, timedelta(hours=expiration_hours), query_parameters)
+
+        credentials = get_credentials_manager().credentials
+        storage_client = get_shared_storage_client()
         bucket = storage_client.bucket(bucket_name)
         blob = bucket.blob(blob_name)
 
-        # Build query parameters for transformations
-        query_parameters = {}
-        if width:
-            query_parameters['w'] = str(width)
-        if height:
-            query_parameters['h'] = str(height)
-        if quality:
-            query_parameters['q'] = str(quality)
-
         # Generate signed URL with transformation parameters included
         url = blob.generate_signed_url(
             version="v4",
@@ -91,115 +539,321 @@ def generate_signed_url(
         logger.error(f"Error generating signed URL for {blob_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate image URL")
 
+def generate_signed_urls(
+    bucket_name: str,
+    variants: Sequence[Tuple[str, Optional[int], Optional[int], Optional[int]]],
+    expiration_hours: int = 24
+) -> List[str]:
+    """
+    Generate signed URLs for many (blob_name, width, height, quality) variants.
+    Cache misses are signed in one batch by the local signer when it is configured.
+    """
+    keys = [(bucket_name, blob_name, width, height, quality) for blob_name, width, height, quality in variants]
+    return get_signed_url_cache().get_many_or_sign(
+        keys,
+        expiration_hours * 3600,
+        lambda missing: _sign_urls(missing, expiration_hours)
+    )
+
+def _sign_urls(keys: List[tuple], expiration_hours: int) -> List[str]:
+    signer = get_url_signer()
+    if signer is None or get_settings().STORAGE_BACKEND != "gcs":
+        return [_sign_url(*key, expiration_hours) for key in keys]
+    try:
+        requests = [
+            SignRequest(bucket_name, blob_name, _transformation_parameters(width, height, quality))
+            for bucket_name, blob_name, width, height, quality in keys
+        ]
+        with gcs_operation("sign"):
+            return signer.sign_many(requests, timedelta(hours=expiration_hours))
+    except Exception as e:
+        logger.error(f"Error generating signed URLs for {len(keys)} blobs: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate image URL")
+
+def collect_runtime_metrics():
+    """Worker pool, background renderer, cache and live stream state, read from their stats() at scrape time"""
+    pool = get_worker_pool().stats()
+    pregeneration = get_derivative_pregenerator().stats()
+    signed_urls = get_signed_url_cache().stats()
+    responses = get_response_cache().stats()
+    flights = get_single_flight().stats()
+    tiles = get_sensor_tiles().stats()
+    return [
+        family("selfhydro_worker_pool_threads", "gauge", "Threads in the shared GCS worker pool", pool["max_workers"]),
+        family("selfhydro_worker_pool_active", "gauge", "Worker pool threads currently running work", pool["active"]),
+        family("selfhydro_worker_pool_queued", "gauge", "Work waiting for a worker pool thread", pool["queued"]),
+        family("selfhydro_worker_pool_peak_queued", "gauge", "Deepest the worker pool queue has been", pool["peak_queued"]),
+        family("selfhydro_worker_pool_saturation", "gauge", "Active worker pool threads / pool size", pool["saturation"]),
+        family("selfhydro_worker_pool_completed_total", "counter", "Work finished by the worker pool", pool["completed"]),
+        family("selfhydro_worker_pool_rejected_total", "counter", "Work refused with a 503 because the queue was full", pool["rejected"]),
+        family("selfhydro_derivatives_processed_total", "counter", "Captures whose derivatives were pre-generated", pregeneration["processed"]),
+        family("selfhydro_derivatives_backlog", "gauge", "Captures still missing a derivative", pregeneration["backlog"]),
+        family("selfhydro_derivatives_failed", "gauge", "Captures whose derivatives could not be rendered", pregeneration["failed"]),
+        family("selfhydro_derivatives_lag_seconds", "gauge", "How long the oldest pending capture has waited", pregeneration["lag_seconds"]),
+        family("selfhydro_derivatives_last_pass_seconds", "gauge", "Duration of the last pre-generation pass", pregeneration["last_pass_seconds"]),
+        family("selfhydro_derivatives_leader", "gauge", "1 if this worker renders derivatives for the host", int(pregeneration["leader"])),
+        family("selfhydro_signed_url_cache_hits_total", "counter", "Signed URLs served from cache", signed_urls["hits"]),
+        family("selfhydro_signed_url_cache_misses_total", "counter", "Signed URLs that had to be signed", signed_urls["misses"]),
+        family("selfhydro_signed_url_cache_size", "gauge", "Signed URLs cached", signed_urls["size"]),
+        family("selfhydro_response_cache_hits_total", "counter", "Responses served from the response cache", responses["hits"]),
+        family("selfhydro_response_cache_misses_total", "counter", "Responses that had to be built", responses["misses"]),
+        family("selfhydro_single_flight_in_flight", "gauge", "Shared GCS calls and response builds running", flights["in_flight"]),
+        family("selfhydro_single_flight_coalesced_total", "counter", "Callers that joined a call already in flight", flights["coalesced"]),
+        family("selfhydro_single_flight_stale_total", "counter", "Listings served stale while revalidating", flights["stale_served"]),
+        family("selfhydro_single_flight_fresh_total", "counter", "Listings reused without a call", flights["fresh_served"]),
+        family("selfhydro_sensor_tiles_hour", "gauge", "Closed hourly sensor summary tiles", tiles["hour_tiles"]),
+        family("selfhydro_sensor_tiles_day", "gauge", "Closed daily sensor summary tiles", tiles["day_tiles"]),
+        family("selfhydro_sensor_tiles_watermark_seconds", "gauge", "End of the last closed tile of every width", tiles["watermark"] / 1e6),
+        family("selfhydro_ready", "gauge", "1 once this worker has finished warming up", int(get_readiness().ready)),
+        family("selfhydro_sensor_stream_subscribers", "gauge", "Clients connected to /sensor/stream", get_sensor_broadcaster().subscribers),
+    ]
+
+REGISTRY.register_collector(collect_runtime_metrics)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics for this worker"""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/ready", include_in_schema=False)
+async def ready():
+    """Readiness probe: 200 once this worker has authenticated and loaded its indexes, 503 until then"""
+    readiness = get_readiness()
+    return JSONResponse(readiness.stats(), status_code=200 if readiness.ready else 503)
+
 @app.get("/sensor/latest", response_model=SensorData)
 async def get_latest_sensor_data(
-    storage_client: storage.Client = Depends(get_storage_client),
+    request: Request,
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    sensor_index: BlobIndex = Depends(get_sensor_index),
+    influx: Optional[InfluxSensorBackend] = Depends(get_influx_backend),
+    storage_io: AsyncStorage = Depends(get_async_storage),
     settings: Settings = Depends(get_settings)
 ):
-    """Fetch the latest sensor data from Google Cloud Storage"""
+    """
+    Fetch the latest sensor data from InfluxDB, or from Google Cloud Storage
+    when it is unavailable. The ETag follows the newest reading, so
+    revalidating against GCS only lists new blobs.
+    """
     try:
+        latest = await query_influx(influx, lambda backend: backend.latest())
+        if latest is not None:
+            latest_us, reading = latest
+
+            async def build_from_influx():
+                return reading, {}
+
+            return await conditional_json(request, SensorData, ("influx", latest_us), "no-cache", build_from_influx)
+
         bucket = storage_client.bucket(settings.GCS_BUCKET)
-        blobs = list(bucket.list_blobs(prefix="sensor_data/", delimiter="/"))
+        await storage_call(storage_io.refresh(
+            sensor_index, bucket, settings.SENSOR_LATEST_STALE_SECONDS, settings.SENSOR_LATEST_FRESH_SECONDS
+        ))
+        latest_name = sensor_index.latest()
         
-        if not blobs:
+        if latest_name is None:
             raise HTTPException(status_code=404, detail="No sensor data found")
-            
-        blobs.sort(key=lambda x: x.name, reverse=True)
-        latest_blob = blobs[0]
-        
-        data = json.loads(latest_blob.download_as_string())
-        
-        return SensorData(
-            temperature=data["temperature"],
-            humidity=data["humidity"],
-            pressure=data["pressure"],
-            timestamp=parser.parse(data["timestamp"])
-        )
+
+        async def build():
+            raw = await storage_call(storage_io.download(bucket.blob(latest_name)))
+            return parse_sensor_data(raw), {}
+
+        return await conditional_json(request, SensorData, latest_name, "no-cache", build)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching sensor data from GCS: {e}")
         raise HTTPException(status_code=503, detail="Failed to fetch sensor data")
 
+@app.get("/sensor/stream")
+async def stream_sensor_data(
+    broadcaster: SensorBroadcaster = Depends(get_sensor_broadcaster),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Push new sensor readings as server-sent events. Every client shares one
+    poller per worker, so GCS load does not grow with the number of viewers.
+    """
+    return StreamingResponse(
+        sse_events(broadcaster, keepalive_seconds=settings.SENSOR_STREAM_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/images", response_model=List[ImageData])
 async def list_images(
+    request: Request,
     limit: Optional[int] = Query(24, ge=1, le=100),
-    storage_client: storage.Client = Depends(get_storage_client),
+    before: Optional[datetime] = None,
+    after: Optional[datetime] = None,
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    image_catalog: ImageCatalog = Depends(get_image_catalog),
+    storage_io: AsyncStorage = Depends(get_async_storage),
     settings: Settings = Depends(get_settings)
 ):
+    """
+    List captured images newest first. Pass the timestamp of the last image
+    as ``before`` to fetch the next page; ``after`` bounds the oldest capture.
+    """
     try:
         bucket = storage_client.bucket(settings.GCS_BUCKET)
-        blobs = bucket.list_blobs(prefix="images/")
-        jpg_blobs = [blob for blob in blobs if blob.name.endswith('.jpg')]
-        
-        jpg_blobs.sort(key=lambda x: x.name, reverse=True)
-        
-        latest_blobs = jpg_blobs[:limit]
-        
-        def process_blob(blob):
-            try:
-                name = blob.name.split('/')[-1]
-                timestamp_str = name.split('capture_')[1].split('.jpg')[0]
-                timestamp = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                
-                full_url = generate_signed_url(settings.GCS_BUCKET, blob.name, width=1280, quality=85)
-                thumbnail_url = generate_signed_url(settings.GCS_BUCKET, blob.name, width=128, quality=60)
-                
-                return ImageData(id=name, url=full_url, thumbnail_url=thumbnail_url, timestamp=timestamp)
-            except (IndexError, ValueError) as e:
-                logger.warning(f"Failed to parse timestamp for image {blob.name}: {e}")
-                return None
-        
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor(max_workers=min(32, len(latest_blobs))) as executor:
-            tasks = [loop.run_in_executor(executor, process_blob, blob) for blob in latest_blobs]
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        images = [result for result in results if isinstance(result, ImageData)]
-        return images
-        
+        await storage_call(storage_io.refresh(
+            image_catalog, bucket, settings.IMAGE_LIST_STALE_SECONDS, settings.IMAGE_LIST_FRESH_SECONDS
+        ))
+
+        # Cached URLs have at least SIGNED_URL_MIN_TTL_SECONDS left. Rolling the
+        # ETag over every half of that and capping max-age at the other half means
+        # a browser never reuses a listing whose URLs have expired.
+        url_window = max(1, settings.SIGNED_URL_MIN_TTL_SECONDS // 2)
+        validator = (image_catalog.index.latest(), len(image_catalog.index), int(time.time() // url_window))
+        max_age = min(settings.IMAGE_LIST_MAX_AGE_SECONDS, url_window)
+
+        async def build():
+            entries = image_catalog.query(before=before, after=after, limit=limit)
+            return await sign_image_entries(bucket, entries, settings), {}
+
+        return await conditional_json(request, List[ImageData], validator, f"public, max-age={max_age}", build)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error listing images: {e}")
         raise HTTPException(status_code=500, detail="Failed to list images")
 
+async def sign_image_entries(bucket, entries: List[Tuple[str, datetime]], settings: Settings) -> List[ImageData]:
+    """Signed full-size and thumbnail URLs for catalog entries, using derivatives where they can be made"""
+    if not entries:
+        return []
+    derivatives = await ensure_derivatives(
+        bucket, [blob_name for blob_name, _ in entries], [PRESETS["large"], PRESETS["thumbnail"]]
+    )
+    # (blob_name, width, height, quality) to sign for the full image and the thumbnail
+    variants = {
+        blob_name: [(name, None, None, None) for name in derivatives[blob_name]] if derivatives[blob_name]
+        else [(blob_name, 1280, None, 85), (blob_name, 128, None, 60)]
+        for blob_name, _ in entries
+    }
+
+    def process_entry(entry):
+        blob_name, timestamp = entry
+        full_url, thumbnail_url = [
+            generate_signed_url(settings.GCS_BUCKET, name, width=width, height=height, quality=quality)
+            for name, width, height, quality in variants[blob_name]
+        ]
+        return ImageData(id=blob_name.split('/')[-1], url=full_url, thumbnail_url=thumbnail_url, timestamp=timestamp)
+
+    def process_batch(entries):
+        urls = generate_signed_urls(settings.GCS_BUCKET, [variant for blob_name, _ in entries for variant in variants[blob_name]])
+        return [
+            ImageData(id=blob_name.split('/')[-1], url=urls[2 * i], thumbnail_url=urls[2 * i + 1], timestamp=timestamp)
+            for i, (blob_name, timestamp) in enumerate(entries)
+        ]
+
+    # Signing is local CPU work here, so one pool task beats one per image
+    if get_url_signer() is not None or settings.STORAGE_BACKEND != "gcs":
+        return await run_blocking(process_batch, entries)
+
+    results = await asyncio.gather(*(run_blocking(process_entry, entry) for entry in entries), return_exceptions=True)
+    for result in results:
+        if isinstance(result, HTTPException) and result.status_code == 503:
+            raise result
+    
+    return [result for result in results if isinstance(result, ImageData)]
+
+def image_url_targets(
+    blob_name: str,
+    requested: Dict[str, Variant],
+    derived: Optional[List[str]],
+    original: bool = True
+) -> Dict[str, tuple]:
+    """(blob_name, width, height, quality) to sign for each size label, using derivatives where they were made"""
+    targets = {"original": (blob_name, None, None, None)} if original else {}
+    for i, (label, variant) in enumerate(requested.items()):
+        targets[label] = (derived[i], None, None, None) if derived else (blob_name, *variant)
+    return targets
+
+@app.post("/images/urls", response_model=ImageUrlBatch)
+async def get_image_urls_batch(
+    body: ImageUrlsRequest,
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    image_catalog: ImageCatalog = Depends(get_image_catalog),
+    storage_io: AsyncStorage = Depends(get_async_storage),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Signed URLs for many images in one call. Existence is checked against the
+    image catalog after one incremental listing instead of a HEAD per image,
+    and every requested size is signed in a single pass. Ids that are not in
+    the bucket are returned in ``missing``.
+    """
+    sizes = body.sizes or ["original", *PRESETS]
+    unknown = [size for size in sizes if size != "original" and size not in PRESETS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown sizes: {', '.join(unknown)}")
+    requested = {label: variant for label, variant in PRESETS.items() if label in sizes}
+    if body.width or body.height:
+        requested["custom"] = custom_variant(body.width, body.height, body.quality)
+    image_ids = list(dict.fromkeys(body.ids))
+
+    try:
+        bucket = storage_client.bucket(settings.GCS_BUCKET)
+        await storage_call(storage_io.refresh(image_catalog, bucket))
+        found = [image_id for image_id in image_ids if f"{IMAGE_PREFIX}{image_id}" in image_catalog.index]
+        blob_names = [f"{IMAGE_PREFIX}{image_id}" for image_id in found]
+        derived = await ensure_derivatives(bucket, blob_names, list(requested.values())) if requested else {}
+
+        labels, variants = [], []
+        for image_id, blob_name in zip(found, blob_names):
+            for label, target in image_url_targets(blob_name, requested, derived.get(blob_name), "original" in sizes).items():
+                labels.append((image_id, label))
+                variants.append(target)
+        signed = await run_blocking(generate_signed_urls, settings.GCS_BUCKET, variants) if variants else []
+
+        urls: Dict[str, Dict[str, str]] = {image_id: {} for image_id in found}
+        for (image_id, label), url in zip(labels, signed):
+            urls[image_id][label] = url
+        return ImageUrlBatch(urls=urls, missing=[image_id for image_id in image_ids if image_id not in urls])
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating URLs for {len(image_ids)} images: {e}")
+        raise HTTPException(status_code=500, detail="Failed to generate image URLs")
+
 @app.get("/images/{image_name}/urls")
 async def get_image_urls(
     image_name: str,
+    response: Response,
     width: Optional[int] = Query(None, gt=0, le=2048),
     height: Optional[int] = Query(None, gt=0, le=2048),
     quality: Optional[int] = Query(85, ge=1, le=100),
-    storage_client: storage.Client = Depends(get_storage_client),
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    storage_io: AsyncStorage = Depends(get_async_storage),
     settings: Settings = Depends(get_settings)
 ):
     """
-    Get signed URLs for a specific image with different sizes
+    Get signed URLs for a specific image with different sizes. Sizes are
+    resized copies under derivatives/, created on first request; a custom
+    size is rounded up to one of a fixed set of sizes and qualities.
     """
     try:
         bucket = storage_client.bucket(settings.GCS_BUCKET)
         blob_name = f"images/{image_name}"
         blob = bucket.blob(blob_name)
         
-        if not blob.exists():
+        if not await storage_call(storage_io.exists(blob)):
             raise HTTPException(status_code=404, detail="Image not found")
         
-        # Generate different sized URLs
-        urls = {
-            "original": generate_signed_url(settings.GCS_BUCKET, blob_name, storage_client),
-            "large": generate_signed_url(settings.GCS_BUCKET, blob_name, storage_client, width=1280, quality=85),
-            "medium": generate_signed_url(settings.GCS_BUCKET, blob_name, storage_client, width=640, quality=80),
-            "small": generate_signed_url(settings.GCS_BUCKET, blob_name, storage_client, width=320, quality=75),
-            "thumbnail": generate_signed_url(settings.GCS_BUCKET, blob_name, storage_client, width=128, quality=60),
-        }
-        
-        # Add custom size if requested
+        requested = dict(PRESETS)
         if width or height:
-            urls["custom"] = generate_signed_url(
-                settings.GCS_BUCKET, 
-                blob_name, 
-                storage_client, 
-                width=width, 
-                height=height, 
-                quality=quality
-            )
+            requested["custom"] = custom_variant(width, height, quality or 85)
+        derived = (await ensure_derivatives(bucket, [blob_name], list(requested.values())))[blob_name]
+
+        targets = image_url_targets(blob_name, requested, derived)
+        signed = await run_blocking(generate_signed_urls, settings.GCS_BUCKET, list(targets.values()))
+        urls = dict(zip(targets, signed))
         
+        # Every URL handed out stays valid for at least SIGNED_URL_MIN_TTL_SECONDS
+        response.headers["Cache-Control"] = f"public, max-age={settings.SIGNED_URL_MIN_TTL_SECONDS}"
         return urls
         
     except HTTPException:
@@ -208,42 +862,332 @@ async def get_image_urls(
         logger.error(f"Error generating URLs for image {image_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate image URLs")
 
+@app.get("/timelapse", response_model=TimelapseData)
+async def get_timelapse(
+    start: datetime = Query(..., description="First capture time to include"),
+    end: Optional[datetime] = Query(None, description="Only captures before this time"),
+    stride: int = Query(1, ge=1, description="Use every Nth capture"),
+    frame_width: int = Query(320, ge=32, le=640),
+    quality: int = Query(75, ge=1, le=95),
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    image_catalog: ImageCatalog = Depends(get_image_catalog),
+    storage_io: AsyncStorage = Depends(get_async_storage),
+    renderer: TimelapseRenderer = Depends(get_timelapse_renderer),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    A time-lapse of the captures in ``[start, end)`` as one sprite sheet.
+    Frames are tiled left to right, top to bottom, oldest first; the response
+    gives the sheet's signed URL, its layout and each frame's timestamp.
+    """
+    try:
+        bucket = storage_client.bucket(settings.GCS_BUCKET)
+        await storage_call(storage_io.refresh(image_catalog, bucket))
+        frames = image_catalog.between(start, end)[::stride]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error listing time-lapse frames: {e}")
+        raise HTTPException(status_code=503, detail="Failed to list images")
+
+    if not frames:
+        raise HTTPException(status_code=404, detail="No images in range")
+    if len(frames) > min(MAX_TIMELAPSE_FRAMES, max_frames(frame_width)):
+        raise HTTPException(
+            status_code=400, detail="Too many frames; use a larger stride, a shorter range or a smaller frame_width"
+        )
+
+    try:
+        # Identical concurrent requests wait on one render rather than each building a sheet
+        sheet_name, manifest = await get_single_flight().do(
+            ("timelapse", timelapse_key([name for name, _ in frames], frame_width, quality)),
+            lambda: run_blocking(renderer.get_or_render, bucket, frames, frame_width, quality)
+        )
+        url = await run_blocking(generate_signed_url, settings.GCS_BUCKET, sheet_name)
+    except HTTPException:
+        raise
+    except SheetTooLarge:
+        # Frames taller than wide only show up once the first one is decoded
+        raise HTTPException(
+            status_code=400, detail="Too many frames; use a larger stride, a shorter range or a smaller frame_width"
+        )
+    except Exception as e:
+        logger.error(f"Error rendering time-lapse: {e}")
+        raise HTTPException(status_code=500, detail="Failed to render time-lapse")
+    return TimelapseData(url=url, **manifest)
+
+async def ensure_derivatives(bucket, blob_names: List[str], variants: List[Variant]) -> dict:
+    """
+    Make sure each image has the given resized derivatives, creating missing
+    ones in parallel on the worker pool. Maps each blob name to its derivative
+    names, or to None when they could not be made and the original should be
+    served instead.
+    """
+    derivative_cache = get_derivative_cache()
+    derivatives = {}
+    pending = []
+    for blob_name in blob_names:
+        names = [derivative_name(blob_name, variant) for variant in variants]
+        if all(derivative_cache.is_known(name) for name in names):
+            derivatives[blob_name] = names
+        elif derivative_cache.has_failed(blob_name):
+            derivatives[blob_name] = None
+        else:
+            pending.append(blob_name)
+
+    results = await asyncio.gather(
+        *(run_blocking(derivative_cache.ensure, bucket, blob_name, variants) for blob_name in pending),
+        return_exceptions=True
+    )
+    for blob_name, result in zip(pending, results):
+        if isinstance(result, HTTPException):
+            raise result
+        if isinstance(result, Exception):
+            logger.warning(f"Failed to create derivatives of {blob_name}: {result}")
+            result = None
+        derivatives[blob_name] = result
+    return derivatives
+
+async def refresh_sensor_indexes(
+    bucket,
+    sensor_index: BlobIndex,
+    archive_index: BlobIndex,
+    storage_io: AsyncStorage,
+    settings: Settings
+):
+    """List new live and archived sensor blobs, sharing listings within the history fresh and stale windows"""
+    await storage_call(asyncio.gather(
+        storage_io.refresh(sensor_index, bucket, settings.SENSOR_HISTORY_STALE_SECONDS, settings.SENSOR_HISTORY_FRESH_SECONDS),
+        storage_io.refresh(archive_index, bucket, settings.SENSOR_HISTORY_STALE_SECONDS, settings.SENSOR_HISTORY_FRESH_SECONDS)
+    ))
+
+async def sync_sensor_series(
+    bucket,
+    sensor_index: BlobIndex,
+    archive_index: BlobIndex,
+    sensor_series: SensorSeries,
+    storage_io: AsyncStorage,
+    settings: Settings
+):
+    """Bring the sensor indexes and columnar store up to date, once for all concurrent requests"""
+    await refresh_sensor_indexes(bucket, sensor_index, archive_index, storage_io, settings)
+    await get_single_flight().do(
+        ("sensor_series", sensor_series),
+        lambda: run_blocking(
+            sensor_series.sync, sensor_index, bucket, archive_index, settings.BULK_FETCH_CONCURRENCY
+        )
+    )
+
+async def sync_sensor_tiles(
+    bucket,
+    sensor_index: BlobIndex,
+    archive_index: BlobIndex,
+    sensor_tiles: SensorTiles,
+    storage_io: AsyncStorage,
+    settings: Settings
+):
+    """Fold readings newer than the tiles' watermark into them, once for all concurrent requests"""
+    await refresh_sensor_indexes(bucket, sensor_index, archive_index, storage_io, settings)
+    await get_single_flight().do(
+        ("sensor_tiles", sensor_tiles),
+        lambda: run_blocking(
+            sensor_tiles.sync, bucket, sensor_index, archive_index, settings.BULK_FETCH_CONCURRENCY
+        )
+    )
+
 @app.get("/sensor/history", response_model=List[SensorData])
 async def get_sensor_history(
-    limit: Optional[int] = Query(24, ge=1, le=100),
-    storage_client: storage.Client = Depends(get_storage_client),
+    request: Request,
+    limit: Optional[int] = Query(24, ge=1, le=10000),
+    start: Optional[datetime] = Query(None, description="Only readings at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only readings before this time"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    sensor_index: BlobIndex = Depends(get_sensor_index),
+    archive_index: BlobIndex = Depends(get_archive_index),
+    sensor_series: SensorSeries = Depends(get_sensor_series),
+    influx: Optional[InfluxSensorBackend] = Depends(get_influx_backend),
+    storage_io: AsyncStorage = Depends(get_async_storage),
     settings: Settings = Depends(get_settings)
 ):
-    """Fetch historical sensor data from Google Cloud Storage"""
+    """
+    Fetch historical sensor data, newest first, from InfluxDB or else GCS. When more readings match,
+    the X-Next-Cursor response header holds the cursor for the next page.
+    """
+    end_us = to_epoch_us(end) if end else None
+    cursor_us, returned = None, 0
+    if cursor is not None:
+        # "<timestamp>:<n>" resumes after the first n readings at that timestamp; a bare
+        # "<timestamp>" from older clients resumes strictly before it
+        stamp, _, tied = cursor.partition(":")
+        try:
+            cursor_us = int(stamp)
+            returned = int(tied) if tied else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if returned < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        bound = cursor_us + 1 if returned else cursor_us
+        end_us = bound if end_us is None else min(end_us, bound)
+
+    start_us = to_epoch_us(start) if start else None
     try:
         bucket = storage_client.bucket(settings.GCS_BUCKET)
-        blobs = list(bucket.list_blobs(prefix="sensor_data/", delimiter="/", max_results=limit))
-        
-        if not blobs:
-            return []
-            
-        blobs.sort(key=lambda x: x.name, reverse=True)
-        
-        sensor_data = []
-        for blob in blobs[:limit]:
-            try:
-                data = json.loads(blob.download_as_string())
-                sensor_data.append(SensorData(
-                    temperature=data["temperature"],
-                    humidity=data["humidity"],
-                    pressure=data["pressure"],
-                    timestamp=parser.parse(data["timestamp"])
-                ))
-            except (json.JSONDecodeError, KeyError) as e:
-                logger.warning(f"Failed to parse sensor data from {blob.name}: {e}")
-                continue
-                
-        return sensor_data
+        latest = await query_influx(influx, lambda backend: backend.latest())
+        if latest is not None:
+            validator = ("influx", latest[0])
+        else:
+            await refresh_sensor_indexes(bucket, sensor_index, archive_index, storage_io, settings)
+            validator = (sensor_index.latest(), len(sensor_index), archive_index.latest(), len(archive_index))
+
+        async def read_history():
+            if latest is not None:
+                result = await query_influx(influx, lambda backend: backend.history(start_us, end_us, returned + limit + 1))
+                if result is not None:
+                    return result
+            await sync_sensor_series(bucket, sensor_index, archive_index, sensor_series, storage_io, settings)
+            return sensor_series.query(start=start_us, end=end_us, limit=returned + limit + 1)
+
+        async def build():
+            timestamps, columns = await read_history()
+            # Readings sharing the cursor's timestamp come first; skip those earlier pages returned
+            skip = sum(1 for timestamp in timestamps[:returned] if timestamp == cursor_us)
+            timestamps = timestamps[skip:]
+            columns = {field: values[skip:] for field, values in columns.items()}
+            headers = {}
+            if len(timestamps) > limit:
+                timestamps = timestamps[:limit]
+                columns = {field: values[:limit] for field, values in columns.items()}
+                last = timestamps[-1]
+                tied = sum(1 for timestamp in timestamps if timestamp == last)
+                if last == cursor_us:
+                    tied += skip
+                headers["X-Next-Cursor"] = f"{last}:{tied}"
+            return to_sensor_data(timestamps, columns), headers
+
+        return await conditional_json(request, List[SensorData], validator, "no-cache", build)
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching sensor history from GCS: {e}")
         raise HTTPException(status_code=503, detail="Failed to fetch sensor history")
 
+@app.get("/sensor/aggregate", response_model=List[SensorAggregate])
+async def get_sensor_aggregate(
+    bucket_width: str = Query("1h", alias="bucket", description="Bucket width such as 5m, 1h or 1d"),
+    start: Optional[datetime] = Query(None, description="Only readings at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only readings before this time"),
+    max_points: Optional[int] = Query(None, ge=3, le=MAX_AGGREGATE_BUCKETS, description="Downsample buckets with LTTB to at most this many points"),
+    downsample_field: str = Query("temperature", pattern="^(temperature|humidity|pressure)$"),
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    sensor_index: BlobIndex = Depends(get_sensor_index),
+    archive_index: BlobIndex = Depends(get_archive_index),
+    sensor_series: SensorSeries = Depends(get_sensor_series),
+    sensor_tiles: SensorTiles = Depends(get_sensor_tiles),
+    storage_io: AsyncStorage = Depends(get_async_storage),
+    influx: Optional[InfluxSensorBackend] = Depends(get_influx_backend),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Min, max, mean and last per time bucket for each sensor field, oldest first.
+    InfluxDB computes the buckets with GROUP BY time() when it is available.
+    Otherwise whole-hour and whole-day buckets over hour-aligned ranges are
+    merged from the precomputed summary tiles, and anything finer is
+    aggregated from the readings. With max_points, buckets are downsampled
+    with LTTB on the mean of downsample_field.
+    """
+    try:
+        width_us = parse_bucket_width(bucket_width)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    start_us = to_epoch_us(start) if start else None
+    end_us = to_epoch_us(end) if end else None
+    try:
+        buckets = await query_influx(influx, lambda backend: backend.aggregate(width_us, start_us, end_us))
+        if buckets is None and sensor_tiles.tile_width(width_us, start_us, end_us) is not None:
+            bucket = storage_client.bucket(settings.GCS_BUCKET)
+            await sync_sensor_tiles(bucket, sensor_index, archive_index, sensor_tiles, storage_io, settings)
+            buckets = sensor_tiles.query(width_us, start_us, end_us)
+        if buckets is None:
+            bucket = storage_client.bucket(settings.GCS_BUCKET)
+            await sync_sensor_series(bucket, sensor_index, archive_index, sensor_series, storage_io, settings)
+            timestamps, columns = sensor_series.window(start=start_us, end=end_us)
+            buckets = aggregate(timestamps, columns, width_us)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error aggregating sensor data: {e}")
+        raise HTTPException(status_code=503, detail="Failed to aggregate sensor data")
+
+    if max_points is not None and len(buckets["start"]) > max_points:
+        selected = lttb(buckets["start"], buckets[f"{downsample_field}_mean"], max_points)
+        buckets = {key: values[selected] for key, values in buckets.items()}
+    if len(buckets["start"]) > MAX_AGGREGATE_BUCKETS:
+        raise HTTPException(status_code=400, detail="Too many buckets; use a wider bucket, a shorter range or max_points")
+
+    return [
+        SensorAggregate(
+            start=from_epoch_us(buckets["start"][i]),
+            count=int(buckets["count"][i]),
+            **{
+                field: SensorStats(
+                    min=buckets[f"{field}_min"][i],
+                    max=buckets[f"{field}_max"][i],
+                    mean=buckets[f"{field}_mean"][i],
+                    last=buckets[f"{field}_last"][i]
+                )
+                for field in FIELDS
+            }
+        )
+        for i in range(len(buckets["start"]))
+    ]
+
+@app.get("/sensor/export")
+async def export_sensor_data(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, description="Only readings at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only readings before this time"),
+    storage_client: "storage.Client" = Depends(get_storage_client),
+    sensor_index: BlobIndex = Depends(get_sensor_index),
+    archive_index: BlobIndex = Depends(get_archive_index),
+    storage_io: AsyncStorage = Depends(get_async_storage),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    Stream every sensor reading in range, oldest first, as NDJSON or CSV.
+    Day archives and loose readings are downloaded a bounded window ahead of
+    the response, so memory stays flat whatever the range.
+    """
+    try:
+        bucket = storage_client.bucket(settings.GCS_BUCKET)
+
+        await storage_call(asyncio.gather(
+            storage_io.refresh(sensor_index, bucket),
+            storage_io.refresh(archive_index, bucket)
+        ))
+        sources = export_sources(sensor_index, archive_index, start, end)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error preparing sensor export: {e}")
+        raise HTTPException(status_code=503, detail="Failed to export sensor data")
+
+    chunks = encode_rows(iter_readings(bucket, sources, start, end, max_in_flight=settings.BULK_FETCH_CONCURRENCY), fmt)
+    try:
+        stream = await stream_blocking(chunks)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error starting sensor export: {e}")
+        raise HTTPException(status_code=503, detail="Failed to export sensor data")
+    return StreamingResponse(
+        stream,
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="sensor_data.{fmt}"'}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     settings = get_settings()
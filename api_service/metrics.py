@@ -0,0 +1,202 @@
+import bisect
+import contextvars
+import threading
+import time
+from collections import Counter as Tally
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus text exposition format 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (metric name, type, help, [(labels, value) or (labels, value, name suffix)])
+Family = Tuple[str, str, str, List[tuple]]
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labelnames), 0)
+
+    def collect(self) -> List[Family]:
+        with self._lock:
+            samples = [(dict(zip(self.labelnames, key)), value) for key, value in self._values.items()]
+        return [(self.name, "counter", self.documentation, samples)]
+
+class Histogram:
+    """Cumulative-bucket histogram with the label handling prometheus_client would give it"""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels[name]) for name in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def collect(self) -> List[Family]:
+        samples = []
+        with self._lock:
+            series = [(key, list(counts), total) for key, (counts, total) in self._series.items()]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(({**labels, "le": _number(bound)}, cumulative, "_bucket"))
+            samples.append((labels, total, "_sum"))
+            samples.append((labels, cumulative, "_count"))
+        return [(self.name, "histogram", self.documentation, samples)]
+
+class Registry:
+    """Metrics plus callbacks that report point-in-time values (pool and cache stats) at scrape time"""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: List[Callable[[], List[Family]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[Family]]):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines = []
+        families = [family for metric in self._metrics for family in metric.collect()]
+        for collector in self._collectors:
+            families.extend(collector())
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample in samples:
+                labels, value = sample[0], sample[1]
+                suffix = sample[2] if len(sample) > 2 else ""
+                lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "selfhydro_http_request_duration_seconds",
+    "Time to produce response headers, by route",
+    ("method", "route", "status")
+))
+GCS_OPERATION_SECONDS = REGISTRY.register(Histogram(
+    "selfhydro_gcs_operation_duration_seconds",
+    "Duration of storage and credential operations",
+    ("operation",)
+))
+GCS_CALLS_PER_REQUEST = REGISTRY.register(Histogram(
+    "selfhydro_gcs_calls_per_request",
+    "Storage and credential operations made while handling one request",
+    ("route",),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+))
+GCS_ERRORS = REGISTRY.register(Counter(
+    "selfhydro_gcs_operation_errors_total",
+    "Storage and credential operations that raised",
+    ("operation",)
+))
+
+def family(name: str, kind: str, documentation: str, value: float) -> Family:
+    """A single unlabelled sample, for collectors reporting a stats() value"""
+    return (name, kind, documentation, [({}, value)])
+
+class RequestTally:
+    """Operations made on behalf of one request, from whichever thread runs them"""
+
+    def __init__(self):
+        self._counts: Tally = Tally()
+        self._lock = threading.Lock()
+
+    def add(self, operation: str):
+        with self._lock:
+            self._counts[operation] += 1
+
+    def total(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+_request_tally: contextvars.ContextVar[Optional[RequestTally]] = contextvars.ContextVar("request_tally", default=None)
+
+def start_request_tally() -> RequestTally:
+    """Start counting operations for the current request; worker threads see it through copied contexts"""
+    tally = RequestTally()
+    _request_tally.set(tally)
+    return tally
+
+@contextmanager
+def gcs_operation(operation: str) -> Iterator[None]:
+    """Time one storage operation (list, download, upload, exists, sign, ...) and count it against the request"""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        GCS_ERRORS.inc(operation=operation)
+        raise
+    finally:
+        GCS_OPERATION_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        tally = _request_tally.get()
+        if tally is not None:
+            tally.add(operation)
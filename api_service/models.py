@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+import json
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+def to_epoch_us(timestamp: datetime) -> int:
+    """Convert a datetime to integer microseconds since the epoch, treating naive values as UTC"""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+def from_epoch_us(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=int(value))
+
+class SensorData(BaseModel):
+    temperature: float
+    humidity: float
+    pressure: float
+    timestamp: datetime
+
+class ImageData(BaseModel):
+    id: str
+    url: str
+    thumbnail_url: str
+    timestamp: datetime
+
+class SensorStats(BaseModel):
+    min: float
+    max: float
+    mean: float
+    last: float
+
+class SensorAggregate(BaseModel):
+    start: datetime
+    count: int
+    temperature: SensorStats
+    humidity: SensorStats
+    pressure: SensorStats
+
+class TimelapseData(BaseModel):
+    url: str
+    columns: int
+    rows: int
+    frame_width: int
+    frame_height: int
+    frames: List[datetime]
+
+class ImageUrlsRequest(BaseModel):
+    ids: List[str] = Field(..., min_length=1, max_length=100)
+    sizes: Optional[List[str]] = None
+    width: Optional[int] = Field(None, gt=0, le=2048)
+    height: Optional[int] = Field(None, gt=0, le=2048)
+    quality: int = Field(85, ge=1, le=100)
+
+class ImageUrlBatch(BaseModel):
+    urls: Dict[str, Dict[str, str]]
+    missing: List[str]
+
+def parse_sensor_data(raw: bytes) -> SensorData:
+    """Parse a sensor_data/ JSON object written by the monitor crate"""
+    from dateutil import parser
+
+    data = json.loads(raw)
+    return SensorData(
+        temperature=data["temperature"],
+        humidity=data["humidity"],
+        pressure=data["pressure"],
+        timestamp=parser.parse(data["timestamp"])
+    )
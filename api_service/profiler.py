@@ -0,0 +1,87 @@
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+def _collapse(frame, thread_name: str) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    stack.append(thread_name)
+    return ";".join(reversed(stack))
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread while at least one request is being
+    recorded, and writes the recordings of slow requests as folded stacks
+    (``frame;frame;frame count``) for flamegraph.pl or speedscope.
+
+    The sampler thread only runs while recordings are open, so the profiler
+    costs nothing between requests. Samples cover the whole process, so
+    concurrent requests show up in each other's recordings.
+    """
+
+    def __init__(self, output_dir: str, slow_seconds: float, interval_seconds: float = 0.005, max_files: int = 100):
+        self.output_dir = output_dir
+        self.slow_seconds = slow_seconds
+        self.interval_seconds = interval_seconds
+        self.max_files = max_files
+        self._recordings: Dict[int, Counter] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+
+    def begin(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            self._recordings[self._next_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+                self._thread.start()
+            return self._next_id
+
+    def end(self, recording: int, label: str, elapsed_seconds: float) -> Optional[str]:
+        """Close a recording, writing it out when the request was slow. Returns the file written, if any."""
+        with self._lock:
+            stacks = self._recordings.pop(recording, None)
+        if stacks is None or elapsed_seconds < self.slow_seconds or not stacks or self.written >= self.max_files:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label).strip("_")
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%dT%H%M%S')}_{safe_label}_{int(elapsed_seconds * 1000)}ms.folded")
+        with open(path, "w") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.written += 1
+        logger.info(f"Wrote profile of slow request {label} ({elapsed_seconds:.3f}s) to {path}")
+        return path
+
+    def sample(self):
+        """Add the current stack of every other thread to each open recording"""
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        own = threading.get_ident()
+        stacks = [
+            _collapse(frame, names.get(ident, str(ident)))
+            for ident, frame in sys._current_frames().items() if ident != own
+        ]
+        with self._lock:
+            for recording in self._recordings.values():
+                recording.update(stacks)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._recordings:
+                    self._thread = None
+                    return
+            self.sample()
+            time.sleep(self.interval_seconds)
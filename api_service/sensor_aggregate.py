@@ -0,0 +1,83 @@
+import re
+from typing import Dict
+
+import numpy as np
+
+from sensor_store import FIELDS
+
+_UNITS_US = {
+    "s": 1_000_000,
+    "m": 60 * 1_000_000,
+    "h": 60 * 60 * 1_000_000,
+    "d": 24 * 60 * 60 * 1_000_000,
+}
+_WIDTH_PATTERN = re.compile(r"^(\d+)([smhd])$")
+
+STATS = ("min", "max", "mean", "last")
+
+def parse_bucket_width(value: str) -> int:
+    """Parse a bucket width such as ``5m``, ``1h`` or ``1d`` into microseconds"""
+    match = _WIDTH_PATTERN.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid bucket width: {value}")
+    return int(match.group(1)) * _UNITS_US[match.group(2)]
+
+def aggregate(timestamps: np.ndarray, columns: Dict[str, np.ndarray], width_us: int) -> Dict[str, np.ndarray]:
+    """
+    Reduce ascending readings into fixed-width buckets aligned to the epoch.
+
+    Returns ``start`` and ``count`` arrays plus ``<field>_min``, ``<field>_max``,
+    ``<field>_mean`` and ``<field>_last`` for every sensor field. Empty buckets
+    are omitted.
+    """
+    if len(timestamps) == 0:
+        empty = {"start": np.empty(0, dtype=np.int64), "count": np.empty(0, dtype=np.int64)}
+        for field in FIELDS:
+            for stat in STATS:
+                empty[f"{field}_{stat}"] = np.empty(0)
+        return empty
+
+    bucket_ids = timestamps // width_us
+    starts = np.flatnonzero(np.concatenate(([True], bucket_ids[1:] != bucket_ids[:-1])))
+    ends = np.append(starts[1:], len(timestamps))
+    counts = ends - starts
+
+    result = {"start": bucket_ids[starts] * width_us, "count": counts}
+    for field in FIELDS:
+        values = columns[field]
+        result[f"{field}_min"] = np.minimum.reduceat(values, starts)
+        result[f"{field}_max"] = np.maximum.reduceat(values, starts)
+        result[f"{field}_mean"] = np.add.reduceat(values, starts) / counts
+        result[f"{field}_last"] = values[ends - 1]
+    return result
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets downsampling. Returns the indices of at
+    most ``threshold`` points that preserve the visual shape of ``y`` over ``x``.
+    """
+    if threshold < 3:
+        raise ValueError("LTTB needs a threshold of at least 3 points")
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_lo:next_hi].mean() if next_hi > next_lo else x[-1]
+        avg_y = y[next_lo:next_hi].mean() if next_hi > next_lo else y[-1]
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[lo:hi] - y[previous])
+            - (x[previous] - x[lo:hi]) * (avg_y - y[previous])
+        )
+        previous = lo + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
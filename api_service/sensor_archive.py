@@ -0,0 +1,157 @@
+import asyncio
+import io
+import logging
+from datetime import datetime, timedelta, timezone
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from google.api_core.exceptions import PreconditionFailed
+
+from blob_index import BlobIndex
+from bulk_fetch import fetch_sensor_data
+from metrics import gcs_operation
+from models import to_epoch_us
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PREFIX = "sensor_archive/"
+ARCHIVE_SUFFIX = ".npy"
+ARCHIVE_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("temperature", "<f8"),
+    ("humidity", "<f8"),
+    ("pressure", "<f8"),
+])
+# How long after a UTC day ends it is compacted, so readings uploaded late still make it into its archive
+COMPACTION_GRACE_SECONDS = 6 * 3600
+
+def reading_day(blob_name: str) -> Optional[str]:
+    """Return the ``%Y%m%d`` day of a sensor_data/ or sensor_archive/ blob name"""
+    day = blob_name.rsplit("/", 1)[-1].split("_", 1)[0].split(".", 1)[0]
+    return day if len(day) == 8 and day.isdigit() else None
+
+def relist_start(blob_name: str, overlap_seconds: float = COMPACTION_GRACE_SECONDS) -> str:
+    """Where to list sensor_data/ from so readings named up to ``overlap_seconds`` before ``blob_name`` are seen"""
+    prefix, _, name = blob_name.rpartition("/")
+    try:
+        newest = datetime.strptime(name.split(".", 1)[0], "%Y%m%d_%H%M%S")
+    except ValueError:
+        return blob_name
+    return f"{prefix}/{(newest - timedelta(seconds=overlap_seconds)).strftime('%Y%m%d_%H%M%S')}"
+
+def archive_name(day: str, sources: int) -> str:
+    """``sensor_archive/<day>_<sources>.npy``, where ``sources`` is how many loose objects it was built from"""
+    return f"{ARCHIVE_PREFIX}{day}_{sources:06d}{ARCHIVE_SUFFIX}"
+
+def archive_sources(blob_name: str) -> int:
+    """How many loose objects an archive was built from; 0 for a ``<day>.npy`` archive, which did not record it"""
+    stem = blob_name.rsplit("/", 1)[-1][:-len(ARCHIVE_SUFFIX)]
+    sources = stem.partition("_")[2]
+    return int(sources) if sources.isdigit() else 0
+
+def newest_archives(names: Iterable[str]) -> Dict[str, str]:
+    """Map each day to its archive built from the most loose objects, given archive names in sorted order"""
+    # Source counts are zero-padded and sort after the bare <day>.npy, so the last name of a day is its newest
+    return {reading_day(name): name for name in names}
+
+def day_names(index: BlobIndex, day: str) -> List[str]:
+    """The names in ``index`` for one ``%Y%m%d`` day"""
+    following = (datetime.strptime(day, "%Y%m%d") + timedelta(days=1)).strftime("%Y%m%d")
+    return index.range(f"{index.prefix}{day}", f"{index.prefix}{following}")
+
+def day_bounds(day: str) -> Tuple[int, int]:
+    """The epoch microseconds at which a ``%Y%m%d`` UTC day starts and ends"""
+    start = datetime.strptime(day, "%Y%m%d").replace(tzinfo=timezone.utc)
+    return to_epoch_us(start), to_epoch_us(start + timedelta(days=1))
+
+def encode_archive(timestamps: np.ndarray, values: np.ndarray) -> bytes:
+    """Pack readings into a .npy file: a self-describing header followed by fixed-width rows"""
+    records = np.empty(len(timestamps), dtype=ARCHIVE_DTYPE)
+    records["timestamp"] = timestamps
+    records["temperature"] = values[:, 0]
+    records["humidity"] = values[:, 1]
+    records["pressure"] = values[:, 2]
+    buffer = io.BytesIO()
+    np.save(buffer, records, allow_pickle=False)
+    return buffer.getvalue()
+
+def decode_archive(raw: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Unpack an archive into a timestamp array and an (n, 3) array of values"""
+    records = np.load(io.BytesIO(raw), allow_pickle=False)
+    if records.dtype != ARCHIVE_DTYPE:
+        raise ValueError(f"Unexpected archive dtype {records.dtype}")
+    values = np.column_stack((records["temperature"], records["humidity"], records["pressure"]))
+    return records["timestamp"].astype(np.int64), values
+
+def compact_closed_days(
+    bucket,
+    sensor_index: BlobIndex,
+    archive_index: BlobIndex,
+    today: Optional[str] = None,
+    grace_seconds: float = COMPACTION_GRACE_SECONDS,
+    max_in_flight: int = 16
+) -> List[str]:
+    """
+    Roll every closed (UTC) day of loose sensor_data/ JSON into
+    ``sensor_archive/<day>_<sources>.npy``. A day is closed ``grace_seconds``
+    after it ends, or before ``today`` when given. A day whose newest archive
+    was built from fewer loose objects than it now has, because a reading
+    arrived late, is archived again. The loose objects are left in place.
+    Returns the days that were archived.
+    """
+    today = today or (datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)).strftime("%Y%m%d")
+    sensor_index.refresh(bucket)
+    archive_index.refresh(bucket)
+    archived = newest_archives(archive_index.names())
+
+    closed_names = sensor_index.range(end=f"{sensor_index.prefix}{today}")
+    compacted = []
+    for day, names in groupby(closed_names, key=reading_day):
+        names = list(names)
+        if day is None or (day in archived and archive_sources(archived[day]) >= len(names)):
+            continue
+        readings = [reading for _, reading in fetch_sensor_data(bucket, names, max_in_flight=max_in_flight)]
+        if not readings:
+            continue
+        timestamps = np.array([to_epoch_us(r.timestamp) for r in readings], dtype=np.int64)
+        values = np.array([(r.temperature, r.humidity, r.pressure) for r in readings], dtype=np.float64)
+        order = np.argsort(timestamps, kind="stable")
+        try:
+            with gcs_operation("upload"):
+                bucket.blob(archive_name(day, len(names))).upload_from_string(
+                    encode_archive(timestamps[order], values[order]),
+                    content_type="application/octet-stream",
+                    if_generation_match=0
+                )
+        except PreconditionFailed:
+            logger.info(f"Sensor archive for {day} was written by another worker")
+            continue
+        logger.info(f"Archived {len(readings)} sensor readings for {day}")
+        compacted.append(day)
+
+    if compacted:
+        archive_index.refresh(bucket)
+    return compacted
+
+async def run_compaction(
+    get_bucket,
+    sensor_index: BlobIndex,
+    archive_index: BlobIndex,
+    interval_seconds: float,
+    grace_seconds: float = COMPACTION_GRACE_SECONDS,
+    max_in_flight: int = 16
+):
+    """Compact closed days every ``interval_seconds`` until cancelled"""
+    loop = asyncio.get_event_loop()
+    while True:
+        try:
+            await loop.run_in_executor(
+                None,
+                lambda: compact_closed_days(
+                    get_bucket(), sensor_index, archive_index, grace_seconds=grace_seconds, max_in_flight=max_in_flight
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error compacting sensor data: {e}")
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from blob_index import BlobIndex
+from bulk_fetch import fetch_blobs
+from models import from_epoch_us, parse_sensor_data, to_epoch_us
+from sensor_archive import archive_sources, decode_archive, newest_archives, reading_day
+from sensor_store import FIELDS
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _day(timestamp: Optional[datetime], offset_days: int = 0) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return (from_epoch_us(to_epoch_us(timestamp)) + timedelta(days=offset_days)).strftime("%Y%m%d")
+
+def export_sources(
+    sensor_index: BlobIndex,
+    archive_index: BlobIndex,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> List[str]:
+    """
+    Blob names covering ``[start, end)`` in time order: a day's newest archive
+    when it was built from all of the day's loose sensor_data/ objects,
+    otherwise those loose objects.
+    """
+    first_day, last_day = _day(start), _day(end, 1)
+    archives = newest_archives(archive_index.range(
+        f"{archive_index.prefix}{first_day}" if first_day else None,
+        f"{archive_index.prefix}{last_day}" if last_day else None
+    ))
+    loose = sensor_index.range(
+        f"{sensor_index.prefix}{first_day}" if first_day else None,
+        f"{sensor_index.prefix}{last_day}" if last_day else None
+    )
+    sources = []
+    loose_days = {}
+    for day, names in groupby(loose, key=lambda name: reading_day(name) or ""):
+        loose_days[day] = list(names)
+    for day in sorted(set(archives) | set(loose_days)):
+        names = loose_days.get(day, [])
+        if day in archives and archive_sources(archives[day]) >= len(names):
+            sources.append(archives[day])
+        else:
+            sources.extend(names)
+    return sources
+
+def parse_source(raw: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Parse a day archive or a loose reading into a timestamp array and an (n, 3) array of values"""
+    # Archives are .npy files, which always start with this magic string
+    if raw[:6] == b"\x93NUMPY":
+        return decode_archive(raw)
+    reading = parse_sensor_data(raw)
+    return (
+        np.array([to_epoch_us(reading.timestamp)], dtype=np.int64),
+        np.array([[reading.temperature, reading.humidity, reading.pressure]], dtype=np.float64)
+    )
+
+def iter_readings(
+    bucket,
+    sources: List[str],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_in_flight: int = 16
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yield ``(timestamps, values)`` blocks for the readings in ``[start, end)``,
+    one block per archive or loose object. At most ``max_in_flight`` objects
+    are downloaded ahead of the consumer.
+    """
+    start_us = to_epoch_us(start) if start else None
+    end_us = to_epoch_us(end) if end else None
+    for _, (timestamps, values) in fetch_blobs(bucket, sources, parse_source, max_in_flight=max_in_flight):
+        mask = np.ones(len(timestamps), dtype=bool)
+        if start_us is not None:
+            mask &= timestamps >= start_us
+        if end_us is not None:
+            mask &= timestamps < end_us
+        if mask.any():
+            yield timestamps[mask], values[mask]
+
+def encode_rows(blocks: Iterator[Tuple[np.ndarray, np.ndarray]], fmt: str, rows_per_chunk: int = 1000) -> Iterator[bytes]:
+    """Encode reading blocks as NDJSON or CSV, yielding chunks of about ``rows_per_chunk`` rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    if fmt == "csv":
+        writer.writerow(("timestamp",) + FIELDS)
+    rows = 0
+    for timestamps, values in blocks:
+        for timestamp, (temperature, humidity, pressure) in zip(timestamps.tolist(), values.tolist()):
+            iso = from_epoch_us(timestamp).isoformat()
+            if fmt == "csv":
+                writer.writerow((iso, temperature, humidity, pressure))
+            else:
+                buffer.write(json.dumps({
+                    "timestamp": iso,
+                    "temperature": temperature,
+                    "humidity": humidity,
+                    "pressure": pressure,
+                }))
+                buffer.write("\n")
+            rows += 1
+            if rows % rows_per_chunk == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
@@ -0,0 +1,181 @@
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import SensorData, from_epoch_us
+from sensor_aggregate import STATS
+from sensor_store import FIELDS
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger(__name__)
+
+class InfluxUnavailable(Exception):
+    """InfluxDB could not answer a query; callers fall back to GCS"""
+
+def _time_clause(start_us: Optional[int], end_us: Optional[int]) -> str:
+    conditions = []
+    if start_us is not None:
+        conditions.append(f"time >= {int(start_us)}u")
+    if end_us is not None:
+        conditions.append(f"time < {int(end_us)}u")
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+def _column_array(values: List[list], index: int, dtype) -> np.ndarray:
+    return np.array([row[index] for row in values], dtype=dtype)
+
+def _complete_rows(values: List[list], indexes: List[int]) -> List[list]:
+    """The rows with a value in every one of ``indexes``; InfluxDB returns null for fields a point or bucket lacks"""
+    return [row for row in values if all(row[i] is not None for i in indexes)]
+
+class InfluxSensorBackend:
+    """
+    Sensor queries answered by the InfluxDB 1.x HTTP API that crates/monitor
+    writes to, instead of by per-object JSON in GCS.
+
+    Requests share one pooled keep-alive client. Aggregation runs on the
+    server with ``GROUP BY time()``. After a failed query the backend
+    reports itself unavailable for ``retry_after_seconds`` so requests go
+    straight to GCS instead of waiting on a timeout each time.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        database: str,
+        token: Optional[str] = None,
+        measurement: str = "environment",
+        timeout_seconds: float = 5.0,
+        max_connections: int = 20,
+        retry_after_seconds: float = 30.0,
+        transport: Optional["httpx.AsyncBaseTransport"] = None,
+        clock=time.monotonic
+    ):
+        # Only imported when InfluxDB is configured
+        import httpx
+
+        self.database = database
+        self.measurement = measurement
+        self.retry_after_seconds = retry_after_seconds
+        self._clock = clock
+        self._down_until = 0.0
+        self._client = httpx.AsyncClient(
+            base_url=host,
+            # Same header the influxdb crate sends for with_token
+            headers={"Authorization": f"Token {token}"} if token else None,
+            timeout=timeout_seconds,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport
+        )
+
+    @property
+    def available(self) -> bool:
+        return self._clock() >= self._down_until
+
+    @property
+    def _source(self) -> str:
+        return f'"{self.measurement}"'
+
+    async def query(self, statement: str) -> Tuple[List[str], List[list]]:
+        """Run one InfluxQL statement and return the columns and rows of its first series"""
+        import httpx
+
+        try:
+            response = await self._client.get("/query", params={"db": self.database, "q": statement, "epoch": "u"})
+            response.raise_for_status()
+            payload = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self._down_until = self._clock() + self.retry_after_seconds
+            raise InfluxUnavailable(str(e)) from e
+
+        try:
+            results = payload.get("results") or [{}]
+            error = payload.get("error") or results[0].get("error")
+            series = results[0].get("series") or []
+            columns, values = (series[0]["columns"], series[0]["values"]) if series else ([], [])
+        except (AttributeError, IndexError, KeyError, TypeError) as e:
+            error = f"Unexpected response shape: {e!r}"
+        if error:
+            self._down_until = self._clock() + self.retry_after_seconds
+            raise InfluxUnavailable(error)
+        return columns, values
+
+    async def latest(self) -> Optional[Tuple[int, SensorData]]:
+        """The newest reading and its epoch-microsecond timestamp, or None when it lacks a field"""
+        columns, values = await self.query(
+            f"SELECT {', '.join(FIELDS)} FROM {self._source} ORDER BY time DESC LIMIT 1"
+        )
+        if not values:
+            return None
+        row = dict(zip(columns, values[0]))
+        if any(row.get(field) is None for field in FIELDS):
+            return None
+        return row["time"], SensorData(timestamp=from_epoch_us(row["time"]), **{field: row[field] for field in FIELDS})
+
+    async def history(
+        self,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """
+        Readings with ``start <= time < end``, newest first, shaped like
+        ``SensorSeries.query``. Points missing a field are left out.
+        """
+        statement = f"SELECT {', '.join(FIELDS)} FROM {self._source}{_time_clause(start_us, end_us)} ORDER BY time DESC"
+        if limit is not None:
+            statement += f" LIMIT {int(limit)}"
+        columns, values = await self.query(statement)
+        positions = {column: i for i, column in enumerate(columns)}
+        values = _complete_rows(values, [positions[field] for field in FIELDS]) if values else values
+        if not values:
+            return np.empty(0, dtype=np.int64), {field: np.empty(0) for field in FIELDS}
+        return (
+            _column_array(values, positions["time"], np.int64),
+            {field: _column_array(values, positions[field], np.float64) for field in FIELDS}
+        )
+
+    async def aggregate(
+        self,
+        width_us: int,
+        start_us: Optional[int] = None,
+        end_us: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Per-bucket count, min, max, mean and last of every field, shaped like
+        ``sensor_aggregate.aggregate``. Buckets are aligned to the epoch and
+        empty ones are omitted, as they are for the GCS path, along with any
+        bucket missing a field.
+        """
+        if start_us is None:
+            # GROUP BY time() without a lower bound would walk buckets back to 1677
+            _, first = await self.query(f"SELECT first({FIELDS[0]}) FROM {self._source}")
+            if not first:
+                start_us = end_us if end_us is not None else 0
+            else:
+                start_us = first[0][0]
+        selections = [f"count({FIELDS[0]}) AS count"] + [
+            f"{stat}({field}) AS {field}_{stat}" for field in FIELDS for stat in STATS
+        ]
+        columns, values = await self.query(
+            f"SELECT {', '.join(selections)} FROM {self._source}{_time_clause(start_us, end_us)}"
+            f" GROUP BY time({int(width_us)}u) fill(none)"
+        )
+        positions = {column: i for i, column in enumerate(columns)}
+        if values:
+            values = _complete_rows(values, [positions[f"{field}_{stat}"] for field in FIELDS for stat in STATS])
+        result = {
+            "start": np.array([row[positions["time"]] for row in values], dtype=np.int64) if values else np.empty(0, dtype=np.int64),
+            "count": np.array([row[positions["count"]] for row in values], dtype=np.int64) if values else np.empty(0, dtype=np.int64),
+        }
+        for field in FIELDS:
+            for stat in STATS:
+                key = f"{field}_{stat}"
+                result[key] = _column_array(values, positions[key], np.float64) if values else np.empty(0)
+        return result
+
+    async def close(self):
+        await self._client.aclose()
@@ -0,0 +1,225 @@
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from blob_index import BlobIndex
+from bulk_fetch import fetch_blobs, fetch_sensor_data
+from models import SensorData, from_epoch_us, to_epoch_us
+from sensor_archive import archive_sources, day_bounds, day_names, decode_archive, reading_day
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ("temperature", "humidity", "pressure")
+
+class SensorSeries:
+    """
+    Columnar in-memory store of sensor readings.
+
+    Readings are held in parallel NumPy arrays (timestamps as epoch
+    microseconds, temperature, humidity and pressure) sorted by time, so
+    range queries are a pair of ``searchsorted`` calls and a slice. The
+    store is filled from the sensor blob index once and then extended with
+    only the blobs the index has gained since the last sync. Closed days are
+    read from their sensor_archive/ file instead of one object per reading,
+    as long as the archive was built from every loose object of its day.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self._timestamps = np.empty(initial_capacity, dtype=np.int64)
+        self._values = {field: np.empty(initial_capacity, dtype=np.float64) for field in FIELDS}
+        self._size = 0
+        self._consumed = 0
+        self._archives_consumed = 0
+        # The archive each archived day was read from
+        self._archived_days: Dict[str, str] = {}
+        self._loose_days = set()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._size]
+
+    def column(self, field: str) -> np.ndarray:
+        return self._values[field][:self._size]
+
+    def append(self, readings: Iterable[SensorData]):
+        """Append readings, keeping the columns sorted by timestamp"""
+        readings = list(readings)
+        if not readings:
+            return
+        timestamps = np.fromiter((to_epoch_us(r.timestamp) for r in readings), dtype=np.int64, count=len(readings))
+        values = np.array([(r.temperature, r.humidity, r.pressure) for r in readings], dtype=np.float64)
+        self.append_arrays(timestamps, values)
+
+    def append_arrays(self, timestamps: np.ndarray, values: np.ndarray):
+        """Append ``timestamps`` and an (n, 3) array of temperature, humidity and pressure"""
+        rows = len(timestamps)
+        if rows == 0:
+            return
+        with self._lock:
+            end = self._size + rows
+            self._reserve(end)
+            self._timestamps[self._size:end] = timestamps
+            for i, field in enumerate(FIELDS):
+                self._values[field][self._size:end] = values[:, i]
+            needs_sort = (
+                np.any(np.diff(timestamps) < 0)
+                or (self._size > 0 and timestamps[0] < self._timestamps[self._size - 1])
+            )
+            self._size = end
+            if needs_sort:
+                order = np.argsort(self._timestamps[:end], kind="stable")
+                self._timestamps[:end] = self._timestamps[:end][order]
+                for field in FIELDS:
+                    self._values[field][:end] = self._values[field][:end][order]
+
+    def _drop(self, start: int, end: int) -> int:
+        """Remove the readings with ``start <= timestamp < end``. Returns the number removed."""
+        with self._lock:
+            timestamps = self._timestamps[:self._size]
+            lo = int(np.searchsorted(timestamps, start, side="left"))
+            hi = int(np.searchsorted(timestamps, end, side="left"))
+            removed = hi - lo
+            if removed:
+                tail = self._size - hi
+                self._timestamps[lo:lo + tail] = self._timestamps[hi:self._size]
+                for field in FIELDS:
+                    self._values[field][lo:lo + tail] = self._values[field][hi:self._size]
+                self._size -= removed
+            return removed
+
+    def _reserve(self, capacity: int):
+        if capacity <= len(self._timestamps):
+            return
+        new_capacity = max(capacity, 2 * len(self._timestamps))
+        timestamps = np.empty(new_capacity, dtype=np.int64)
+        timestamps[:self._size] = self._timestamps[:self._size]
+        self._timestamps = timestamps
+        for field in FIELDS:
+            values = np.empty(new_capacity, dtype=np.float64)
+            values[:self._size] = self._values[field][:self._size]
+            self._values[field] = values
+
+    def sync(
+        self,
+        index: BlobIndex,
+        bucket,
+        archive_index: Optional[BlobIndex] = None,
+        max_in_flight: int = 16,
+        chunk_size: int = 1000
+    ) -> int:
+        """
+        Load new day archives, then download and append the loose blobs the
+        index has gained since the last sync. Both indexes are refreshed by
+        the caller. Loose blobs of archived days are skipped, unless the day
+        now has loose blobs its archive was not built from; then the day is
+        read from its loose blobs instead. Readings are appended in chunks so
+        progress survives a failed download.
+        """
+        with self._sync_lock:
+            added = self._sync_archives(archive_index, index, bucket, max_in_flight) if archive_index is not None else 0
+            names = index.names_from(self._consumed)
+            added += self._reopen_days(index, bucket, names, max_in_flight)
+            for offset in range(0, len(names), chunk_size):
+                chunk = names[offset:offset + chunk_size]
+                loose = [name for name in chunk if reading_day(name) not in self._archived_days]
+                readings = [reading for _, reading in fetch_sensor_data(bucket, loose, max_in_flight=max_in_flight)]
+                self.append(readings)
+                self._loose_days.update(reading_day(name) for name in loose)
+                self._consumed += len(chunk)
+                added += len(readings)
+            return added
+
+    def _sync_archives(self, archive_index: BlobIndex, index: BlobIndex, bucket, max_in_flight: int) -> int:
+        names = archive_index.names_from(self._archives_consumed)
+        wanted = {}
+        for name in names:
+            day = reading_day(name)
+            # A day already read from loose JSON stays loose so readings are not duplicated, and an
+            # archive missing some of its day's loose objects is not used
+            if day is None or day in self._loose_days or archive_sources(name) < len(day_names(index, day)):
+                continue
+            current = self._archived_days.get(day)
+            if current is None or archive_sources(name) > archive_sources(current):
+                wanted[day] = name
+        added = 0
+        for name, (timestamps, values) in fetch_blobs(bucket, list(wanted.values()), decode_archive, max_in_flight=max_in_flight):
+            day = reading_day(name)
+            if day in self._archived_days:
+                # A newer archive of the day replaces the one read before
+                added -= self._drop(*day_bounds(day))
+            self.append_arrays(timestamps, values)
+            self._archived_days[day] = name
+            added += len(timestamps)
+        self._archives_consumed += len(names)
+        return added
+
+    def _reopen_days(self, index: BlobIndex, bucket, names: List[str], max_in_flight: int) -> int:
+        """Read archived days that gained loose blobs their archive was not built from from their loose blobs"""
+        new_names = set(names)
+        added = 0
+        for day in sorted({reading_day(name) for name in names}.intersection(self._archived_days)):
+            loose = day_names(index, day)
+            if archive_sources(self._archived_days[day]) >= len(loose):
+                continue
+            added -= self._drop(*day_bounds(day))
+            del self._archived_days[day]
+            self._loose_days.add(day)
+            # The day's new blobs are read with the rest; the ones skipped by earlier syncs are read here
+            earlier = [name for name in loose if name not in new_names]
+            readings = [reading for _, reading in fetch_sensor_data(bucket, earlier, max_in_flight=max_in_flight)]
+            self.append(readings)
+            added += len(readings)
+        return added
+
+    def window(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[np.ndarray, dict]:
+        """Return copies of the readings with ``start <= timestamp < end``, oldest first"""
+        with self._lock:
+            timestamps = self._timestamps[:self._size]
+            lo = int(np.searchsorted(timestamps, start, side="left")) if start is not None else 0
+            hi = int(np.searchsorted(timestamps, end, side="left")) if end is not None else self._size
+            return (
+                timestamps[lo:hi].copy(),
+                {field: self._values[field][lo:hi].copy() for field in FIELDS}
+            )
+
+    def query(
+        self,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> Tuple[np.ndarray, dict]:
+        """
+        Return the newest readings with ``start <= timestamp < end`` (epoch
+        microseconds), newest first, as a timestamp array and a dict of columns.
+        """
+        with self._lock:
+            timestamps = self._timestamps[:self._size]
+            lo = int(np.searchsorted(timestamps, start, side="left")) if start is not None else 0
+            hi = int(np.searchsorted(timestamps, end, side="left")) if end is not None else self._size
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            if hi <= lo:
+                return np.empty(0, dtype=np.int64), {field: np.empty(0) for field in FIELDS}
+            selected = slice(hi - 1, lo - 1 if lo > 0 else None, -1)
+            return (
+                timestamps[selected].copy(),
+                {field: self._values[field][:self._size][selected].copy() for field in FIELDS}
+            )
+
+def to_sensor_data(timestamps: np.ndarray, columns: dict) -> List[SensorData]:
+    return [
+        SensorData(timestamp=from_epoch_us(ts), temperature=t, humidity=h, pressure=p)
+        for ts, t, h, p in zip(
+            timestamps.tolist(),
+            columns["temperature"].tolist(),
+            columns["humidity"].tolist(),
+            columns["pressure"].tolist()
+        )
+    ]
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Set, Tuple
+
+from blob_index import BlobIndex
+from metrics import gcs_operation
+from models import SensorData, parse_sensor_data
+
+logger = logging.getLogger(__name__)
+
+# (blob name, reading) of the newest sensor_data/ object
+Update = Tuple[str, SensorData]
+
+def poll_latest(bucket, sensor_index: BlobIndex, previous: Optional[str]) -> Optional[Update]:
+    """Return the newest reading when it differs from ``previous``; a single incremental listing otherwise"""
+    sensor_index.refresh(bucket)
+    latest = sensor_index.latest()
+    if latest is None or latest == previous:
+        return None
+    with gcs_operation("download"):
+        raw = bucket.blob(latest).download_as_string()
+    return latest, parse_sensor_data(raw)
+
+class SensorBroadcaster:
+    """
+    Fans the newest sensor reading out to every connected client.
+
+    One poller per worker watches the sensor index and downloads a reading
+    only when a new one lands, so GCS traffic does not grow with the number
+    of viewers. The poller runs only while at least one client is
+    subscribed. Each subscriber has a small queue; a client that falls
+    behind loses its oldest pending readings rather than holding up others.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[Optional[str]], Awaitable[Optional[Update]]],
+        interval_seconds: float = 15,
+        queue_size: int = 8
+    ):
+        self._poll = poll
+        self.interval_seconds = interval_seconds
+        self.queue_size = queue_size
+        self.latest: Optional[Update] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.polls = 0
+        self.published = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def publish(self, update: Update):
+        self.latest = update
+        self.published += 1
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(update)
+
+    async def _run(self):
+        while self._subscribers:
+            try:
+                update = await self._poll(self.latest[0] if self.latest else None)
+                self.polls += 1
+                if update is not None:
+                    self.publish(update)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling for new sensor data: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+def format_event(update: Update) -> str:
+    name, reading = update
+    return f"id: {name}\nevent: reading\ndata: {reading.model_dump_json()}\n\n"
+
+async def sse_events(broadcaster: SensorBroadcaster, keepalive_seconds: float = 15) -> AsyncIterator[str]:
+    """
+    Server-sent events for one client: the current reading straight away,
+    then each new one, with a comment line as keepalive while nothing changes.
+    """
+    queue = broadcaster.subscribe()
+    try:
+        sent = None
+        if broadcaster.latest is not None:
+            sent = broadcaster.latest[0]
+            yield format_event(broadcaster.latest)
+        while True:
+            try:
+                update = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if update[0] != sent:
+                sent = update[0]
+                yield format_event(update)
+    finally:
+        broadcaster.unsubscribe(queue)
@@ -0,0 +1,283 @@
+import fcntl
+import logging
+import os
+import struct
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from blob_index import BlobIndex
+from bulk_fetch import fetch_blobs
+from models import from_epoch_us
+from sensor_aggregate import STATS, aggregate
+from sensor_archive import COMPACTION_GRACE_SECONDS
+from sensor_export import export_sources, parse_source
+from sensor_store import FIELDS
+
+logger = logging.getLogger(__name__)
+
+HOUR_US = 3600 * 1_000_000
+DAY_US = 24 * HOUR_US
+TILE_WIDTHS = {"hour": HOUR_US, "day": DAY_US}
+
+TILE_DTYPE = np.dtype(
+    [("start", "<i8"), ("count", "<i8")]
+    + [(f"{field}_{stat}", "<f8") for field in FIELDS for stat in STATS]
+)
+
+# magic, tile width, watermark and tile count, all in microseconds or records
+TILE_HEADER = struct.Struct("<8sqqq")
+TILE_MAGIC = b"SHTILES1"
+
+def to_tiles(buckets: Dict[str, np.ndarray]) -> np.ndarray:
+    """Pack the output of ``sensor_aggregate.aggregate`` into tile records"""
+    tiles = np.empty(len(buckets["start"]), dtype=TILE_DTYPE)
+    for name in TILE_DTYPE.names:
+        tiles[name] = buckets[name]
+    return tiles
+
+def merge_tiles(tiles: np.ndarray, width_us: int) -> Dict[str, np.ndarray]:
+    """
+    Combine ascending tiles into buckets ``width_us`` wide, aligned to the
+    epoch, with the same keys ``aggregate`` returns. Means are weighted by
+    each tile's reading count.
+    """
+    if len(tiles) == 0:
+        return aggregate(np.empty(0, dtype=np.int64), {}, width_us)
+    bucket_ids = tiles["start"] // width_us
+    starts = np.flatnonzero(np.concatenate(([True], bucket_ids[1:] != bucket_ids[:-1])))
+    ends = np.append(starts[1:], len(tiles))
+    counts = np.add.reduceat(tiles["count"], starts)
+
+    result = {"start": bucket_ids[starts] * width_us, "count": counts}
+    for field in FIELDS:
+        result[f"{field}_min"] = np.minimum.reduceat(tiles[f"{field}_min"], starts)
+        result[f"{field}_max"] = np.maximum.reduceat(tiles[f"{field}_max"], starts)
+        result[f"{field}_mean"] = np.add.reduceat(tiles[f"{field}_mean"] * tiles["count"], starts) / counts
+        result[f"{field}_last"] = tiles[f"{field}_last"][ends - 1]
+    return result
+
+class TileFile:
+    """
+    Closed summary tiles of one width, oldest first.
+
+    On disk the file is a fixed header followed by ``TILE_DTYPE`` records,
+    mapped with ``np.memmap`` so loading is instant whatever its length.
+    Tiles are only ever appended, and the header is written after them, so
+    the watermark it records (the end of the last closed tile) always
+    describes complete records. Writers take an exclusive lock and pick up
+    tiles another worker appended first.
+    """
+
+    def __init__(self, width_us: int, path: Optional[str] = None):
+        self.width_us = width_us
+        self.path = path
+        self.watermark = 0
+        self._tiles = np.empty(0, dtype=TILE_DTYPE)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    self._read(f)
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Failed to load sensor tiles {path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self._tiles)
+
+    @property
+    def tiles(self) -> np.ndarray:
+        return self._tiles
+
+    def _read(self, f) -> bool:
+        """Map the tiles the header on disk describes. Returns False for a file of another format or width."""
+        f.seek(0)
+        header = f.read(TILE_HEADER.size)
+        if not header:
+            return False
+        magic, width_us, watermark, count = TILE_HEADER.unpack(header)
+        if magic != TILE_MAGIC or width_us != self.width_us:
+            logger.warning(f"Ignoring sensor tiles {self.path} of another format or width")
+            return False
+        if count:
+            self._tiles = np.memmap(self.path, dtype=TILE_DTYPE, mode="r", offset=TILE_HEADER.size, shape=(count,))
+        self.watermark = watermark
+        return True
+
+    def append(self, tiles: np.ndarray, watermark: int):
+        """Add tiles closed up to ``watermark`` after the existing ones"""
+        if not self.path:
+            self._tiles = np.concatenate((self._tiles, tiles))
+            self.watermark = watermark
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if self._read(f):
+                    if self.watermark >= watermark:
+                        return
+                    # Another worker may have closed some of these tiles already
+                    tiles = tiles[tiles["start"] >= self.watermark]
+                    offset = len(self._tiles)
+                else:
+                    # A new, emptied or foreign file is rewritten from the tiles held here
+                    f.truncate(0)
+                    tiles = np.concatenate((np.array(self._tiles), tiles))
+                    offset = 0
+                count = offset + len(tiles)
+                with open(self.path, "r+b") as out:
+                    out.seek(TILE_HEADER.size + offset * TILE_DTYPE.itemsize)
+                    out.write(tiles.tobytes())
+                    out.flush()
+                    os.fsync(out.fileno())
+                    out.seek(0)
+                    out.write(TILE_HEADER.pack(TILE_MAGIC, self.width_us, watermark, count))
+                    out.flush()
+                    os.fsync(out.fileno())
+                self._read(f)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class SensorTiles:
+    """
+    Hourly and daily min, max, mean, last and count of every sensor field.
+
+    Closed tiles live in one TileFile per width under ``directory``, so a
+    new worker answers long-range aggregates from the files instead of
+    rebuilding history from sensor_data/. Readings after the watermark of
+    the daily file are kept in memory to answer the still-open tiles. A
+    tile only closes once the newest reading is ``grace_seconds`` past its
+    end, so readings uploaded late are still folded into it. The first
+    ``sync`` reads everything after the watermark, so an interrupted rebuild
+    carries on from there; later ones read only the blobs the sensor index
+    has gained since.
+    """
+
+    def __init__(self, directory: Optional[str] = None, grace_seconds: float = COMPACTION_GRACE_SECONDS):
+        self.files = {
+            name: TileFile(width_us, os.path.join(directory, f"sensor_{name}.tiles") if directory else None)
+            for name, width_us in TILE_WIDTHS.items()
+        }
+        self.grace_us = int(grace_seconds * 1_000_000)
+        self._timestamps = np.empty(0, dtype=np.int64)
+        self._values = np.empty((0, len(FIELDS)), dtype=np.float64)
+        # How many names of the sensor index have been folded in, once the first sync has caught up
+        self._loose_seen: Optional[int] = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+    @property
+    def watermark(self) -> int:
+        """Every reading before this time is in a closed tile of every width"""
+        return min(tile_file.watermark for tile_file in self.files.values())
+
+    def add(self, timestamps: np.ndarray, values: np.ndarray) -> int:
+        """
+        Fold in readings, skipping those in closed tiles and those whose
+        timestamp was already folded in. Returns the number added.
+        """
+        with self._lock:
+            keep = (timestamps >= self.watermark) & ~np.isin(timestamps, self._timestamps)
+            if not keep.any():
+                return 0
+            timestamps = np.concatenate((self._timestamps, timestamps[keep]))
+            values = np.concatenate((self._values, values[keep]))
+            order = np.argsort(timestamps, kind="stable")
+            self._timestamps = timestamps[order]
+            self._values = values[order]
+
+            # A reading grace_us into a later tile closes every tile before it
+            newest = int(self._timestamps[-1]) - self.grace_us
+            for tile_file in self.files.values():
+                boundary = newest // tile_file.width_us * tile_file.width_us
+                if boundary <= tile_file.watermark:
+                    continue
+                lo, hi = np.searchsorted(self._timestamps, [tile_file.watermark, boundary])
+                closed = aggregate(self._timestamps[lo:hi], self._columns(lo, hi), tile_file.width_us)
+                tile_file.append(to_tiles(closed), boundary)
+
+            first_open = int(np.searchsorted(self._timestamps, self.watermark))
+            self._timestamps = self._timestamps[first_open:]
+            self._values = self._values[first_open:]
+            return int(keep.sum())
+
+    def _columns(self, lo: int, hi: int) -> Dict[str, np.ndarray]:
+        return {field: self._values[lo:hi, i] for i, field in enumerate(FIELDS)}
+
+    def sync(
+        self,
+        bucket,
+        sensor_index: BlobIndex,
+        archive_index: BlobIndex,
+        max_in_flight: int = 16,
+        chunk_size: int = 10000
+    ) -> int:
+        """
+        Fold in new readings. The first sync reads the day archives and
+        loose blobs after the watermark; later ones read the loose blobs the
+        sensor index has gained since, including late ones that sort below
+        its newest name. Refresh both indexes first. Readings are added in
+        chunks, so a failure part way keeps the tiles closed so far.
+        """
+        with self._sync_lock:
+            seen = len(sensor_index)
+            if self._loose_seen is None:
+                sources = export_sources(sensor_index, archive_index, from_epoch_us(self.watermark))
+            else:
+                sources = sensor_index.names_from(self._loose_seen)[:seen - self._loose_seen]
+            added = 0
+            blocks = []
+            for _, block in fetch_blobs(bucket, sources, parse_source, max_in_flight=max_in_flight):
+                blocks.append(block)
+                if sum(len(timestamps) for timestamps, _ in blocks) >= chunk_size:
+                    added += self._add_blocks(blocks)
+                    blocks = []
+            added += self._add_blocks(blocks)
+            self._loose_seen = seen
+            return added
+
+    def _add_blocks(self, blocks) -> int:
+        if not blocks:
+            return 0
+        timestamps = np.concatenate([timestamps for timestamps, _ in blocks])
+        values = np.concatenate([values for _, values in blocks])
+        order = np.argsort(timestamps, kind="stable")
+        return self.add(timestamps[order], values[order])
+
+    def tile_width(self, width_us: int, start_us: Optional[int] = None, end_us: Optional[int] = None) -> Optional[int]:
+        """The widest tile that can build ``width_us`` buckets over ``[start, end)``, if any"""
+        for tile_file in sorted(self.files.values(), key=lambda tile_file: -tile_file.width_us):
+            tile_us = tile_file.width_us
+            if width_us % tile_us == 0 and all(bound is None or bound % tile_us == 0 for bound in (start_us, end_us)):
+                return tile_us
+        return None
+
+    def query(self, width_us: int, start_us: Optional[int] = None, end_us: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Buckets ``width_us`` wide over ``[start, end)``, shaped like
+        ``sensor_aggregate.aggregate``, or None when no tile width divides
+        the bucket width and both bounds.
+        """
+        tile_us = self.tile_width(width_us, start_us, end_us)
+        if tile_us is None:
+            return None
+        tile_file = next(tile_file for tile_file in self.files.values() if tile_file.width_us == tile_us)
+        with self._lock:
+            stored = tile_file.tiles
+            lo = int(np.searchsorted(stored["start"], start_us)) if start_us is not None else 0
+            hi = int(np.searchsorted(stored["start"], end_us)) if end_us is not None else len(stored)
+            closed = np.array(stored[lo:hi])
+
+            open_lo = max(tile_file.watermark, start_us) if start_us is not None else tile_file.watermark
+            lo, hi = np.searchsorted(self._timestamps, [open_lo, end_us if end_us is not None else np.iinfo(np.int64).max])
+            current = to_tiles(aggregate(self._timestamps[lo:hi], self._columns(lo, hi), tile_us))
+        return merge_tiles(np.concatenate((closed, current)), width_us)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                **{f"{name}_tiles": len(tile_file) for name, tile_file in self.files.items()},
+                "watermark": self.watermark,
+                "open_readings": len(self._timestamps),
+            }
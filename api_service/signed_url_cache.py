@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+class SignedUrlCache:
+    """
+    Bounded in-process cache of signed URLs.
+
+    Entries are reused until they come within ``min_ttl_seconds`` of their
+    expiry. When the cache is full, entries that are already too close to
+    expiring are dropped first and the least recently used entry after that.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        min_ttl_seconds: float = 3600,
+        clock: Callable[[], float] = time.time
+    ):
+        self.max_entries = max_entries
+        self.min_ttl_seconds = min_ttl_seconds
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _is_fresh(self, expires_at: float, now: float) -> bool:
+        return expires_at - now > self.min_ttl_seconds
+
+    def get(self, key: Hashable) -> Optional[str]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            url, expires_at = entry
+            if not self._is_fresh(expires_at, now):
+                del self._entries[key]
+                self.evictions += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return url
+
+    def put(self, key: Hashable, url: str, expires_at: float):
+        now = self._clock()
+        with self._lock:
+            self._entries[key] = (url, expires_at)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.max_entries:
+                self._purge_expiring(now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_sign(self, key: Hashable, ttl_seconds: float, sign: Callable[[], str]) -> str:
+        """Return the cached URL for ``key`` or sign a new one valid for ``ttl_seconds``"""
+        url = self.get(key)
+        if url is not None:
+            return url
+        expires_at = self._clock() + ttl_seconds
+        url = sign()
+        self.put(key, url, expires_at)
+        return url
+
+    def get_many_or_sign(
+        self,
+        keys: Sequence[Hashable],
+        ttl_seconds: float,
+        sign_many: Callable[[List[Hashable]], List[str]]
+    ) -> List[str]:
+        """Return URLs for all ``keys``, signing every cache miss in a single ``sign_many`` call"""
+        urls = [self.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, url in zip(keys, urls) if url is None))
+        if not missing:
+            return urls
+        expires_at = self._clock() + ttl_seconds
+        signed = dict(zip(missing, sign_many(missing)))
+        for key, url in signed.items():
+            self.put(key, url, expires_at)
+        return [url if url is not None else signed[key] for key, url in zip(keys, urls)]
+
+    def _purge_expiring(self, now: float):
+        stale = [key for key, (_, expires_at) in self._entries.items() if not self._is_fresh(expires_at, now)]
+        for key in stale:
+            del self._entries[key]
+        self.evictions += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
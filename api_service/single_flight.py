@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, NamedTuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class _Result(NamedTuple):
+    value: object
+    at: float
+
+class SingleFlight:
+    """
+    Merges concurrent identical async operations into one.
+
+    Callers asking for a key that is already in flight await the same task
+    instead of starting their own, so a burst of identical requests costs
+    one GCS call. With ``fresh_seconds`` the last result for a key is
+    reused for that long without any call, and with ``stale_seconds`` it is
+    then served up to that age while a single background call revalidates
+    it (stale-while-revalidate). Waiters are shielded, so a client going away
+    does not cancel the call the others are waiting on.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._results: Dict[Hashable, _Result] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.stale_served = 0
+        self.fresh_served = 0
+
+    def _running(self, key: Hashable):
+        task = self._inflight.get(key)
+        # A task left behind by a loop that has since closed can never finish
+        if task is not None and task.get_loop() is not asyncio.get_running_loop():
+            del self._inflight[key]
+            return None
+        return task
+
+    def _start(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[T]],
+        keep: bool,
+        background: bool = False
+    ) -> asyncio.Task:
+        task = asyncio.ensure_future(factory())
+        self._inflight[key] = task
+        self.started += 1
+
+        def finished(task: asyncio.Task):
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+            if task.cancelled():
+                return
+            error = task.exception()
+            if error is not None:
+                # Waiters see the error themselves; only a revalidation nobody awaits needs logging
+                if background:
+                    logger.warning(f"Background refresh of {key!r} failed: {error}")
+            elif keep:
+                self._results[key] = _Result(task.result(), self._clock())
+
+        task.add_done_callback(finished)
+        return task
+
+    async def do(
+        self,
+        key: Hashable,
+        factory: Callable[[], Awaitable[T]],
+        stale_seconds: float = 0,
+        fresh_seconds: float = 0
+    ) -> T:
+        """
+        Await ``factory()`` for ``key``, joining a call already in flight. A
+        result younger than ``fresh_seconds`` is returned without any call;
+        one younger than ``stale_seconds`` is returned while one background
+        call revalidates it.
+        """
+        task = self._running(key)
+        window = max(stale_seconds, fresh_seconds)
+        result = self._results.get(key) if window > 0 else None
+        if result is not None:
+            age = self._clock() - result.at
+            if age < fresh_seconds:
+                self.fresh_served += 1
+                return result.value
+            if age < stale_seconds:
+                # The revalidated result is fresh again, so this runs at most once per fresh period
+                if task is None:
+                    self._start(key, factory, keep=True, background=True)
+                self.stale_served += 1
+                return result.value
+        if task is None:
+            # Keep results for any key that has been read with a fresh or stale window
+            task = self._start(key, factory, keep=window > 0 or key in self._results)
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def clear(self):
+        self._results.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "stale_served": self.stale_served,
+            "fresh_served": self.fresh_served,
+        }
@@ -1,10 +1,16 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
-from datetime import datetime, timedelta
-from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta, timezone
+from unittest.mock import DEFAULT, MagicMock, patch
 import google.cloud.storage
-from main import app, get_storage_client
-from config import Settings
+from google.api_core.exceptions import NotFound, PreconditionFailed
+from main import (
+    app, get_storage_client, get_signed_url_cache, get_sensor_index, get_sensor_series, get_archive_index,
+    get_image_catalog, get_derivative_cache, get_timelapse_renderer, get_local_storage_client,
+    get_sensor_broadcaster, get_response_cache, get_async_storage, get_single_flight, get_sensor_tiles
+)
+from config import Settings, get_settings
 from google.cloud.storage.blob import Blob
 from google.cloud.storage.bucket import Bucket
 
@@ -40,16 +46,26 @@ def mock_gcs_client(mocker):
     
     mock_bucket.list_blobs.side_effect = mock_list_blobs
     
+    # bucket.blob(name) returns the listed blob of that name, like a real bucket
+    def mock_blob_lookup(blob_name, *args, **kwargs):
+        prefix = blob_name.rsplit('/', 1)[0] + '/'
+        for listed_blob in mock_bucket.list_blobs.side_effect(prefix=prefix):
+            if listed_blob.name == blob_name:
+                return listed_blob
+        return DEFAULT
+    
+    mock_bucket.blob.side_effect = mock_blob_lookup
+    
     # Setup mock client behavior
     mock_client = MagicMock(spec=google.cloud.storage.Client)
     mock_client.bucket.return_value = mock_bucket
     
     # Setup mock blob behavior
-    def mock_exists():
+    def mock_exists(*args, **kwargs):
         return "nonexistent" not in mock_blob.name
     mock_blob.exists.side_effect = mock_exists
     
-    def mock_download_as_string():
+    def mock_download_as_string(*args, **kwargs):
         return b'{"temperature": 25.5, "humidity": 60.0, "pressure": 1013.25, "timestamp": "2024-01-01T12:00:00Z"}'
     mock_blob.download_as_string.side_effect = mock_download_as_string
     
@@ -78,6 +94,50 @@ def mock_gcs_client(mocker):
     # Clean up the override after the test
     app.dependency_overrides.clear()
 
+@pytest.fixture(autouse=True)
+def reset_signed_url_cache():
+    get_signed_url_cache().clear()
+    yield
+    get_signed_url_cache().clear()
+
+# Per-worker state built from lru_cache providers, rebuilt for every test
+CACHED_PROVIDERS = (
+    get_sensor_index, get_archive_index, get_sensor_series, get_image_catalog,
+    get_derivative_cache, get_timelapse_renderer, get_sensor_broadcaster, get_response_cache,
+    get_async_storage, get_single_flight, get_sensor_tiles
+)
+
+@pytest.fixture(autouse=True)
+def reset_indexes():
+    for cached in CACHED_PROVIDERS:
+        cached.cache_clear()
+    yield
+    for cached in CACHED_PROVIDERS:
+        cached.cache_clear()
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    """Run the app on the in-memory storage backend and return its bucket"""
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    get_settings.cache_clear()
+    get_local_storage_client.cache_clear()
+    app.dependency_overrides.clear()
+    yield get_storage_client().bucket(get_settings().GCS_BUCKET)
+    get_settings.cache_clear()
+    get_local_storage_client.cache_clear()
+
+@pytest.fixture
+def fresh_reads(monkeypatch):
+    """Turn off listing reuse and stale-while-revalidate so every request sees the bucket as it is now"""
+    for name in (
+        "SENSOR_LATEST_FRESH_SECONDS", "SENSOR_HISTORY_FRESH_SECONDS", "IMAGE_LIST_FRESH_SECONDS",
+        "SENSOR_LATEST_STALE_SECONDS", "SENSOR_HISTORY_STALE_SECONDS", "IMAGE_LIST_STALE_SECONDS"
+    ):
+        monkeypatch.setenv(name, "0")
+    get_settings.cache_clear()
+    yield
+    get_settings.cache_clear()
+
 @pytest.fixture
 def test_settings():
     return Settings(
@@ -109,4 +169,58 @@ def sample_image_data():
         "url": "https://storage.googleapis.com/test-bucket/images/capture_20240101_120000.jpg?w=1280&q=85&signed=true",
         "thumbnail_url": "https://storage.googleapis.com/test-bucket/images/capture_20240101_120000.jpg?w=128&q=60&signed=true",
         "timestamp": datetime(2024, 1, 1, 12, 0, 0)
-    }
\ No newline at end of file
+    }
+
+class FakeBlob:
+    """Lightweight stand-in for a GCS blob backed by a dict of objects"""
+
+    def __init__(self, name, objects):
+        self.name = name
+        self._objects = objects
+
+    def download_as_string(self, *args, **kwargs):
+        if self.name not in self._objects:
+            raise NotFound(self.name)
+        return self._objects[self.name]
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None, **kwargs):
+        if if_generation_match == 0 and self.name in self._objects:
+            raise PreconditionFailed(self.name)
+        self._objects[self.name] = data
+
+@pytest.fixture
+def make_sensor_bucket():
+    """
+    Build a fake bucket holding one JSON reading per minute from 2024-06-01,
+    named the way crates/monitor names them, with temperature 20 + minute
+    """
+    def factory(count, start=datetime(2024, 6, 1, tzinfo=timezone.utc)):
+        objects = {}
+        for minute in range(count):
+            timestamp = start + timedelta(minutes=minute)
+            name = f"sensor_data/{timestamp.strftime('%Y%m%d_%H%M%S')}.json"
+            objects[name] = json.dumps({
+                "temperature": 20.0 + minute,
+                "humidity": 50.0,
+                "pressure": 1000.0,
+                "timestamp": timestamp.isoformat(),
+            }).encode()
+
+        bucket = MagicMock(spec=Bucket)
+        bucket.name = "test-bucket"
+
+        def list_blobs(prefix=None, start_offset=None, **kwargs):
+            return [
+                FakeBlob(name, objects) for name in sorted(objects)
+                if name.startswith(prefix) and (start_offset is None or name >= start_offset)
+            ]
+
+        def blob(name):
+            return FakeBlob(name, objects)
+
+        bucket.list_blobs.side_effect = list_blobs
+        bucket.blob.side_effect = blob
+        bucket.objects = objects
+        return bucket
+
+    return factory
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from google.api_core.exceptions import NotFound, ServiceUnavailable
+
+from async_storage import AsyncStorage, RetryPolicy
+from blob_index import BlobIndex
+from main import app, get_async_storage
+from worker_pool import WorkerPool
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(max_workers=4)
+    yield pool
+    pool.shutdown()
+
+def make_storage(pool, delays, **policy):
+    async def sleep(delay):
+        delays.append(delay)
+    return AsyncStorage(pool, RetryPolicy(**policy), sleep=sleep, rng=lambda: 0.5)
+
+def test_retries_transient_errors_with_backoff(pool):
+    """Test transient failures are retried with growing jittered delays until a call succeeds"""
+    delays = []
+    outcomes = [ServiceUnavailable("busy"), ConnectionError("reset"), b"data"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    storage = make_storage(pool, delays, attempts=3, base_delay=0.1, max_delay=2.0)
+    assert asyncio.run(storage.call(flaky)) == b"data"
+    assert delays == [0.05, 0.1]
+
+def test_gives_up_and_skips_permanent_errors(pool):
+    """Test the last transient error is raised after the final attempt and permanent errors are not retried"""
+    delays = []
+    storage = make_storage(pool, delays, attempts=2)
+
+    def unavailable():
+        raise ServiceUnavailable("down")
+
+    with pytest.raises(ServiceUnavailable):
+        asyncio.run(storage.call(unavailable))
+    assert len(delays) == 1
+
+    def missing():
+        raise NotFound("gone")
+
+    with pytest.raises(NotFound):
+        asyncio.run(storage.call(missing))
+    assert len(delays) == 1
+
+def test_timeouts_bound_each_call(pool):
+    """Test the timeout reaches the client as its HTTP timeout and bounds the await"""
+    bucket = MagicMock()
+    bucket.list_blobs.return_value = []
+    storage = make_storage(pool, [], timeout=0.05)
+    asyncio.run(storage.refresh(BlobIndex("test-bucket", "sensor_data/"), bucket))
+    assert bucket.list_blobs.call_args.kwargs["timeout"] == 0.05
+
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(AsyncStorage(pool, RetryPolicy(attempts=3, timeout=0.01)).call(slow))
+    release.set()
+    # The expired attempt may still hold its thread, so it is not retried
+    assert calls == [1]
+
+def test_client_timeouts_are_retried(pool):
+    """Test a timeout raised by the client itself is retried like other transient errors"""
+    failures = [TimeoutError("read timed out")]
+
+    def flaky():
+        if failures:
+            raise failures.pop()
+        return "ok"
+
+    delays = []
+    assert asyncio.run(make_storage(pool, delays).call(flaky)) == "ok"
+    assert len(delays) == 1
+
+def test_slow_calls_do_not_block_others(pool):
+    """Test concurrent calls overlap on the pool instead of running one after another"""
+    storage = make_storage(pool, [])
+
+    async def scenario():
+        started = time.perf_counter()
+        await asyncio.gather(*(storage.call(time.sleep, 0.1) for _ in range(4)))
+        return time.perf_counter() - started
+
+    assert asyncio.run(scenario()) < 0.3
+
+def test_endpoint_returns_504_on_storage_timeout(client):
+    """Test a storage call that exceeds its deadline surfaces as a 504"""
+    class TimedOutStorage:
+        async def refresh(self, index, bucket, stale_seconds=0, fresh_seconds=0):
+            raise asyncio.TimeoutError()
+
+    app.dependency_overrides[get_async_storage] = TimedOutStorage
+    try:
+        response = client.get("/sensor/latest")
+    finally:
+        app.dependency_overrides.pop(get_async_storage)
+    assert response.status_code == 504
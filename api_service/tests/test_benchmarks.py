@@ -0,0 +1,26 @@
+import os
+
+from benchmarks.generate_dataset import generate
+from benchmarks.run_benchmarks import summarize
+
+def test_generate_dataset_layout(tmp_path):
+    """Test the generator names objects like the monitor and camera crates and archives closed days"""
+    summary = generate(str(tmp_path), "bench", readings=2 * 1440 + 10, images=3, archive=True, image_size=(32, 24))
+    root = tmp_path / "bench"
+
+    assert sorted(os.listdir(root / "sensor_archive")) == ["20240101_000000.npy", "20240102_000000.npy"]
+    loose = sorted(os.listdir(root / "sensor_data"))
+    assert len(loose) == summary["loose_readings"] == 10
+    assert loose[0] == "20240103_000000.json"
+    assert sorted(os.listdir(root / "images")) == [
+        "capture_20240101_000000.jpg", "capture_20240101_003000.jpg", "capture_20240101_010000.jpg"
+    ]
+
+def test_summarize_percentiles():
+    """Test latency summaries report percentiles, errors and throughput"""
+    stats = summarize([float(i) for i in range(1, 101)], errors=2, elapsed_s=2.0)
+    assert stats["requests"] == 102
+    assert stats["errors"] == 2
+    assert stats["throughput_rps"] == 51.0
+    assert stats["p50_ms"] == 50.5
+    assert stats["max_ms"] == 100.0
@@ -0,0 +1,127 @@
+import gzip
+import pytest
+from unittest.mock import MagicMock
+
+from blob_index import BlobIndex
+
+def make_bucket(names):
+    bucket = MagicMock()
+
+    def list_blobs(prefix=None, start_offset=None, **kwargs):
+        blobs = []
+        for name in sorted(names):
+            if name.startswith(prefix) and (start_offset is None or name >= start_offset):
+                blob = MagicMock()
+                blob.name = name
+                blobs.append(blob)
+        return blobs
+
+    bucket.list_blobs.side_effect = list_blobs
+    return bucket
+
+def sensor_names(count, day="20240601"):
+    return [f"sensor_data/{day}_{i // 60:02d}{i % 60:02d}00.json" for i in range(count)]
+
+def test_refresh_lists_from_last_seen_key():
+    """Test refreshes only list names after the newest indexed one"""
+    names = sensor_names(5)
+    bucket = make_bucket(names)
+    index = BlobIndex("test-bucket", "sensor_data/", suffix=".json")
+
+    assert index.refresh(bucket) == 5
+    assert index.latest() == names[-1]
+
+    names.append("sensor_data/20240601_235900.json")
+    assert index.refresh(bucket) == 1
+    assert index.latest() == "sensor_data/20240601_235900.json"
+
+    _, kwargs = bucket.list_blobs.call_args
+    assert kwargs["start_offset"] == names[-2]
+
+def test_ignores_other_suffixes():
+    """Test names without the configured suffix are not indexed"""
+    bucket = make_bucket(["sensor_data/20240601_000000.json", "sensor_data/notes.txt"])
+    index = BlobIndex("test-bucket", "sensor_data/", suffix=".json")
+    index.refresh(bucket)
+
+    assert index.names() == ["sensor_data/20240601_000000.json"]
+
+def test_relist_from_picks_up_late_names():
+    """Test names sorting below the newest one are added when relist_from overlaps them"""
+    names = sensor_names(5)
+    bucket = make_bucket(names)
+    index = BlobIndex("test-bucket", "sensor_data/", relist_from=lambda last: names[1])
+    index.refresh(bucket)
+
+    names.append("sensor_data/20240601_000230.json")
+    assert index.refresh(bucket) == 1
+    assert index.names() == sorted(names)
+    assert index.names_from(5) == ["sensor_data/20240601_000230.json"]
+    _, kwargs = bucket.list_blobs.call_args
+    assert kwargs["start_offset"] == names[1]
+    assert index.refresh(bucket) == 0
+
+def test_newest_and_range():
+    """Test newest-first and range queries"""
+    names = sensor_names(10)
+    index = BlobIndex("test-bucket", "sensor_data/")
+    index.extend(names)
+
+    assert index.newest(3) == names[:-4:-1]
+    assert index.newest(100) == names[::-1]
+    assert index.range("sensor_data/20240601_000200", "sensor_data/20240601_000500") == names[2:5]
+
+def test_snapshot_survives_restart(tmp_path):
+    """Test a new index resumes from the snapshot and only lists new names"""
+    snapshot = str(tmp_path / "sensor_data.idx.gz")
+    names = sensor_names(100)
+    bucket = make_bucket(names)
+
+    first = BlobIndex("test-bucket", "sensor_data/", snapshot_path=snapshot)
+    first.refresh(bucket)
+    first.save_snapshot()
+
+    with gzip.open(snapshot, "rt") as f:
+        assert f.readline().startswith("test-bucket\tsensor_data/")
+        assert f.readline().strip() == "20240601_000000.json"
+
+    restarted = BlobIndex("test-bucket", "sensor_data/", snapshot_path=snapshot)
+    assert len(restarted) == 100
+    assert restarted.refresh(bucket) == 0
+    _, kwargs = bucket.list_blobs.call_args
+    assert kwargs["start_offset"] == names[-1]
+
+def test_snapshot_for_other_bucket_is_ignored(tmp_path):
+    """Test a snapshot written for another bucket is not loaded"""
+    snapshot = str(tmp_path / "sensor_data.idx.gz")
+    index = BlobIndex("other-bucket", "sensor_data/", snapshot_path=snapshot)
+    index.extend(sensor_names(3))
+    index.save_snapshot()
+
+    assert len(BlobIndex("test-bucket", "sensor_data/", snapshot_path=snapshot)) == 0
+
+def test_latest_sensor_data_uses_index(client, mock_gcs_client, fresh_reads):
+    """Test /sensor/latest picks up new readings without rescanning the prefix"""
+    names = sensor_names(3)
+    bucket = make_bucket(names)
+
+    def blob(name):
+        result = MagicMock()
+        result.name = name
+        result.download_as_string.return_value = (
+            b'{"temperature": 21.0, "humidity": 50.0, "pressure": 1000.0, "timestamp": "2024-06-01T00:00:00Z"}'
+        )
+        return result
+
+    bucket.blob.side_effect = blob
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    assert client.get("/sensor/latest").status_code == 200
+    bucket.blob.assert_called_with(names[-1])
+
+    names.append("sensor_data/20240601_120000.json")
+    assert client.get("/sensor/latest").status_code == 200
+    bucket.blob.assert_called_with("sensor_data/20240601_120000.json")
+    _, kwargs = bucket.list_blobs.call_args
+    # The last grace period is listed again for readings uploaded late
+    assert kwargs["start_offset"] == "sensor_data/20240531_180200"
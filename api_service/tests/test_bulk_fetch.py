@@ -0,0 +1,87 @@
+import json
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from google.api_core.exceptions import NotFound, ServiceUnavailable
+
+from bulk_fetch import fetch_blobs, fetch_sensor_data
+
+def make_bucket(payloads, delay=None):
+    """Bucket whose blobs return ``payloads[name]``, raising it if it is an exception"""
+    bucket = MagicMock()
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def blob(name):
+        result = MagicMock()
+
+        def download():
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            try:
+                if delay:
+                    time.sleep(delay(name))
+                payload = payloads[name]
+                if isinstance(payload, Exception):
+                    raise payload
+                return payload
+            finally:
+                with lock:
+                    state["active"] -= 1
+
+        result.download_as_string.side_effect = download
+        return result
+
+    bucket.blob.side_effect = blob
+    bucket.state = state
+    return bucket
+
+def reading(temperature):
+    return json.dumps({
+        "temperature": temperature,
+        "humidity": 50.0,
+        "pressure": 1000.0,
+        "timestamp": "2024-06-01T00:00:00Z",
+    }).encode()
+
+def test_results_stream_in_key_order():
+    """Test results keep the order of the names even when downloads finish out of order"""
+    names = [f"sensor_data/{i:03d}.json" for i in range(40)]
+    bucket = make_bucket({name: reading(i) for i, name in enumerate(names)}, delay=lambda name: 0.001 * (hash(name) % 5))
+
+    results = list(fetch_sensor_data(bucket, names, max_in_flight=8))
+
+    assert [name for name, _ in results] == names
+    assert [data.temperature for _, data in results] == list(range(40))
+
+def test_concurrency_is_bounded():
+    """Test no more than max_in_flight downloads run at once"""
+    names = [f"sensor_data/{i:03d}.json" for i in range(30)]
+    bucket = make_bucket({name: reading(i) for i, name in enumerate(names)}, delay=lambda name: 0.005)
+
+    list(fetch_sensor_data(bucket, names, max_in_flight=4))
+
+    assert 1 < bucket.state["peak"] <= 4
+
+def test_bad_blobs_are_skipped():
+    """Test malformed, incomplete and deleted blobs do not fail the batch"""
+    payloads = {
+        "sensor_data/a.json": reading(1),
+        "sensor_data/b.json": b'{"invalid": json}',
+        "sensor_data/c.json": json.dumps({"temperature": 25.5}).encode(),
+        "sensor_data/d.json": NotFound("deleted"),
+        "sensor_data/e.json": reading(5),
+    }
+    results = list(fetch_sensor_data(make_bucket(payloads), sorted(payloads)))
+
+    assert [name for name, _ in results] == ["sensor_data/a.json", "sensor_data/e.json"]
+
+def test_upstream_errors_are_raised():
+    """Test errors other than a bad blob propagate to the caller"""
+    payloads = {"sensor_data/a.json": reading(1), "sensor_data/b.json": ServiceUnavailable("down")}
+
+    with pytest.raises(ServiceUnavailable):
+        list(fetch_blobs(make_bucket(payloads), sorted(payloads), json.loads))
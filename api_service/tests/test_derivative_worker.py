@@ -0,0 +1,123 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from blob_index import BlobIndex
+from derivative_worker import DerivativePregenerator
+from image_catalog import ImageCatalog
+from image_derivatives import PRESETS, DerivativeCache, derivative_name
+from local_storage import LocalStorageClient
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_jpeg(width=640, height=480):
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize((width, height)).convert("RGB").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+def make_pregenerator(bucket, **kwargs):
+    catalog = ImageCatalog(BlobIndex("test-bucket", "images/", suffix=".jpg", delimiter="/"))
+    return DerivativePregenerator(catalog, DerivativeCache(), **kwargs)
+
+def test_renders_every_preset_on_a_process_pool():
+    """Test new captures get every preset derivative rendered and later passes skip them"""
+    bucket = LocalStorageClient.in_memory().bucket("test-bucket")
+    bucket.blob("images/capture_20250601_080000.jpg").upload_from_string(make_jpeg())
+    bucket.blob("images/capture_20250601_083000.jpg").upload_from_string(make_jpeg())
+    pregenerator = make_pregenerator(bucket, processes=1)
+    try:
+        assert pregenerator.run_once(bucket) == 2
+        for variant in PRESETS.values():
+            data = bucket.blob(derivative_name("images/capture_20250601_083000.jpg", variant)).download_as_bytes()
+            assert Image.open(io.BytesIO(data)).width == min(variant.width, 640)
+
+        assert pregenerator.run_once(bucket) == 0
+        assert pregenerator.stats()["processed"] == 2
+    finally:
+        pregenerator.stop()
+
+def test_existing_derivatives_are_not_rendered_again():
+    """Test derivatives already in the bucket, e.g. from another worker, count as warm"""
+    bucket = LocalStorageClient.in_memory().bucket("test-bucket")
+    bucket.blob("images/capture_20250601_080000.jpg").upload_from_string(make_jpeg())
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        make_pregenerator(bucket, executor=executor).run_once(bucket)
+        pregenerator = make_pregenerator(bucket, executor=executor)
+        assert pregenerator.pending(bucket) == []
+        assert pregenerator.run_once(bucket) == 0
+
+def test_reports_backlog_lag_and_failures():
+    """Test progress and lag metrics while captures wait, and failed originals are not retried"""
+    bucket = LocalStorageClient.in_memory().bucket("test-bucket")
+    bucket.blob("images/capture_20250601_080000.jpg").upload_from_string(make_jpeg())
+    bucket.blob("images/capture_20250601_083000.jpg").upload_from_string(b"not a jpeg")
+    clock = FakeClock()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pregenerator = make_pregenerator(bucket, executor=executor, clock=clock)
+
+        assert pregenerator.pending(bucket) == [
+            "images/capture_20250601_083000.jpg",
+            "images/capture_20250601_080000.jpg",
+        ]
+        clock.now += 30
+        stats = pregenerator.stats()
+        assert stats["backlog"] == 2
+        assert stats["lag_seconds"] == 30
+
+        assert pregenerator.run_once(bucket) == 1
+        stats = pregenerator.stats()
+        assert stats["processed"] == 1
+        assert stats["failed"] == 1
+        assert stats["backlog"] == 0
+        assert stats["lag_seconds"] == 0
+        assert pregenerator.pending(bucket) == []
+
+def test_only_the_lock_holder_renders(tmp_path, mocker):
+    """Test workers sharing a lock file render once between them, and each pass marks only new derivatives"""
+    bucket = LocalStorageClient.in_memory().bucket("test-bucket")
+    bucket.blob("images/capture_20250601_080000.jpg").upload_from_string(make_jpeg())
+    lock_path = str(tmp_path / "derivatives.lock")
+    with ThreadPoolExecutor(max_workers=1) as executor, ThreadPoolExecutor(max_workers=1) as other_executor:
+        leader = make_pregenerator(bucket, executor=executor, lock_path=lock_path)
+        follower = make_pregenerator(bucket, executor=other_executor, lock_path=lock_path)
+        assert leader.run_once(bucket) == 1
+        assert follower.run_once(bucket) == 0
+        assert (leader.stats()["leader"], follower.stats()["leader"]) == (True, False)
+        # The follower still learns about the leader's derivatives from its listings
+        assert follower.pending(bucket) == []
+
+        bucket.blob("images/capture_20250601_083000.jpg").upload_from_string(make_jpeg())
+        assert leader.run_once(bucket) == 1
+        leader.run_once(bucket)
+        # With nothing new listed, a pass examines no names
+        mark = mocker.spy(leader.derivative_cache, "mark")
+        query = mocker.spy(leader.catalog, "query")
+        assert leader.run_once(bucket) == 0
+        assert [len(call.args[0]) for call in mark.call_args_list] == [0] * len(PRESETS)
+        query.assert_not_called()
+
+        leader.stop()
+        bucket.blob("images/capture_20250601_090000.jpg").upload_from_string(make_jpeg())
+        assert follower.run_once(bucket) == 1
+
+def test_failed_uploads_are_retried(mocker):
+    """Test a capture whose derivatives could not be uploaded stays pending and is rendered on the next pass"""
+    bucket = LocalStorageClient.in_memory().bucket("test-bucket")
+    bucket.blob("images/capture_20250601_080000.jpg").upload_from_string(make_jpeg())
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        pregenerator = make_pregenerator(bucket, executor=executor)
+        mocker.patch.object(pregenerator.derivative_cache, "store", side_effect=ConnectionError("upload failed"))
+
+        assert pregenerator.run_once(bucket) == 0
+        assert pregenerator.stats()["failed"] == 0
+        assert pregenerator.pending(bucket) == ["images/capture_20250601_080000.jpg"]
+
+        mocker.stopall()
+        assert pregenerator.run_once(bucket) == 1
+        assert pregenerator.pending(bucket) == []
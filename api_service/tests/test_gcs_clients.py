@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+
+import gcs_clients
+from gcs_clients import CredentialsManager
+
+class FakeCredentials:
+    def __init__(self, lifetime=timedelta(hours=1)):
+        self.lifetime = lifetime
+        self.token = None
+        self.expiry = None
+        self.refresh_count = 0
+
+    def refresh(self, request):
+        self.refresh_count += 1
+        self.token = f"token-{self.refresh_count}"
+        self.expiry = datetime.utcnow() + self.lifetime
+
+@pytest.fixture
+def shared_clients():
+    gcs_clients.shutdown()
+    yield
+    gcs_clients.shutdown()
+
+def test_credentials_discovered_and_refreshed_once():
+    """Test repeated access reuses the discovered credentials and token"""
+    credentials = FakeCredentials()
+    factory = MagicMock(return_value=(credentials, "test-project"))
+    manager = CredentialsManager(credentials_factory=factory)
+
+    for _ in range(5):
+        assert manager.credentials.token == "token-1"
+
+    factory.assert_called_once()
+    assert credentials.refresh_count == 1
+    assert manager.project == "test-project"
+
+def test_credentials_refreshed_inside_margin():
+    """Test a token within the refresh margin is refreshed before use"""
+    credentials = FakeCredentials(lifetime=timedelta(seconds=60))
+    manager = CredentialsManager(
+        refresh_margin_seconds=300,
+        credentials_factory=lambda: (credentials, None)
+    )
+
+    assert manager.credentials.token == "token-1"
+    assert manager.credentials.token == "token-2"
+
+def test_background_refresh_thread_refreshes_token():
+    """Test the refresh thread renews the token without any request"""
+    credentials = FakeCredentials(lifetime=timedelta(seconds=301))
+    manager = CredentialsManager(
+        refresh_margin_seconds=300,
+        credentials_factory=lambda: (credentials, None)
+    )
+    manager.start()
+    try:
+        deadline = datetime.utcnow() + timedelta(seconds=5)
+        while credentials.refresh_count < 2 and datetime.utcnow() < deadline:
+            manager._stop.wait(0.05)
+    finally:
+        manager.stop()
+
+    assert credentials.refresh_count >= 2
+
+def test_storage_client_shared_per_process(mocker, shared_clients):
+    """Test the storage client is only built once per worker"""
+    credentials = FakeCredentials()
+    mocker.patch("google.auth.default", return_value=(credentials, "test-project"))
+    mocker.patch.object(CredentialsManager, "start")
+    client_cls = mocker.patch("google.cloud.storage.Client")
+
+    first = gcs_clients.get_shared_storage_client()
+    second = gcs_clients.get_shared_storage_client()
+
+    assert first is second
+    client_cls.assert_called_once_with(credentials=credentials, project="test-project")
@@ -0,0 +1,80 @@
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from blob_index import BlobIndex
+from image_catalog import ImageCatalog, capture_relist_start, parse_capture_time
+
+def make_bucket(names):
+    bucket = MagicMock()
+
+    def list_blobs(prefix=None, start_offset=None, **kwargs):
+        blobs = []
+        for name in sorted(names):
+            if name.startswith(prefix) and (start_offset is None or name >= start_offset):
+                blob = MagicMock()
+                blob.name = name
+                blobs.append(blob)
+        return blobs
+
+    bucket.list_blobs.side_effect = list_blobs
+    return bucket
+
+def capture_names(count):
+    return [f"images/capture_20250601_{i // 2:02d}{(i % 2) * 30:02d}00.jpg" for i in range(count)]
+
+def make_catalog():
+    return ImageCatalog(BlobIndex("test-bucket", "images/", suffix=".jpg", delimiter="/"))
+
+def test_parse_capture_time():
+    """Test capture timestamps are parsed from camera blob names"""
+    assert parse_capture_time("images/capture_20250601_084250.jpg") == datetime(2025, 6, 1, 8, 42, 50)
+
+def test_refresh_parses_only_new_captures():
+    """Test refreshing adds new captures and skips unparsable names"""
+    names = capture_names(4) + ["images/calibration.jpg"]
+    bucket = make_bucket(names)
+    catalog = make_catalog()
+
+    assert catalog.refresh(bucket) == 4
+    names.append("images/capture_20250601_020000.jpg")
+    assert catalog.refresh(bucket) == 1
+    assert len(catalog) == 5
+
+def test_captures_after_dst_fall_back_are_indexed():
+    """Test captures named in the repeated local hour after a DST fall-back are still picked up"""
+    names = ["images/capture_20251026_014500.jpg", "images/capture_20251026_015900.jpg"]
+    bucket = make_bucket(names)
+    catalog = ImageCatalog(BlobIndex("test-bucket", "images/", suffix=".jpg", delimiter="/", relist_from=capture_relist_start))
+    catalog.refresh(bucket)
+
+    names.append("images/capture_20251026_010100.jpg")
+    assert catalog.refresh(bucket) == 1
+    assert catalog.nearest(datetime(2025, 10, 26, 1, 0))[0] == "images/capture_20251026_010100.jpg"
+    _, kwargs = bucket.list_blobs.call_args
+    assert kwargs["start_offset"] == "images/capture_20251026_005900"
+
+def test_query_newest_first_with_cursor():
+    """Test queries return newest first and page with before/after"""
+    catalog = make_catalog()
+    catalog.refresh(make_bucket(capture_names(6)))
+
+    first_page = catalog.query(limit=2)
+    assert [ts for _, ts in first_page] == [datetime(2025, 6, 1, 2, 30), datetime(2025, 6, 1, 2, 0)]
+
+    second_page = catalog.query(before=first_page[-1][1], limit=2)
+    assert [ts for _, ts in second_page] == [datetime(2025, 6, 1, 1, 30), datetime(2025, 6, 1, 1, 0)]
+
+    tail = catalog.query(before=second_page[-1][1], after=datetime(2025, 6, 1, 0, 0))
+    assert [name for name, _ in tail] == ["images/capture_20250601_003000.jpg"]
+
+def test_between_and_nearest():
+    """Test time range and nearest-capture lookups"""
+    catalog = make_catalog()
+    assert catalog.nearest(datetime(2025, 6, 1)) is None
+    catalog.refresh(make_bucket(capture_names(6)))
+
+    window = catalog.between(datetime(2025, 6, 1, 0, 30), datetime(2025, 6, 1, 1, 30))
+    assert [ts for _, ts in window] == [datetime(2025, 6, 1, 0, 30), datetime(2025, 6, 1, 1, 0)]
+
+    assert catalog.nearest(datetime(2025, 6, 1, 1, 20)) == ("images/capture_20250601_013000.jpg", datetime(2025, 6, 1, 1, 30))
+    assert catalog.nearest(datetime(2025, 6, 2))[0] == "images/capture_20250601_023000.jpg"
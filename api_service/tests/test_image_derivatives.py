@@ -0,0 +1,91 @@
+import io
+
+from PIL import Image
+
+from image_derivatives import PRESETS, DerivativeCache, Variant, custom_variant, derivative_name, resize_jpeg
+from local_storage import LocalStorageClient
+
+def make_jpeg(width=2592, height=1944):
+    buffer = io.BytesIO()
+    Image.linear_gradient("L").resize((width, height)).convert("RGB").save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+def test_resize_jpeg_fits_variant():
+    """Test derivatives are downscaled to the requested width, keeping the aspect ratio"""
+    original = make_jpeg()
+    thumbnail = Image.open(io.BytesIO(resize_jpeg(original, PRESETS["thumbnail"])))
+    assert thumbnail.format == "JPEG"
+    assert thumbnail.size == (128, 96)
+
+    boxed = Image.open(io.BytesIO(resize_jpeg(original, Variant(500, 100, 80))))
+    assert boxed.size == (133, 100)
+
+def test_resize_jpeg_never_upscales():
+    """Test images smaller than the variant keep their size"""
+    resized = Image.open(io.BytesIO(resize_jpeg(make_jpeg(100, 75), PRESETS["large"])))
+    assert resized.size == (100, 75)
+
+def test_custom_sizes_are_rounded_up():
+    """Test custom sizes and qualities map onto a small fixed set of stored variants"""
+    assert custom_variant(500, None, 90) == Variant(640, None, 95)
+    assert custom_variant(None, 1, 1) == Variant(None, 64, 60)
+    assert custom_variant(2048, 2000, 100) == Variant(2048, 2048, 95)
+    assert len({custom_variant(width, None, 85) for width in range(1, 2049)}) == 11
+
+def test_ensure_creates_derivatives_once(mocker):
+    """Test missing derivatives are created under derivatives/ and the original is read only once"""
+    bucket = LocalStorageClient.in_memory().bucket("test-bucket")
+    bucket.blob("images/capture_20250601_084250.jpg").upload_from_string(make_jpeg())
+    cache = DerivativeCache()
+
+    variants = [PRESETS["large"], PRESETS["thumbnail"]]
+    names = cache.ensure(bucket, "images/capture_20250601_084250.jpg", variants)
+    assert names == [
+        "derivatives/w1280_q85/capture_20250601_084250.jpg",
+        "derivatives/w128_q60/capture_20250601_084250.jpg",
+    ]
+    assert Image.open(io.BytesIO(bucket.blob(names[1]).download_as_bytes())).size == (128, 96)
+
+    download = mocker.spy(type(bucket.blob(names[0])), "download_as_bytes")
+    assert cache.ensure(bucket, "images/capture_20250601_084250.jpg", variants) == names
+    assert DerivativeCache().ensure(bucket, "images/capture_20250601_084250.jpg", variants) == names
+    assert download.call_count == 0
+
+def test_images_are_served_from_derivatives(client, memory_backend):
+    """Test /images and /images/{name}/urls sign resized derivatives instead of the original"""
+    memory_backend.blob("images/capture_20250601_084250.jpg").upload_from_string(make_jpeg())
+
+    response = client.get("/images")
+    assert response.status_code == 200
+    image = response.json()[0]
+    assert "/derivatives/w1280_q85/capture_20250601_084250.jpg?" in image["url"]
+    assert "/derivatives/w128_q60/capture_20250601_084250.jpg?" in image["thumbnail_url"]
+
+    response = client.get("/images/capture_20250601_084250.jpg/urls", params={"width": 500})
+    assert response.status_code == 200
+    urls = response.json()
+    assert "/images/capture_20250601_084250.jpg?" in urls["original"]
+    for label, variant in PRESETS.items():
+        assert f"/{derivative_name('images/capture_20250601_084250.jpg', variant)}?" in urls[label]
+    assert "/derivatives/w640_q85/capture_20250601_084250.jpg?" in urls["custom"]
+
+def test_images_fall_back_to_original(client, memory_backend):
+    """Test images whose derivatives cannot be made are still listed with the original"""
+    memory_backend.blob("images/capture_20250601_084250.jpg").upload_from_string(b"not a jpeg")
+
+    response = client.get("/images")
+    assert response.status_code == 200
+    image = response.json()[0]
+    assert "/images/capture_20250601_084250.jpg?" in image["thumbnail_url"]
+    assert "w=128" in image["thumbnail_url"]
+
+def test_undecodable_originals_are_not_downloaded_again(client, memory_backend, mocker):
+    """Test an original that failed to decode is served as is without another download"""
+    memory_backend.blob("images/capture_20250601_084250.jpg").upload_from_string(b"not a jpeg")
+    assert client.get("/images").status_code == 200
+
+    download = mocker.spy(type(memory_backend.blob("images/x.jpg")), "download_as_bytes")
+    response = client.get("/images")
+    assert response.status_code == 200
+    assert "/images/capture_20250601_084250.jpg?" in response.json()[0]["thumbnail_url"]
+    assert download.call_count == 0
@@ -44,7 +44,6 @@ def test_list_images_success(client, mock_gcs_client, test_settings):
         assert "signed=true" in entry["thumbnail_url"]
         assert entry["id"].endswith(".jpg")
 
-@pytest.mark.skip
 def test_list_images_empty(client, mock_gcs_client):
     """Test image listing when no images exist"""
     mock_bucket = mock_gcs_client['bucket']
@@ -58,6 +57,18 @@ def test_list_images_empty(client, mock_gcs_client):
     assert response.status_code == 200
     assert response.json() == []
 
+def test_list_images_pages_with_before(client, mocker):
+    """Test image listing serves from the catalog and pages with before"""
+    mocker.patch("main.generate_signed_url", side_effect=lambda bucket, blob, **kwargs: f"https://signed/{blob}")
+
+    response = client.get("/images?limit=2")
+    assert response.status_code == 200
+    first_page = response.json()
+    assert [entry["id"] for entry in first_page] == ["capture_20250601_084252.jpg", "capture_20250601_084251.jpg"]
+
+    response = client.get("/images", params={"before": first_page[-1]["timestamp"]})
+    assert [entry["id"] for entry in response.json()] == ["capture_20250601_084250.jpg"]
+
 def test_list_images_invalid_limit(client):
     """Test image listing with invalid limit parameter"""
     response = client.get("/images?limit=101")
@@ -149,4 +160,34 @@ def test_get_image_urls_invalid_params(client):
     
     # Test quality out of range
     response = client.get("/images/test.jpg/urls?quality=101")
-    assert response.status_code == 422
\ No newline at end of file
+    assert response.status_code == 422
+
+
+def test_get_image_urls_batch(client, memory_backend, mocker):
+    """Test one batch call signs every requested size for many images without a HEAD per image"""
+    for second in range(3):
+        memory_backend.blob(f"images/capture_20250601_08425{second}.jpg").upload_from_string(b"not a jpeg")
+    exists = mocker.spy(type(memory_backend.blob("images/x.jpg")), "exists")
+
+    response = client.post("/images/urls", json={
+        "ids": ["capture_20250601_084250.jpg", "capture_20250601_084252.jpg", "missing.jpg"],
+        "sizes": ["original", "thumbnail"],
+        "width": 500
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["missing"] == ["missing.jpg"]
+    assert sorted(data["urls"]) == ["capture_20250601_084250.jpg", "capture_20250601_084252.jpg"]
+    urls = data["urls"]["capture_20250601_084252.jpg"]
+    assert sorted(urls) == ["custom", "original", "thumbnail"]
+    assert "/images/capture_20250601_084252.jpg?" in urls["original"]
+    assert "w=128" in urls["thumbnail"] and "w=640" in urls["custom"]
+    # Only derivative lookups touch storage; the originals are found in the catalog
+    assert not [call for call in exists.call_args_list if call.args[0].name.startswith("images/")]
+
+def test_get_image_urls_batch_invalid(client):
+    """Test unknown sizes and empty or oversized id lists are rejected"""
+    response = client.post("/images/urls", json={"ids": ["a.jpg"], "sizes": ["huge"]})
+    assert response.status_code == 400
+    assert client.post("/images/urls", json={"ids": []}).status_code == 422
+    assert client.post("/images/urls", json={"ids": [f"{i}.jpg" for i in range(101)]}).status_code == 422
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from local_storage import LocalStorageClient
+
+@pytest.fixture(params=["memory", "directory"])
+def local_bucket(request, tmp_path):
+    if request.param == "memory":
+        client = LocalStorageClient.in_memory(base_url="http://local")
+    else:
+        client = LocalStorageClient.from_directory(str(tmp_path), base_url="http://local")
+    return client.bucket("test-bucket")
+
+def test_list_blobs_in_name_order(local_bucket):
+    """Test listing honours prefix, delimiter and start/end offsets"""
+    for name in ["sensor_data/20240601_000200.json", "sensor_data/20240601_000000.json",
+                 "sensor_data/20240601_000100.json", "sensor_data/nested/x.json", "images/capture_20240601_000000.jpg"]:
+        local_bucket.blob(name).upload_from_string(b"{}")
+
+    names = [blob.name for blob in local_bucket.list_blobs(prefix="sensor_data/", delimiter="/")]
+    assert names == [
+        "sensor_data/20240601_000000.json",
+        "sensor_data/20240601_000100.json",
+        "sensor_data/20240601_000200.json",
+    ]
+
+    names = [blob.name for blob in local_bucket.list_blobs(prefix="sensor_data/", start_offset="sensor_data/20240601_000100.json")]
+    assert names == ["sensor_data/20240601_000100.json", "sensor_data/20240601_000200.json", "sensor_data/nested/x.json"]
+
+    names = [blob.name for blob in local_bucket.list_blobs(prefix="sensor_data/", end_offset="sensor_data/20240601_000100.json")]
+    assert names == ["sensor_data/20240601_000000.json"]
+
+    local_bucket.blob("sensor_data/20240601_000300.json").upload_from_string(b"{}")
+    names = [blob.name for blob in local_bucket.list_blobs(prefix="sensor_data/", delimiter="/", start_offset="sensor_data/20240601_000200.json")]
+    assert names == ["sensor_data/20240601_000200.json", "sensor_data/20240601_000300.json"]
+
+def test_ranged_reads_and_metadata(local_bucket):
+    """Test ranged downloads are end-inclusive and metadata is reported"""
+    blob = local_bucket.blob("images/capture_20240601_000000.jpg")
+    blob.upload_from_string(b"0123456789", content_type="image/jpeg")
+
+    assert blob.download_as_bytes() == b"0123456789"
+    assert blob.download_as_bytes(start=2, end=4) == b"234"
+    assert blob.download_as_bytes(start=7) == b"789"
+
+    listed = next(iter(local_bucket.list_blobs(prefix="images/")))
+    assert listed.size == 10
+    assert listed.content_type == "image/jpeg"
+    assert listed.updated is not None
+
+def test_missing_objects_and_conditional_uploads(local_bucket):
+    """Test missing objects raise NotFound and create-only uploads refuse to overwrite"""
+    blob = local_bucket.blob("sensor_archive/20240601.npy")
+    assert not blob.exists()
+    with pytest.raises(NotFound):
+        blob.download_as_string()
+
+    blob.upload_from_string(b"first", if_generation_match=0)
+    with pytest.raises(PreconditionFailed):
+        blob.upload_from_string(b"second", if_generation_match=0)
+    assert blob.download_as_string() == b"first"
+
+def test_signed_url_carries_parameters(local_bucket):
+    """Test local signed URLs keep the transformation parameters and an expiry"""
+    url = local_bucket.blob("images/capture 1.jpg").generate_signed_url(query_parameters={"w": "128"})
+    assert url.startswith("http://local/test-bucket/images/capture%201.jpg?")
+    assert "w=128" in url and "Expires=" in url
+
+def test_api_runs_on_memory_backend(client, memory_backend):
+    """Test the API serves sensor data and images from the in-memory backend"""
+    memory_backend.blob("sensor_data/20240601_000000.json").upload_from_string(json.dumps({
+        "temperature": 21.5, "humidity": 50.0, "pressure": 1000.0, "timestamp": "2024-06-01T00:00:00Z"
+    }))
+    memory_backend.blob("images/capture_20240601_000000.jpg").upload_from_string(b"jpeg")
+
+    response = client.get("/sensor/latest")
+    assert response.status_code == 200
+    assert response.json()["temperature"] == 21.5
+
+    response = client.get("/images")
+    assert response.status_code == 200
+    images = response.json()
+    assert [image["id"] for image in images] == ["capture_20240601_000000.jpg"]
+    assert "w=128" in images[0]["thumbnail_url"]
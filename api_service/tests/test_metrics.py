@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+from metrics import GCS_CALLS_PER_REQUEST, GCS_OPERATION_SECONDS, Counter, Histogram, Registry, gcs_operation, start_request_tally
+from profiler import SamplingProfiler
+from worker_pool import WorkerPool
+
+def test_render_prometheus_text():
+    """Test histograms render cumulative buckets, sum and count, and label values are escaped"""
+    registry = Registry()
+    histogram = registry.register(Histogram("op_seconds", "Op time", ("operation",), buckets=(0.1, 1.0)))
+    counter = registry.register(Counter("errors_total", "Errors", ("path",)))
+    histogram.observe(0.05, operation="list")
+    histogram.observe(0.5, operation="list")
+    histogram.observe(5, operation="list")
+    counter.inc(path='a"b')
+
+    lines = registry.render().splitlines()
+    assert "# TYPE op_seconds histogram" in lines
+    assert 'op_seconds_bucket{operation="list",le="0.1"} 1' in lines
+    assert 'op_seconds_bucket{operation="list",le="1"} 2' in lines
+    assert 'op_seconds_bucket{operation="list",le="+Inf"} 3' in lines
+    assert 'op_seconds_sum{operation="list"} 5.55' in lines
+    assert 'op_seconds_count{operation="list"} 3' in lines
+    assert 'errors_total{path="a\\"b"} 1' in lines
+
+def test_operations_counted_across_worker_threads():
+    """Test GCS operations run on the worker pool count against the request that scheduled them"""
+    pool = WorkerPool(max_workers=2)
+
+    def list_twice():
+        with gcs_operation("list"):
+            pass
+        with gcs_operation("list"):
+            pass
+
+    async def request():
+        tally = start_request_tally()
+        await pool.run(list_twice)
+        return tally
+
+    tally = asyncio.run(request())
+    pool.shutdown()
+    assert tally.counts() == {"list": 2}
+
+def test_metrics_endpoint(client, memory_backend):
+    """Test /metrics reports per-route latency, GCS calls per request and worker pool utilisation"""
+    memory_backend.blob("images/capture_20250601_084250.jpg").upload_from_string(b"not a jpeg")
+    lists_before = GCS_OPERATION_SECONDS.count(operation="list")
+    requests_before = GCS_CALLS_PER_REQUEST.count(route="/images")
+    assert client.get("/images").status_code == 200
+
+    assert GCS_OPERATION_SECONDS.count(operation="list") == lists_before + 1
+    assert GCS_OPERATION_SECONDS.count(operation="sign") > 0
+    assert GCS_CALLS_PER_REQUEST.count(route="/images") == requests_before + 1
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'selfhydro_http_request_duration_seconds_count{method="GET",route="/images",status="200"}' in body
+    assert 'selfhydro_gcs_operation_duration_seconds_bucket{operation="list",le="+Inf"}' in body
+    assert "selfhydro_worker_pool_saturation " in body
+    assert "selfhydro_derivatives_backlog " in body
+
+def test_profiler_writes_slow_requests(tmp_path):
+    """Test only recordings slower than the threshold are written, as folded stacks"""
+    profiler = SamplingProfiler(str(tmp_path), slow_seconds=0.05, interval_seconds=0.001)
+    stop = threading.Event()
+
+    def busy_handler():
+        while not stop.is_set():
+            time.sleep(0.001)
+
+    worker = threading.Thread(target=busy_handler, name="gcs-worker_0")
+    worker.start()
+    fast = profiler.begin()
+    slow = profiler.begin()
+    time.sleep(0.05)
+    assert profiler.end(fast, "GET /sensor/latest", 0.01) is None
+    path = profiler.end(slow, "GET /images", 0.2)
+    stop.set()
+    worker.join()
+
+    assert path.endswith("_GET_images_200ms.folded")
+    with open(path) as f:
+        stacks = [line.rsplit(" ", 1) for line in f.read().splitlines()]
+    assert any(stack.startswith("gcs-worker_0;") and "busy_handler" in stack for stack, _ in stacks)
+    assert all(int(count) > 0 for _, count in stacks)
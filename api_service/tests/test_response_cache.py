@@ -0,0 +1,90 @@
+import json
+
+from response_cache import ResponseCache, http_date, is_not_modified, make_etag
+
+def add_reading(bucket, minute):
+    name = f"sensor_data/20240601_00{minute:02d}00.json"
+    bucket.objects[name] = json.dumps({
+        "temperature": 20.0 + minute,
+        "humidity": 50.0,
+        "pressure": 1000.0,
+        "timestamp": f"2024-06-01T00:{minute:02d}:00+00:00",
+    }).encode()
+
+def test_conditional_headers():
+    """Test If-None-Match matches weakly and takes precedence over If-Modified-Since"""
+    etag = make_etag(("/sensor/latest", ()), "sensor_data/a.json")
+    assert etag.startswith('W/"')
+    assert is_not_modified({"if-none-match": etag}, etag)
+    assert is_not_modified({"if-none-match": f'"other", {etag.removeprefix("W/")}'}, etag)
+    assert not is_not_modified({"if-none-match": '"other"'}, etag)
+    assert is_not_modified({"if-none-match": "*"}, etag)
+
+    assert is_not_modified({"if-modified-since": http_date(1000)}, etag, last_modified=1000.5)
+    assert not is_not_modified({"if-modified-since": http_date(999)}, etag, last_modified=1000)
+    assert not is_not_modified({"if-modified-since": "yesterday"}, etag, last_modified=1000)
+    assert not is_not_modified({"if-none-match": '"other"', "if-modified-since": http_date(1000)}, etag, last_modified=1000)
+
+def test_cache_misses_when_etag_changes():
+    """Test entries are only served for the ETag they were built from, and evicted LRU"""
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", "v1", b"[1]", {"X-Next-Cursor": "5"})
+    assert cache.get("a", "v1").headers == {"X-Next-Cursor": "5"}
+    assert cache.get("a", "v2") is None
+
+    cache.put("b", "v1", b"[2]")
+    cache.get("a", "v1")
+    cache.put("c", "v1", b"[3]")
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1").body == b"[1]"
+    assert cache.stats()["size"] == 2
+
+def test_latest_revalidates_without_download(client, mock_gcs_client, make_sensor_bucket, fresh_reads):
+    """Test /sensor/latest answers 304 from a listing alone and a new reading changes the ETag"""
+    bucket = make_sensor_bucket(3)
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    first = client.get("/sensor/latest")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    assert "Last-Modified" in first.headers
+
+    bucket.blob.reset_mock()
+    revalidated = client.get("/sensor/latest", headers={"If-None-Match": first.headers["ETag"]})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == first.headers["ETag"]
+    repeated = client.get("/sensor/latest")
+    assert repeated.json() == first.json()
+    bucket.blob.assert_not_called()
+
+    add_reading(bucket, 3)
+    changed = client.get("/sensor/latest", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.json()["temperature"] == 23.0
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+def test_history_cached_per_query(client, mock_gcs_client, make_sensor_bucket):
+    """Test cached history pages keep their cursor header and ETags differ per query"""
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(10)
+
+    first = client.get("/sensor/history?limit=3")
+    repeated = client.get("/sensor/history?limit=3")
+    assert repeated.json() == first.json()
+    assert repeated.headers["X-Next-Cursor"] == first.headers["X-Next-Cursor"]
+    assert repeated.headers["ETag"] == first.headers["ETag"]
+    assert client.get("/sensor/history?limit=4").headers["ETag"] != first.headers["ETag"]
+
+    response = client.get("/sensor/history?limit=3", headers={"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+
+def test_image_responses_cache_within_url_lifetime(client, memory_backend, test_settings):
+    """Test image listings and URLs are cacheable for less than their signed URLs stay valid"""
+    memory_backend.blob("images/capture_20250601_084250.jpg").upload_from_string(b"not a jpeg")
+
+    listing = client.get("/images")
+    assert listing.status_code == 200
+    assert listing.headers["Cache-Control"] == f"public, max-age={test_settings.IMAGE_LIST_MAX_AGE_SECONDS}"
+    assert client.get("/images", headers={"If-None-Match": listing.headers["ETag"]}).status_code == 304
+
+    urls = client.get("/images/capture_20250601_084250.jpg/urls")
+    assert urls.headers["Cache-Control"] == f"public, max-age={test_settings.SIGNED_URL_MIN_TTL_SECONDS}"
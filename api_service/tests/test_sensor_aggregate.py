@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+
+from sensor_aggregate import aggregate, lttb, parse_bucket_width
+
+MINUTE_US = 60 * 1_000_000
+
+@pytest.mark.parametrize("value, expected", [
+    ("30s", 30 * 1_000_000),
+    ("5m", 5 * MINUTE_US),
+    ("1h", 60 * MINUTE_US),
+    ("1d", 24 * 60 * MINUTE_US),
+])
+def test_parse_bucket_width(value, expected):
+    """Test bucket widths are parsed into microseconds"""
+    assert parse_bucket_width(value) == expected
+
+@pytest.mark.parametrize("value", ["", "0m", "5", "1w", "h1", "-5m"])
+def test_parse_bucket_width_invalid(value):
+    """Test malformed bucket widths are rejected"""
+    with pytest.raises(ValueError):
+        parse_bucket_width(value)
+
+def test_aggregate_reduces_each_bucket():
+    """Test min, max, mean and last are computed per bucket"""
+    timestamps = np.arange(10, dtype=np.int64) * MINUTE_US
+    values = np.arange(10, dtype=np.float64)
+    columns = {"temperature": values, "humidity": values * 2, "pressure": values + 1000}
+
+    result = aggregate(timestamps, columns, 5 * MINUTE_US)
+
+    assert result["start"].tolist() == [0, 5 * MINUTE_US]
+    assert result["count"].tolist() == [5, 5]
+    assert result["temperature_min"].tolist() == [0, 5]
+    assert result["temperature_max"].tolist() == [4, 9]
+    assert result["temperature_mean"].tolist() == [2, 7]
+    assert result["temperature_last"].tolist() == [4, 9]
+    assert result["humidity_mean"].tolist() == [4, 14]
+    assert result["pressure_last"].tolist() == [1004, 1009]
+
+def test_aggregate_skips_empty_buckets():
+    """Test gaps in the data do not produce empty buckets"""
+    timestamps = np.array([0, 1, 120, 121], dtype=np.int64) * MINUTE_US
+    values = np.array([1.0, 3.0, 5.0, 7.0])
+    columns = {"temperature": values, "humidity": values, "pressure": values}
+
+    result = aggregate(timestamps, columns, 60 * MINUTE_US)
+
+    assert result["start"].tolist() == [0, 120 * MINUTE_US]
+    assert result["temperature_mean"].tolist() == [2.0, 6.0]
+
+def test_aggregate_empty():
+    """Test aggregating no readings returns empty arrays"""
+    empty = np.empty(0)
+    result = aggregate(np.empty(0, dtype=np.int64), {"temperature": empty, "humidity": empty, "pressure": empty}, MINUTE_US)
+    assert len(result["start"]) == 0
+    assert len(result["temperature_last"]) == 0
+
+def test_lttb_keeps_endpoints_and_peaks():
+    """Test LTTB keeps the first and last points and a spike in the data"""
+    x = np.arange(1000, dtype=np.float64)
+    y = np.sin(x / 50)
+    y[500] = 25.0
+
+    selected = lttb(x, y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0
+    assert selected[-1] == 999
+    assert 500 in selected
+    assert np.all(np.diff(selected) > 0)
+
+def test_lttb_short_series_is_unchanged():
+    """Test series shorter than the threshold are returned whole"""
+    assert lttb(np.arange(5), np.arange(5), 10).tolist() == [0, 1, 2, 3, 4]
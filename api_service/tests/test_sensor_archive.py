@@ -0,0 +1,121 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from blob_index import BlobIndex
+from sensor_archive import (
+    archive_name, archive_sources, compact_closed_days, decode_archive, encode_archive, reading_day, relist_start
+)
+from sensor_store import SensorSeries
+
+MINUTES_PER_DAY = 24 * 60
+
+@pytest.fixture
+def indexes():
+    return (
+        BlobIndex("test-bucket", "sensor_data/", suffix=".json", relist_from=relist_start),
+        BlobIndex("test-bucket", "sensor_archive/", suffix=".npy"),
+    )
+
+def test_reading_day():
+    """Test days are read from both loose and archive names"""
+    assert reading_day("sensor_data/20240601_123000.json") == "20240601"
+    assert reading_day("sensor_archive/20240601.npy") == "20240601"
+    assert reading_day("sensor_archive/20240601_000048.npy") == "20240601"
+    assert reading_day("sensor_data/data_1.json") is None
+
+def test_archive_round_trip():
+    """Test archives decode to the readings they were built from"""
+    timestamps = np.arange(5, dtype=np.int64) * 60_000_000
+    values = np.random.default_rng(0).normal(size=(5, 3))
+
+    raw = encode_archive(timestamps, values)
+    assert raw.startswith(b"\x93NUMPY")
+
+    decoded_timestamps, decoded_values = decode_archive(raw)
+    assert decoded_timestamps.tolist() == timestamps.tolist()
+    assert np.array_equal(decoded_values, values)
+
+def test_compacts_only_closed_days(make_sensor_bucket, indexes):
+    """Test each closed day becomes one archive and the open day stays loose"""
+    bucket = make_sensor_bucket(2 * MINUTES_PER_DAY + 30)
+    sensor_index, archive_index = indexes
+
+    assert compact_closed_days(bucket, sensor_index, archive_index, today="20240603") == ["20240601", "20240602"]
+    assert not [name for name in bucket.objects if name.startswith("sensor_archive/20240603")]
+
+    timestamps, values = decode_archive(bucket.objects[archive_name("20240602", MINUTES_PER_DAY)])
+    assert len(timestamps) == MINUTES_PER_DAY
+    assert values[0, 0] == 20.0 + MINUTES_PER_DAY
+
+    assert compact_closed_days(bucket, sensor_index, archive_index, today="20240603") == []
+
+def test_archive_sources():
+    """Test archives record how many loose objects they were built from"""
+    assert archive_name("20240601", 48) == "sensor_archive/20240601_000048.npy"
+    assert archive_sources("sensor_archive/20240601_000048.npy") == 48
+    assert archive_sources("sensor_archive/20240601.npy") == 0
+
+def test_days_are_compacted_after_a_grace_period(make_sensor_bucket, indexes, mocker):
+    """Test a day is only archived once the grace period after its end has passed"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 30)
+    sensor_index, archive_index = indexes
+    clock = mocker.patch("sensor_archive.datetime", wraps=datetime)
+    clock.now.return_value = datetime(2024, 6, 2, 3, 0, tzinfo=timezone.utc)
+
+    assert compact_closed_days(bucket, sensor_index, archive_index, grace_seconds=6 * 3600) == []
+    assert compact_closed_days(bucket, sensor_index, archive_index, grace_seconds=3600) == ["20240601"]
+
+def test_series_reads_archives_before_loose_json(make_sensor_bucket, indexes):
+    """Test a cold store fetches one object per closed day plus the open day's readings"""
+    bucket = make_sensor_bucket(2 * MINUTES_PER_DAY + 30)
+    sensor_index, archive_index = indexes
+    compact_closed_days(bucket, sensor_index, archive_index, today="20240603")
+
+    bucket.blob.reset_mock()
+    series = SensorSeries()
+    cold_archive_index = BlobIndex("test-bucket", "sensor_archive/", suffix=".npy")
+    cold_archive_index.refresh(bucket)
+    series.sync(sensor_index, bucket, cold_archive_index)
+
+    assert len(series) == 2 * MINUTES_PER_DAY + 30
+    assert bucket.blob.call_count == 2 + 30
+    _, columns = series.query(limit=1)
+    assert columns["temperature"][0] == 20.0 + 2 * MINUTES_PER_DAY + 29
+
+def test_loose_day_is_not_duplicated_by_later_archive(make_sensor_bucket, indexes):
+    """Test a day already loaded from loose JSON is not loaded again from its archive"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 10)
+    sensor_index, archive_index = indexes
+    series = SensorSeries()
+
+    sensor_index.refresh(bucket)
+    series.sync(sensor_index, bucket, archive_index)
+    compact_closed_days(bucket, sensor_index, BlobIndex("test-bucket", "sensor_archive/", suffix=".npy"), today="20240602")
+    archive_index.refresh(bucket)
+    series.sync(sensor_index, bucket, archive_index)
+
+    assert len(series) == MINUTES_PER_DAY + 10
+
+def test_late_reading_reopens_an_archived_day(make_sensor_bucket, indexes):
+    """Test a reading uploaded after its day was archived is served, and the day is read from a new archive later"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 10)
+    sensor_index, archive_index = indexes
+    compact_closed_days(bucket, sensor_index, archive_index, today="20240602")
+    series = SensorSeries()
+    series.sync(sensor_index, bucket, archive_index)
+    assert len(series) == MINUTES_PER_DAY + 10
+
+    bucket.objects["sensor_data/20240601_230030.json"] = (
+        b'{"temperature": 1.0, "humidity": 50.0, "pressure": 1000.0, "timestamp": "2024-06-01T23:00:30+00:00"}'
+    )
+    sensor_index.refresh(bucket)
+    series.sync(sensor_index, bucket, archive_index)
+    assert len(series) == MINUTES_PER_DAY + 11
+    assert 1.0 in series.column("temperature")
+
+    assert compact_closed_days(bucket, sensor_index, archive_index, today="20240602") == ["20240601"]
+    cold = SensorSeries()
+    cold.sync(sensor_index, bucket, archive_index)
+    assert len(cold) == MINUTES_PER_DAY + 11
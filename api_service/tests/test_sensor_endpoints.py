@@ -85,7 +85,7 @@ def test_get_sensor_history_empty(client, mock_gcs_client):
 
 def test_get_sensor_history_invalid_limit(client):
     """Test sensor history with invalid limit parameter"""
-    response = client.get("/sensor/history?limit=101")
+    response = client.get("/sensor/history?limit=10001")
     assert response.status_code == 422  # Validation error
 
 def test_get_sensor_history_malformed_data(client, mock_gcs_client):
@@ -158,4 +158,100 @@ def test_get_sensor_history_with_limit(client, mock_gcs_client, sample_sensor_da
     response = client.get("/sensor/history?limit=5")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 5
\ No newline at end of file
+    assert len(data) == 5
+
+
+def test_get_sensor_history_returns_newest(client, mock_gcs_client, make_sensor_bucket):
+    """Test history returns the newest readings rather than the oldest"""
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(50)
+
+    response = client.get("/sensor/history?limit=3")
+    assert response.status_code == 200
+    assert [entry["temperature"] for entry in response.json()] == [69.0, 68.0, 67.0]
+
+def test_get_sensor_history_time_range_and_cursor(client, mock_gcs_client, make_sensor_bucket):
+    """Test time-bounded history pages through every reading via X-Next-Cursor"""
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(50)
+
+    params = {"start": "2024-06-01T00:10:00Z", "end": "2024-06-01T00:30:00Z", "limit": 8}
+    temperatures = []
+    while True:
+        response = client.get("/sensor/history", params=params)
+        assert response.status_code == 200
+        temperatures += [entry["temperature"] for entry in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert temperatures == [20.0 + minute for minute in range(29, 9, -1)]
+
+def test_get_sensor_history_cursor_keeps_tied_readings(client, mock_gcs_client, make_sensor_bucket):
+    """Test readings sharing a timestamp across a page boundary are neither skipped nor repeated"""
+    bucket = make_sensor_bucket(6)
+    for second in range(1, 5):
+        bucket.objects[f"sensor_data/20240601_00030{second}.json"] = json.dumps({
+            "temperature": 100.0 + second,
+            "humidity": 50.0,
+            "pressure": 1000.0,
+            "timestamp": "2024-06-01T00:03:00+00:00",
+        }).encode()
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    params = {"limit": 3}
+    temperatures = []
+    while True:
+        response = client.get("/sensor/history", params=params)
+        assert response.status_code == 200
+        temperatures += [entry["temperature"] for entry in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+
+    assert len(temperatures) == 10
+    assert sorted(temperatures) == sorted([20.0 + minute for minute in range(6)] + [101.0, 102.0, 103.0, 104.0])
+
+def test_get_sensor_history_cursor_is_readable_cross_origin(client, mock_gcs_client, make_sensor_bucket):
+    """Test browsers on another origin are allowed to read X-Next-Cursor"""
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(10)
+
+    response = client.get("/sensor/history?limit=5", headers={"Origin": "https://dashboard.example"})
+    assert "X-Next-Cursor" in response.headers
+    assert "x-next-cursor" in response.headers["Access-Control-Expose-Headers"].lower()
+
+def test_get_sensor_history_invalid_cursor(client):
+    """Test a malformed cursor is rejected"""
+    response = client.get("/sensor/history?cursor=abc")
+    assert response.status_code == 400
+
+def test_get_sensor_aggregate(client, mock_gcs_client, make_sensor_bucket):
+    """Test hourly aggregation of per-minute readings"""
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(180)
+
+    response = client.get("/sensor/aggregate?bucket=1h")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 3
+    assert data[0]["count"] == 60
+    assert data[0]["temperature"] == {"min": 20.0, "max": 79.0, "mean": 49.5, "last": 79.0}
+    assert data[2]["temperature"]["last"] == 199.0
+
+def test_get_sensor_aggregate_time_range_and_downsampling(client, mock_gcs_client, make_sensor_bucket):
+    """Test aggregation honours the time range and the LTTB point cap"""
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(180)
+
+    response = client.get("/sensor/aggregate", params={
+        "bucket": "1m",
+        "start": "2024-06-01T01:00:00Z",
+        "end": "2024-06-01T02:00:00Z",
+        "max_points": 10,
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 10
+    assert data[0]["temperature"]["mean"] == 80.0
+    assert data[-1]["temperature"]["mean"] == 139.0
+
+def test_get_sensor_aggregate_invalid_bucket(client):
+    """Test an invalid bucket width is rejected"""
+    response = client.get("/sensor/aggregate?bucket=fortnight")
+    assert response.status_code == 400
@@ -0,0 +1,150 @@
+import asyncio
+import csv
+import io
+import json
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from blob_index import BlobIndex
+from sensor_archive import compact_closed_days, relist_start
+from main import get_worker_pool, stream_blocking
+from sensor_export import encode_rows, export_sources, iter_readings
+from worker_pool import PoolSaturated
+
+MINUTES_PER_DAY = 24 * 60
+
+def make_indexes(bucket):
+    sensor_index = BlobIndex("test-bucket", "sensor_data/", suffix=".json", relist_from=relist_start)
+    archive_index = BlobIndex("test-bucket", "sensor_archive/", suffix=".npy")
+    compact_closed_days(bucket, sensor_index, archive_index, today="20240602")
+    return sensor_index, archive_index
+
+def test_sources_prefer_day_archives(make_sensor_bucket):
+    """Test archived days are read from their archive and open days from loose objects"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 3)
+    sensor_index, archive_index = make_indexes(bucket)
+
+    assert export_sources(sensor_index, archive_index) == [
+        "sensor_archive/20240601_001440.npy",
+        "sensor_data/20240602_000000.json",
+        "sensor_data/20240602_000100.json",
+        "sensor_data/20240602_000200.json",
+    ]
+    start = datetime(2024, 6, 2, tzinfo=timezone.utc)
+    assert export_sources(sensor_index, archive_index, start=start)[0] == "sensor_data/20240602_000000.json"
+
+def test_late_readings_are_exported_until_the_day_is_archived_again(make_sensor_bucket):
+    """Test a reading uploaded after its day was archived is exported from the loose objects, then from a new archive"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 3)
+    sensor_index, archive_index = make_indexes(bucket)
+    bucket.objects["sensor_data/20240601_235930.json"] = json.dumps({
+        "temperature": 1.0, "humidity": 50.0, "pressure": 1000.0, "timestamp": "2024-06-01T23:59:30+00:00"
+    }).encode()
+    sensor_index.refresh(bucket)
+
+    sources = export_sources(sensor_index, archive_index)
+    assert len(sources) == MINUTES_PER_DAY + 4
+    assert "sensor_data/20240601_235930.json" in sources
+
+    assert compact_closed_days(bucket, sensor_index, archive_index, today="20240602") == ["20240601"]
+    assert export_sources(sensor_index, archive_index)[0] == "sensor_archive/20240601_001441.npy"
+    blocks = list(iter_readings(bucket, export_sources(sensor_index, archive_index)))
+    assert sum(len(timestamps) for timestamps, _ in blocks) == MINUTES_PER_DAY + 4
+
+def test_readings_stream_in_order_within_range(make_sensor_bucket):
+    """Test readings come out oldest first and are clipped to the range"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 3)
+    sensor_index, archive_index = make_indexes(bucket)
+    start = datetime(2024, 6, 1, 23, 58, tzinfo=timezone.utc)
+    end = datetime(2024, 6, 2, 0, 2, tzinfo=timezone.utc)
+
+    blocks = list(iter_readings(bucket, export_sources(sensor_index, archive_index, start, end), start, end))
+    temperatures = [t for _, values in blocks for t in values[:, 0].tolist()]
+    assert temperatures == [20.0 + minute for minute in range(MINUTES_PER_DAY - 2, MINUTES_PER_DAY + 2)]
+
+def test_encode_rows_chunks_output(make_sensor_bucket):
+    """Test rows are encoded in bounded chunks"""
+    bucket = make_sensor_bucket(5)
+    sensor_index, archive_index = make_indexes(bucket)
+    blocks = iter_readings(bucket, export_sources(sensor_index, archive_index))
+
+    chunks = list(encode_rows(blocks, "ndjson", rows_per_chunk=2))
+    assert len(chunks) == 3
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+    assert [row["temperature"] for row in rows] == [20.0, 21.0, 22.0, 23.0, 24.0]
+    assert rows[0]["timestamp"] == "2024-06-01T00:00:00+00:00"
+
+def test_export_endpoint_streams_csv(client, mock_gcs_client, make_sensor_bucket):
+    """Test /sensor/export streams CSV with a header across archives and loose readings"""
+    bucket = make_sensor_bucket(MINUTES_PER_DAY + 3)
+    make_indexes(bucket)
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    response = client.get("/sensor/export", params={"format": "csv", "start": "2024-06-01T23:59:00Z"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="sensor_data.csv"' in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["timestamp", "temperature", "humidity", "pressure"]
+    assert [float(row[1]) for row in rows[1:]] == [20.0 + minute for minute in range(MINUTES_PER_DAY - 1, MINUTES_PER_DAY + 3)]
+
+def test_export_rejects_unknown_format(client):
+    """Test unsupported export formats are rejected"""
+    response = client.get("/sensor/export", params={"format": "xml"})
+    assert response.status_code == 422
+
+def test_stream_closes_iterator_after_the_item_in_flight():
+    """Test a stream cancelled mid-item closes its iterator once the pool thread has finished with it"""
+    started, release, closed = threading.Event(), threading.Event(), threading.Event()
+
+    def items():
+        try:
+            yield b"first"
+            started.set()
+            release.wait(5)
+            yield b"second"
+        finally:
+            closed.set()
+
+    async def consume():
+        stream = await stream_blocking(items())
+        assert await stream.__anext__() == b"first"
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        await stream.aclose()
+        assert not closed.is_set()
+        release.set()
+
+    asyncio.run(consume())
+    assert closed.wait(5)
+
+def test_stream_waits_for_a_worker_once_started(mocker):
+    """Test a saturated pool is a 503 before the stream starts and only a wait after it has"""
+    pool = get_worker_pool()
+    submit = pool.submit
+    refusals = []
+
+    def flaky_submit(fn, *args):
+        if refusals:
+            raise refusals.pop()
+        return submit(fn, *args)
+
+    mocker.patch.object(pool, "submit", side_effect=flaky_submit)
+
+    async def consume():
+        refusals.append(PoolSaturated("full"))
+        with pytest.raises(HTTPException) as excinfo:
+            await stream_blocking(iter([b"a"]))
+        assert excinfo.value.status_code == 503
+
+        stream = await stream_blocking(iter([b"a", b"b", b"c"]))
+        refusals.extend([PoolSaturated("full"), PoolSaturated("full")])
+        return [item async for item in stream]
+
+    assert asyncio.run(consume()) == [b"a", b"b", b"c"]
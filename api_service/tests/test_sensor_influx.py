@@ -0,0 +1,170 @@
+import asyncio
+
+import httpx
+import pytest
+
+from main import app, get_influx_backend
+from sensor_influx import InfluxSensorBackend, InfluxUnavailable
+
+HOUR_US = 3600 * 1_000_000
+JUNE_1_US = 1717200000 * 1_000_000
+
+class RecordedInflux:
+    """Replays recorded InfluxDB 1.x /query responses, matched on a fragment of the statement"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        statement = request.url.params["q"]
+        for fragment, payload in self.responses.items():
+            if fragment in statement:
+                return httpx.Response(200, json=payload)
+        return httpx.Response(200, json={"results": [{"statement_id": 0}]})
+
+    @property
+    def statements(self):
+        return [request.url.params["q"] for request in self.requests]
+
+def series(columns, values):
+    return {"results": [{"statement_id": 0, "series": [{"name": "environment", "columns": columns, "values": values}]}]}
+
+def make_backend(handler, **kwargs):
+    return InfluxSensorBackend(
+        "http://influx:8086", "selfhydro", token="secret", transport=httpx.MockTransport(handler), **kwargs
+    )
+
+@pytest.fixture
+def influx():
+    recorded = RecordedInflux({
+        "ORDER BY time DESC LIMIT 1": series(
+            ["time", "temperature", "humidity", "pressure"],
+            [[JUNE_1_US + 2 * HOUR_US, 24.0, 55.0, 1001.0]]
+        ),
+        "ORDER BY time DESC LIMIT 3": series(
+            ["time", "temperature", "humidity", "pressure"],
+            [[JUNE_1_US + 2 * HOUR_US, 24.0, 55.0, 1001.0], [JUNE_1_US + HOUR_US, 23.0, 54.0, 1000.0],
+             [JUNE_1_US, 22.0, 53.0, 999.0]]
+        ),
+        "GROUP BY time": series(
+            ["time", "count"] + [f"{field}_{stat}" for field in ("temperature", "humidity", "pressure")
+                                 for stat in ("min", "max", "mean", "last")],
+            [[JUNE_1_US, 60] + [20.0, 22.0, 21.0, 22.0] * 3, [JUNE_1_US + HOUR_US, 60] + [22.0, 24.0, 23.0, 24.0] * 3]
+        ),
+    })
+    app.dependency_overrides[get_influx_backend] = lambda: make_backend(recorded)
+    return recorded
+
+def test_queries_use_pooled_client_settings():
+    """Test queries go to /query with the database, microsecond epochs and the monitor's token header"""
+    recorded = RecordedInflux({})
+    backend = make_backend(recorded)
+
+    assert asyncio.run(backend.latest()) is None
+    request = recorded.requests[0]
+    assert request.url.path == "/query"
+    assert request.url.params["db"] == "selfhydro"
+    assert request.url.params["epoch"] == "u"
+    assert request.headers["Authorization"] == "Token secret"
+    assert recorded.statements[0] == 'SELECT temperature, humidity, pressure FROM "environment" ORDER BY time DESC LIMIT 1'
+
+def test_failures_mark_backend_unavailable():
+    """Test a failed query raises InfluxUnavailable and pauses InfluxDB for the retry window"""
+    now = [0.0]
+
+    def handler(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    backend = make_backend(handler, retry_after_seconds=30, clock=lambda: now[0])
+    with pytest.raises(InfluxUnavailable):
+        asyncio.run(backend.latest())
+    assert not backend.available
+    now[0] = 31.0
+    assert backend.available
+
+    errors = make_backend(lambda request: httpx.Response(200, json={"results": [{"error": "database not found"}]}))
+    with pytest.raises(InfluxUnavailable):
+        asyncio.run(errors.history())
+
+def test_latest_and_history_from_influx(client, influx):
+    """Test /sensor/latest and /sensor/history are answered by InfluxDB without touching GCS"""
+    latest = client.get("/sensor/latest")
+    assert latest.status_code == 200
+    assert latest.json()["temperature"] == 24.0
+
+    history = client.get("/sensor/history?limit=2")
+    assert history.status_code == 200
+    assert [entry["temperature"] for entry in history.json()] == [24.0, 23.0]
+    assert history.headers["X-Next-Cursor"] == f"{JUNE_1_US + HOUR_US}:1"
+
+def test_aggregate_groups_on_server(client, influx):
+    """Test /sensor/aggregate sends GROUP BY time() with the bucket width and maps the buckets"""
+    response = client.get("/sensor/aggregate?bucket=1h&start=2024-06-01T00:00:00Z&end=2024-06-01T02:00:00Z")
+    assert response.status_code == 200
+    statement = influx.statements[-1]
+    assert f"time >= {JUNE_1_US}u AND time < {JUNE_1_US + 2 * HOUR_US}u" in statement
+    assert statement.endswith(f"GROUP BY time({HOUR_US}u) fill(none)")
+
+    buckets = response.json()
+    assert [bucket["count"] for bucket in buckets] == [60, 60]
+    assert buckets[1]["temperature"] == {"min": 22.0, "max": 24.0, "mean": 23.0, "last": 24.0}
+
+def test_falls_back_to_gcs_when_influx_is_down(client, mock_gcs_client, make_sensor_bucket):
+    """Test sensor endpoints serve GCS data while InfluxDB is unreachable, without retrying it every request"""
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        raise httpx.ConnectError("connection refused", request=request)
+
+    backend = make_backend(handler)
+    app.dependency_overrides[get_influx_backend] = lambda: backend
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(3)
+
+    for _ in range(2):
+        response = client.get("/sensor/latest")
+        assert response.status_code == 200
+        assert response.json()["temperature"] == 22.0
+    assert len(attempts) == 1
+
+def test_unexpected_responses_fall_back_to_gcs(client, mock_gcs_client, make_sensor_bucket):
+    """Test malformed InfluxDB payloads raise InfluxUnavailable or fall back to GCS instead of failing the request"""
+    malformed = make_backend(lambda request: httpx.Response(200, json={"results": [{"series": [{"name": "environment"}]}]}))
+    with pytest.raises(InfluxUnavailable):
+        asyncio.run(malformed.history())
+    assert not malformed.available
+
+    missing_column = RecordedInflux({
+        "LIMIT 1": series(["time", "temperature", "humidity", "pressure"], [[JUNE_1_US, 24.0, 55.0, 1001.0]]),
+        "LIMIT 3": series(["time", "temperature"], [[JUNE_1_US, 24.0]]),
+    })
+    app.dependency_overrides[get_influx_backend] = lambda: make_backend(missing_column)
+    mock_gcs_client['client'].bucket.return_value = make_sensor_bucket(3)
+
+    response = client.get("/sensor/history?limit=2")
+    assert response.status_code == 200
+    assert [entry["temperature"] for entry in response.json()] == [22.0, 21.0]
+
+def test_points_missing_a_field_are_dropped():
+    """Test null fields from InfluxDB are left out rather than served as NaN"""
+    columns = ["time", "temperature", "humidity", "pressure"]
+    recorded = RecordedInflux({
+        "LIMIT 1": series(columns, [[JUNE_1_US + HOUR_US, 24.0, None, 1001.0]]),
+        "ORDER BY time DESC": series(columns, [[JUNE_1_US + HOUR_US, 24.0, None, 1001.0], [JUNE_1_US, 22.0, 53.0, 999.0]]),
+        "GROUP BY time": series(
+            ["time", "count"] + [f"{field}_{stat}" for field in ("temperature", "humidity", "pressure")
+                                 for stat in ("min", "max", "mean", "last")],
+            [[JUNE_1_US, 60] + [20.0, 22.0, 21.0, 22.0] * 3, [JUNE_1_US + HOUR_US, 1] + [None] * 4 + [22.0] * 8]
+        ),
+    })
+    backend = make_backend(recorded)
+
+    assert asyncio.run(backend.latest()) is None
+    timestamps, columns = asyncio.run(backend.history())
+    assert timestamps.tolist() == [JUNE_1_US]
+    assert columns["humidity"].tolist() == [53.0]
+    buckets = asyncio.run(backend.aggregate(HOUR_US, JUNE_1_US, JUNE_1_US + 2 * HOUR_US))
+    assert buckets["start"].tolist() == [JUNE_1_US]
+    assert buckets["temperature_min"].tolist() == [20.0]
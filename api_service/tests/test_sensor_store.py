@@ -0,0 +1,88 @@
+import json
+import numpy as np
+from datetime import datetime, timedelta, timezone
+
+from blob_index import BlobIndex
+from models import SensorData
+from sensor_store import SensorSeries, from_epoch_us, to_epoch_us
+
+BASE = datetime(2024, 6, 1, tzinfo=timezone.utc)
+
+def reading(minute, temperature=20.0):
+    return SensorData(
+        temperature=temperature,
+        humidity=50.0,
+        pressure=1000.0,
+        timestamp=BASE + timedelta(minutes=minute)
+    )
+
+def test_epoch_round_trip():
+    """Test epoch microsecond conversion in both directions"""
+    timestamp = datetime(2024, 6, 1, 12, 30, 45, 123456, tzinfo=timezone.utc)
+    assert from_epoch_us(to_epoch_us(timestamp)) == timestamp
+    assert to_epoch_us(timestamp.replace(tzinfo=None)) == to_epoch_us(timestamp)
+
+def test_query_newest_first_with_range_and_limit():
+    """Test range queries return the newest readings in the range first"""
+    series = SensorSeries(initial_capacity=4)
+    series.append(reading(minute, temperature=minute) for minute in range(100))
+
+    timestamps, columns = series.query(
+        start=to_epoch_us(BASE + timedelta(minutes=10)),
+        end=to_epoch_us(BASE + timedelta(minutes=20)),
+        limit=5
+    )
+
+    assert columns["temperature"].tolist() == [19, 18, 17, 16, 15]
+    assert np.all(np.diff(timestamps) < 0)
+
+def test_query_empty_range():
+    """Test a range with no readings returns empty columns"""
+    series = SensorSeries()
+    series.append(reading(minute) for minute in range(10))
+
+    timestamps, columns = series.query(end=to_epoch_us(BASE))
+    assert len(timestamps) == 0
+    assert len(columns["temperature"]) == 0
+
+def test_out_of_order_appends_are_sorted():
+    """Test late readings are merged into time order"""
+    series = SensorSeries()
+    series.append([reading(5, 5), reading(10, 10)])
+    series.append([reading(7, 7), reading(1, 1)])
+
+    _, columns = series.query()
+    assert columns["temperature"].tolist() == [10, 7, 5, 1]
+
+def test_sync_only_downloads_new_blobs(make_sensor_bucket):
+    """Test syncing after the index grows only fetches the new blobs"""
+    bucket = make_sensor_bucket(10)
+    index = BlobIndex("test-bucket", "sensor_data/", suffix=".json")
+    series = SensorSeries()
+
+    index.refresh(bucket)
+    assert series.sync(index, bucket) == 10
+    assert bucket.blob.call_count == 10
+
+    timestamp = BASE + timedelta(minutes=10)
+    bucket.objects[f"sensor_data/{timestamp.strftime('%Y%m%d_%H%M%S')}.json"] = json.dumps({
+        "temperature": 99.0, "humidity": 50.0, "pressure": 1000.0, "timestamp": timestamp.isoformat()
+    }).encode()
+    index.refresh(bucket)
+    assert series.sync(index, bucket) == 1
+    assert bucket.blob.call_count == 11
+    assert len(series) == 11
+
+def test_month_of_minute_readings_queries_quickly():
+    """Test a month of 1-minute readings answers range queries from memory"""
+    import time
+
+    minutes = 31 * 24 * 60
+    series = SensorSeries()
+    timestamps = to_epoch_us(BASE) + np.arange(minutes, dtype=np.int64) * 60_000_000
+    series.append_arrays(timestamps, np.random.default_rng(0).normal(size=(minutes, 3)))
+
+    started = time.perf_counter()
+    for day in range(31):
+        series.query(start=int(timestamps[day * 1440]), end=int(timestamps[min(day * 1440 + 1440, minutes - 1)]), limit=1440)
+    assert (time.perf_counter() - started) / 31 < 0.05
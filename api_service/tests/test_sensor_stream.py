@@ -0,0 +1,83 @@
+import asyncio
+import json
+
+from blob_index import BlobIndex
+from models import SensorData
+from sensor_stream import SensorBroadcaster, poll_latest, sse_events
+
+def reading(temperature):
+    return SensorData(temperature=temperature, humidity=50.0, pressure=1000.0, timestamp="2024-06-01T00:00:00Z")
+
+def test_poll_downloads_only_new_readings(make_sensor_bucket):
+    """Test the poller skips the download while the newest reading is unchanged"""
+    bucket = make_sensor_bucket(3)
+    index = BlobIndex("test-bucket", "sensor_data/", suffix=".json")
+
+    name, data = poll_latest(bucket, index, None)
+    assert name == "sensor_data/20240601_000200.json"
+    assert data.temperature == 22.0
+
+    bucket.blob.reset_mock()
+    assert poll_latest(bucket, index, name) is None
+    bucket.blob.assert_not_called()
+
+def test_subscribers_share_one_poller():
+    """Test every subscriber receives each new reading from a single poll loop"""
+    polls = []
+
+    async def poll(previous):
+        polls.append(previous)
+        return ("sensor_data/a.json", reading(21.0)) if previous is None else None
+
+    async def scenario():
+        broadcaster = SensorBroadcaster(poll, interval_seconds=0.01)
+        queues = [broadcaster.subscribe() for _ in range(50)]
+        updates = await asyncio.gather(*(queue.get() for queue in queues))
+        await asyncio.sleep(0.05)
+        for queue in queues:
+            broadcaster.unsubscribe(queue)
+        stopped_at = len(polls)
+        await asyncio.sleep(0.05)
+        return broadcaster, updates, stopped_at
+
+    broadcaster, updates, stopped_at = asyncio.run(scenario())
+    assert all(name == "sensor_data/a.json" for name, _ in updates)
+    assert broadcaster.published == 1
+    # One poll loop regardless of the number of clients, and none once they have all left
+    assert polls[0] is None and set(polls[1:]) == {"sensor_data/a.json"}
+    assert len(polls) == stopped_at
+    assert broadcaster.subscribers == 0
+
+def test_slow_subscriber_drops_oldest_readings():
+    """Test a full client queue keeps the newest readings instead of blocking the broadcast"""
+    async def scenario():
+        broadcaster = SensorBroadcaster(lambda previous: asyncio.sleep(3600), queue_size=2)
+        queue = broadcaster.subscribe()
+        for i in range(5):
+            broadcaster.publish((f"sensor_data/{i}.json", reading(float(i))))
+        names = [queue.get_nowait()[0] for _ in range(queue.qsize())]
+        broadcaster.unsubscribe(queue)
+        return names
+
+    assert asyncio.run(scenario()) == ["sensor_data/3.json", "sensor_data/4.json"]
+
+def test_events_start_with_latest_and_keep_alive():
+    """Test a new client gets the current reading at once, then keepalives while idle"""
+    async def scenario():
+        broadcaster = SensorBroadcaster(lambda previous: asyncio.sleep(3600))
+        broadcaster.latest = ("sensor_data/a.json", reading(21.0))
+        events = sse_events(broadcaster, keepalive_seconds=0.01)
+        first = await events.__anext__()
+        second = await events.__anext__()
+        broadcaster.publish(("sensor_data/b.json", reading(22.0)))
+        third = await events.__anext__()
+        await events.aclose()
+        return broadcaster, first, second, third
+
+    broadcaster, first, second, third = asyncio.run(scenario())
+    lines = first.splitlines()
+    assert lines[:2] == ["id: sensor_data/a.json", "event: reading"]
+    assert json.loads(lines[2][len("data: "):])["temperature"] == 21.0
+    assert second == ": keepalive\n\n"
+    assert third.startswith("id: sensor_data/b.json\n")
+    assert broadcaster.subscribers == 0
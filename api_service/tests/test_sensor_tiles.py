@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from blob_index import BlobIndex
+from config import get_settings
+from main import get_archive_index, get_async_storage, get_sensor_index, get_sensor_tiles, get_single_flight
+from sensor_aggregate import aggregate
+from sensor_archive import relist_start
+from sensor_store import FIELDS
+from sensor_tiles import DAY_US, HOUR_US, TILE_DTYPE, SensorTiles
+
+MINUTE_US = 60 * 1_000_000
+
+def readings(minutes, start_us=0, every=7):
+    """One reading every ``every`` minutes with varying values"""
+    timestamps = start_us + np.arange(0, minutes, every, dtype=np.int64) * MINUTE_US
+    values = np.column_stack((
+        np.sin(np.arange(len(timestamps))) * 5 + 20,
+        np.arange(len(timestamps), dtype=np.float64) % 17 + 40,
+        np.full(len(timestamps), 1000.0),
+    ))
+    return timestamps, values
+
+def assert_same_buckets(actual, expected):
+    assert actual["start"].tolist() == expected["start"].tolist()
+    assert actual["count"].tolist() == expected["count"].tolist()
+    for key in expected:
+        np.testing.assert_allclose(actual[key], expected[key])
+
+@pytest.mark.parametrize("width_us", [HOUR_US, 6 * HOUR_US, DAY_US, 7 * DAY_US])
+def test_tiles_match_raw_aggregates(width_us):
+    """Test buckets merged from closed and open tiles equal aggregating the readings directly"""
+    timestamps, values = readings(3 * 24 * 60 + 95)
+    tiles = SensorTiles()
+    for chunk in np.array_split(np.arange(len(timestamps)), 5):
+        tiles.add(timestamps[chunk], values[chunk])
+
+    columns = {field: values[:, i] for i, field in enumerate(FIELDS)}
+    assert_same_buckets(tiles.query(width_us), aggregate(timestamps, columns, width_us))
+
+    start, end = DAY_US, 2 * DAY_US + 3 * HOUR_US
+    window = (timestamps >= start) & (timestamps < end)
+    windowed = {field: column[window] for field, column in columns.items()}
+    if width_us <= DAY_US:
+        assert_same_buckets(tiles.query(width_us, start, end), aggregate(timestamps[window], windowed, width_us))
+
+def test_unaligned_queries_are_not_served():
+    """Test bucket widths or bounds that split a tile are left to the raw readings"""
+    tiles = SensorTiles()
+    assert tiles.query(5 * MINUTE_US) is None
+    assert tiles.query(HOUR_US, start_us=HOUR_US + MINUTE_US) is None
+    assert tiles.tile_width(2 * DAY_US, end_us=3 * HOUR_US) == HOUR_US
+
+def test_tiles_persist_and_resume(tmp_path):
+    """Test closed tiles are mapped from disk by a new instance, which resumes after the watermark"""
+    timestamps, values = readings(2 * 24 * 60 + 30)
+    tiles = SensorTiles(str(tmp_path))
+    tiles.add(timestamps[:300], values[:300])
+    watermark = tiles.watermark
+    assert watermark == DAY_US
+
+    reopened = SensorTiles(str(tmp_path))
+    assert isinstance(reopened.files["hour"].tiles, np.memmap)
+    assert reopened.watermark == watermark
+    assert len(reopened.files["hour"]) == len(tiles.files["hour"])
+
+    # Readings from the day watermark on are folded in again; closed hours are not duplicated
+    reopened.add(timestamps, values)
+    columns = {field: values[:, i] for i, field in enumerate(FIELDS)}
+    assert_same_buckets(reopened.query(HOUR_US), aggregate(timestamps, columns, HOUR_US))
+
+def test_torn_append_is_ignored(tmp_path):
+    """Test records written without their header update are not loaded"""
+    timestamps, values = readings(24 * 60 + 30)
+    SensorTiles(str(tmp_path)).add(timestamps, values)
+    path = tmp_path / "sensor_hour.tiles"
+    expected = len(SensorTiles(str(tmp_path)).files["hour"])
+    with open(path, "ab") as f:
+        f.write(np.zeros(3, dtype=TILE_DTYPE).tobytes())
+    assert len(SensorTiles(str(tmp_path)).files["hour"]) == expected
+
+def test_sync_downloads_only_new_blobs(make_sensor_bucket, tmp_path, mocker):
+    """Test syncing folds in every reading once and later syncs fetch only blobs added since"""
+    bucket = make_sensor_bucket(150)
+    sensor_index = BlobIndex("test-bucket", "sensor_data/", suffix=".json")
+    archive_index = BlobIndex("test-bucket", "sensor_archive/", suffix=".npy")
+    sensor_index.refresh(bucket)
+    tiles = SensorTiles(str(tmp_path))
+    assert tiles.sync(bucket, sensor_index, archive_index) == 150
+    assert tiles.query(HOUR_US)["count"].tolist() == [60, 60, 30]
+
+    fetch = mocker.spy(type(bucket.blob("x")), "download_as_string")
+    bucket.objects.update(make_sensor_bucket(152).objects)
+    sensor_index.refresh(bucket)
+    assert tiles.sync(bucket, sensor_index, archive_index) == 2
+    assert fetch.call_count == 2
+    assert tiles.query(HOUR_US)["count"].tolist() == [60, 60, 32]
+
+def test_late_readings_reach_open_tiles(make_sensor_bucket):
+    """Test a reading uploaded after a newer one is still folded into its tile while the grace period lasts"""
+    bucket = make_sensor_bucket(150)
+    late = "sensor_data/20240601_000000.json"
+    raw = bucket.objects.pop(late)
+    sensor_index = BlobIndex("test-bucket", "sensor_data/", suffix=".json", relist_from=relist_start)
+    archive_index = BlobIndex("test-bucket", "sensor_archive/", suffix=".npy")
+    sensor_index.refresh(bucket)
+    tiles = SensorTiles(grace_seconds=2 * 3600)
+    assert tiles.sync(bucket, sensor_index, archive_index) == 149
+    assert tiles.query(HOUR_US)["count"].tolist() == [59, 60, 30]
+
+    bucket.objects[late] = raw
+    sensor_index.refresh(bucket)
+    assert tiles.sync(bucket, sensor_index, archive_index) == 1
+    assert tiles.query(HOUR_US)["count"].tolist() == [60, 60, 30]
+    assert tiles.add(*readings(1)) == 0
+
+def test_new_worker_aggregates_from_tile_files(client, mock_gcs_client, make_sensor_bucket, tmp_path, monkeypatch, mocker):
+    """Test /sensor/aggregate builds tiles once and a fresh worker answers from the files"""
+    monkeypatch.setenv("SENSOR_TILE_DIR", str(tmp_path))
+    get_settings.cache_clear()
+    bucket = make_sensor_bucket(31 * 60)
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    first = client.get("/sensor/aggregate", params={"bucket": "1h"})
+    assert first.status_code == 200
+    assert [bucket["count"] for bucket in first.json()] == [60] * 31
+    assert (tmp_path / "sensor_hour.tiles").exists()
+
+    for cached in (get_sensor_tiles, get_sensor_index, get_archive_index, get_async_storage, get_single_flight):
+        cached.cache_clear()
+    fetch = mocker.spy(type(bucket.blob("x")), "download_as_string")
+    second = client.get("/sensor/aggregate", params={"bucket": "1h"})
+    assert second.json() == first.json()
+    # Only the readings after the daily watermark, which trails the newest by the grace period, are read again
+    assert fetch.call_count == 7 * 60
+    get_settings.cache_clear()
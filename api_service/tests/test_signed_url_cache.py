@@ -0,0 +1,79 @@
+import pytest
+from unittest.mock import MagicMock
+
+from signed_url_cache import SignedUrlCache
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+def test_reuses_url_until_close_to_expiry(clock):
+    """Test cached URLs are reused until they enter the refresh margin"""
+    cache = SignedUrlCache(max_entries=10, min_ttl_seconds=600, clock=clock)
+    sign = MagicMock(side_effect=["url-1", "url-2"])
+    key = ("bucket", "images/a.jpg", 128, None, 60)
+
+    assert cache.get_or_sign(key, 3600, sign) == "url-1"
+    clock.now += 2999
+    assert cache.get_or_sign(key, 3600, sign) == "url-1"
+    clock.now += 1
+    assert cache.get_or_sign(key, 3600, sign) == "url-2"
+
+    assert sign.call_count == 2
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+
+def test_keys_include_transformations(clock):
+    """Test different sizes of the same blob are cached separately"""
+    cache = SignedUrlCache(max_entries=10, min_ttl_seconds=0, clock=clock)
+    cache.put(("bucket", "images/a.jpg", 128, None, 60), "thumb", clock.now + 100)
+    cache.put(("bucket", "images/a.jpg", 1280, None, 85), "full", clock.now + 100)
+
+    assert cache.get(("bucket", "images/a.jpg", 128, None, 60)) == "thumb"
+    assert cache.get(("bucket", "images/a.jpg", 1280, None, 85)) == "full"
+    assert cache.get(("bucket", "images/a.jpg", 640, None, 80)) is None
+
+def test_evicts_least_recently_used(clock):
+    """Test the oldest unused entry is evicted when the cache is full"""
+    cache = SignedUrlCache(max_entries=2, min_ttl_seconds=0, clock=clock)
+    cache.put("a", "url-a", clock.now + 100)
+    cache.put("b", "url-b", clock.now + 100)
+    cache.get("a")
+    cache.put("c", "url-c", clock.now + 100)
+
+    assert cache.get("a") == "url-a"
+    assert cache.get("b") is None
+    assert cache.get("c") == "url-c"
+    assert cache.stats()["evictions"] == 1
+
+def test_evicts_expiring_entries_before_lru(clock):
+    """Test entries close to expiry are dropped before fresh ones"""
+    cache = SignedUrlCache(max_entries=2, min_ttl_seconds=60, clock=clock)
+    cache.put("fresh", "url-fresh", clock.now + 1000)
+    cache.put("expiring", "url-expiring", clock.now + 100)
+    clock.now += 50
+    cache.put("new", "url-new", clock.now + 1000)
+
+    assert cache.get("fresh") == "url-fresh"
+    assert cache.get("new") == "url-new"
+    assert cache.stats()["size"] == 2
+
+def test_generate_signed_url_uses_cache(mocker):
+    """Test generate_signed_url only signs once for repeated requests"""
+    import main
+
+    sign = mocker.patch("main._sign_url", return_value="https://signed")
+
+    first = main.generate_signed_url("test-bucket", "images/a.jpg", width=128, quality=60)
+    second = main.generate_signed_url("test-bucket", "images/a.jpg", width=128, quality=60)
+
+    assert first == second == "https://signed"
+    sign.assert_called_once()
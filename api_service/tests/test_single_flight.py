@@ -0,0 +1,122 @@
+import asyncio
+
+import httpx
+import pytest
+
+import main
+from main import app
+from single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_flight():
+    """Test identical concurrent calls run once and every waiter gets the result or the error"""
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch(value):
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.do("latest", lambda: fetch("a")) for _ in range(5)))
+        assert results == ["a"] * 5
+        failures = await asyncio.gather(
+            *(flights.do("latest", lambda: fetch(ValueError("down"))) for _ in range(3)),
+            return_exceptions=True
+        )
+        assert all(isinstance(failure, ValueError) for failure in failures)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert flights.stats()["coalesced"] == 6
+
+def test_stale_results_are_served_while_revalidating():
+    """Test a result inside the stale window is returned at once while one background call refreshes it"""
+    now = [0.0]
+    flights = SingleFlight(clock=lambda: now[0])
+    versions = iter(range(1, 10))
+
+    async def fetch():
+        await asyncio.sleep(0)
+        return next(versions)
+
+    async def scenario():
+        assert await flights.do("images", fetch, stale_seconds=5) == 1
+        now[0] = 2
+        assert await flights.do("images", fetch, stale_seconds=5) == 1
+        assert await flights.do("images", fetch, stale_seconds=5) == 1
+        await asyncio.sleep(0.01)
+        now[0] = 3
+        assert await flights.do("images", fetch, stale_seconds=5) == 2
+        # Past the window the caller waits, joining the refresh already in flight
+        now[0] = 100
+        assert await flights.do("images", fetch, stale_seconds=5) == 3
+
+    asyncio.run(scenario())
+    assert flights.stats()["stale_served"] == 3
+
+def test_fresh_results_are_reused_without_a_call():
+    """Test a result inside the fresh window is returned without revalidating, and the stale band revalidates once"""
+    now = [0.0]
+    flights = SingleFlight(clock=lambda: now[0])
+    versions = iter(range(1, 10))
+
+    async def fetch():
+        await asyncio.sleep(0)
+        return next(versions)
+
+    async def scenario():
+        for at in (0, 0.5, 1, 1.5):
+            now[0] = at
+            assert await flights.do("latest", fetch, stale_seconds=5, fresh_seconds=2) == 1
+        now[0] = 3
+        assert await flights.do("latest", fetch, stale_seconds=5, fresh_seconds=2) == 1
+        await asyncio.sleep(0.01)
+        for at in (3.5, 4, 4.5):
+            now[0] = at
+            assert await flights.do("latest", fetch, stale_seconds=5, fresh_seconds=2) == 2
+
+    asyncio.run(scenario())
+    stats = flights.stats()
+    assert stats["started"] == 2
+    assert stats["fresh_served"] == 6
+    assert stats["stale_served"] == 1
+
+@pytest.fixture
+def frozen_flights(monkeypatch):
+    """Share GCS calls through a SingleFlight whose clock never moves, so reuse does not depend on timing"""
+    flights = SingleFlight(clock=lambda: 0.0)
+    monkeypatch.setattr(main, "get_single_flight", lambda: flights)
+    return flights
+
+async def _burst(path: str, count: int = 10):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+        return await asyncio.gather(*(client.get(path) for _ in range(count)))
+
+def test_concurrent_requests_list_and_download_once(mock_gcs_client, make_sensor_bucket, frozen_flights):
+    """Test a burst of identical /sensor/latest requests costs one listing and one download"""
+    bucket = make_sensor_bucket(3)
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    responses = asyncio.run(_burst("/sensor/latest"))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.content for response in responses}) == 1
+    assert bucket.list_blobs.call_count == 1
+    assert bucket.blob.call_count == 1
+
+def test_concurrent_history_requests_list_once(mock_gcs_client, make_sensor_bucket, frozen_flights):
+    """Test a burst of /sensor/history requests lists each sensor prefix once and downloads each reading once"""
+    bucket = make_sensor_bucket(3)
+    mock_gcs_client['client'].bucket.return_value = bucket
+
+    responses = asyncio.run(_burst("/sensor/history?limit=10"))
+
+    assert {response.status_code for response in responses} == {200}
+    assert len(responses[0].json()) == 3
+    prefixes = sorted(call.kwargs["prefix"] for call in bucket.list_blobs.call_args_list)
+    assert prefixes == ["sensor_archive/", "sensor_data/"]
+    assert bucket.blob.call_count == 3
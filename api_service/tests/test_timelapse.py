@@ -0,0 +1,108 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+from PIL import Image
+
+import main
+import timelapse
+from image_derivatives import PRESETS, derivative_name, resize_jpeg
+from timelapse import sheet_layout
+
+def make_jpeg(width=640, height=480, shade=128):
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), (shade, shade, shade)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+def add_captures(bucket, count, width=640, height=480):
+    names = []
+    for i in range(count):
+        name = f"images/capture_20250601_{i:02d}0000.jpg"
+        bucket.blob(name).upload_from_string(make_jpeg(width, height, shade=10 * i))
+        names.append(name)
+    return names
+
+def test_sheet_layout_is_roughly_square():
+    """Test sheets tile frames into a near-square grid"""
+    assert sheet_layout(1, 320, 240) == (1, 1)
+    assert sheet_layout(10, 320, 240) == (3, 4)
+    assert sheet_layout(100, 320, 240) == (9, 12)
+    with pytest.raises(ValueError):
+        sheet_layout(timelapse.MAX_SHEET_PIXELS // (320 * 240) + 1, 320, 240)
+
+def test_timelapse_renders_sheet_once(client, memory_backend, mocker):
+    """Test /timelapse tiles the range into one JPEG, stores it and reuses it"""
+    add_captures(memory_backend, 6)
+
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00", "stride": 2, "frame_width": 64})
+    assert response.status_code == 200
+    sheet_info = response.json()
+    assert sheet_info["frames"] == ["2025-06-01T00:00:00", "2025-06-01T02:00:00", "2025-06-01T04:00:00"]
+    assert (sheet_info["columns"], sheet_info["rows"], sheet_info["frame_width"], sheet_info["frame_height"]) == (2, 2, 64, 48)
+    assert "/timelapse/" in sheet_info["url"]
+
+    sheet_name = [blob.name for blob in memory_backend.list_blobs(prefix="timelapse/") if blob.name.endswith(".jpg")]
+    assert len(sheet_name) == 1
+    sheet = Image.open(io.BytesIO(memory_backend.blob(sheet_name[0]).download_as_bytes()))
+    assert sheet.size == (128, 96)
+    # Frames are placed oldest first, left to right
+    assert sheet.getpixel((32, 24))[0] < sheet.getpixel((96, 24))[0]
+
+    render = mocker.patch("timelapse.TimelapseRenderer.render")
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00", "stride": 2, "frame_width": 64})
+    assert response.json() == sheet_info
+    render.assert_not_called()
+
+def test_timelapse_decodes_warm_derivatives(client, memory_backend, mocker):
+    """Test frames are read from a warm derivative at least as wide as the frame"""
+    names = add_captures(memory_backend, 2)
+    small = derivative_name(names[0], PRESETS["small"])
+    memory_backend.blob(small).upload_from_string(resize_jpeg(make_jpeg(), PRESETS["small"]))
+    main.get_derivative_cache().mark([small])
+    fetch = mocker.spy(timelapse, "fetch_blobs")
+
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00", "frame_width": 200})
+    assert response.status_code == 200
+    assert fetch.call_args[0][1] == [small, names[1]]
+
+def test_timelapse_errors(client, memory_backend, monkeypatch):
+    """Test empty ranges are 404, and out-of-range frame widths and sheets over the pixel budget are rejected"""
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00"})
+    assert response.status_code == 404
+
+    add_captures(memory_backend, 2)
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00", "frame_width": 1000})
+    assert response.status_code == 422
+
+    monkeypatch.setattr(timelapse, "MAX_SHEET_PIXELS", 64 * 64)
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00", "frame_width": 64})
+    assert response.status_code == 400
+
+def test_portrait_frames_over_budget_are_rejected(client, memory_backend, monkeypatch):
+    """Test frames taller than wide that overflow the pixel budget once decoded are a 400, not a 500"""
+    add_captures(memory_backend, 2, width=480, height=640)
+    monkeypatch.setattr(timelapse, "MAX_SHEET_PIXELS", 2 * 64 * 64)
+    response = client.get("/timelapse", params={"start": "2025-06-01T00:00:00", "frame_width": 64})
+    assert response.status_code == 400
+
+def test_concurrent_render_serves_the_stored_manifest_and_its_sheet(memory_backend, mocker):
+    """Test a render that loses the race to store its manifest returns the winner's manifest and sheet"""
+    names = add_captures(memory_backend, 2)
+    frames = [(name, datetime(2025, 6, 1, i)) for i, name in enumerate(names)]
+    renderer = timelapse.TimelapseRenderer(main.get_derivative_cache())
+    key = timelapse.timelapse_key(names, 64, 75)
+    render = renderer.render
+
+    def render_while_another_worker_stores(*args):
+        winner = {"sheet": "timelapse/winner.jpg", "columns": 1, "rows": 2, "frame_width": 64, "frame_height": 48,
+                  "frames": ["2025-06-01T00:00:00", "2025-06-01T01:00:00"]}
+        memory_backend.blob("timelapse/winner.jpg").upload_from_string(b"sheet")
+        memory_backend.blob(f"timelapse/{key}.json").upload_from_string(json.dumps(winner).encode())
+        return render(*args)
+
+    mocker.patch.object(renderer, "render", side_effect=render_while_another_worker_stores)
+    sheet_name, manifest = renderer.get_or_render(memory_backend, frames, 64, 75)
+    assert sheet_name == "timelapse/winner.jpg"
+    assert (manifest["columns"], manifest["rows"]) == (1, 2)
+    assert "sheet" not in manifest
@@ -0,0 +1,69 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from config import get_settings
+from main import app, get_image_catalog, get_sensor_index
+from warmup import Readiness, run_warmup
+
+def test_warmup_retries_from_the_failed_step():
+    """Test a failing step is retried without rerunning the steps before it, then the worker is ready"""
+    calls = []
+    failures = [ConnectionError("no metadata server")]
+
+    async def authenticate():
+        calls.append("authenticate")
+
+    async def list_indexes():
+        calls.append("indexes")
+        if failures:
+            raise failures.pop()
+
+    readiness = Readiness()
+    asyncio.run(run_warmup([("authenticate", authenticate), ("indexes", list_indexes)], readiness, retry_seconds=0))
+
+    assert calls == ["authenticate", "indexes", "indexes"]
+    assert readiness.ready
+    stats = readiness.stats()
+    assert stats["attempts"] == 3
+    assert sorted(stats["steps"]) == ["authenticate", "indexes"]
+    assert stats["last_error"] is None
+
+def test_ready_once_indexes_are_listed(memory_backend, monkeypatch):
+    """Test /ready answers 503 until the lifespan warm-up has listed the indexes, then 200"""
+    monkeypatch.setenv("SENSOR_COMPACTION_INTERVAL_SECONDS", "0")
+    monkeypatch.setenv("DERIVATIVE_PREGENERATION_INTERVAL_SECONDS", "0")
+    get_settings.cache_clear()
+    memory_backend.blob("sensor_data/20240601_120000.json").upload_from_string(b"{}")
+    memory_backend.blob("images/capture_20240601_120000.jpg").upload_from_string(b"not a jpeg")
+
+    assert TestClient(app).get("/ready").status_code == 503
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 5
+        response = client.get("/ready")
+        while response.status_code != 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+            response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["ready"] is True
+        assert "selfhydro_ready 1" in client.get("/metrics").text
+        assert "sensor_data/20240601_120000.json" in get_sensor_index()
+        assert "images/capture_20240601_120000.jpg" in get_image_catalog().index
+
+def test_import_defers_cloud_clients():
+    """Test importing the app does not load the google client, auth, requests, httpx, dateutil or PIL"""
+    heavy = ["google.cloud.storage", "google.auth", "requests", "httpx", "dateutil", "PIL"]
+    script = f"import sys, main; print([name for name in {heavy!r} if name in sys.modules])"
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env={**os.environ, "GCS_BUCKET": "test-bucket"},
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,72 @@
+import asyncio
+import threading
+
+import pytest
+
+from worker_pool import PoolSaturated, WorkerPool
+
+def test_run_returns_result():
+    """Test work scheduled on the pool is awaited and counted"""
+    pool = WorkerPool(max_workers=2, max_queue=4)
+    try:
+        assert asyncio.run(pool.run(lambda a, b: a + b, 2, 3)) == 5
+        stats = pool.stats()
+        assert stats["completed"] == 1
+        assert stats["active"] == 0
+        assert stats["queued"] == 0
+    finally:
+        pool.shutdown()
+
+def test_rejects_work_when_queue_is_full():
+    """Test backpressure once every worker is busy and the queue is full"""
+    pool = WorkerPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(5)
+
+    try:
+        running = pool.submit(block)
+        started.wait(5)
+        queued = pool.submit(block)
+        assert pool.stats()["saturation"] == 1.0
+        assert pool.stats()["queued"] == 1
+
+        with pytest.raises(PoolSaturated):
+            pool.submit(block)
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        running.result(5)
+        queued.result(5)
+        pool.shutdown()
+    assert pool.stats()["completed"] == 2
+
+def test_cancelled_work_leaves_the_queue():
+    """Test work cancelled before it starts no longer counts as queued"""
+    pool = WorkerPool(max_workers=1, max_queue=2)
+    release = threading.Event()
+    try:
+        running = pool.submit(release.wait, 5)
+        queued = pool.submit(release.wait, 5)
+        assert queued.cancel()
+        assert pool.stats()["queued"] == 0
+    finally:
+        release.set()
+        running.result(5)
+        pool.shutdown()
+
+def test_saturated_pool_returns_503(client, mocker):
+    """Test endpoints shed load with a 503 and Retry-After when the pool is saturated"""
+    pool = mocker.MagicMock()
+    pool.run.side_effect = PoolSaturated("full")
+    mocker.patch("main.get_worker_pool", return_value=pool)
+
+    response = client.get("/images")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+    response = client.get("/sensor/latest")
+    assert response.status_code == 503
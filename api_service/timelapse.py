@@ -0,0 +1,189 @@
+import hashlib
+import io
+import json
+import logging
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from google.api_core.exceptions import NotFound, PreconditionFailed
+
+from bulk_fetch import fetch_blobs
+from metrics import gcs_operation
+from image_derivatives import PRESETS, DerivativeCache, derivative_name
+
+logger = logging.getLogger(__name__)
+
+TIMELAPSE_PREFIX = "timelapse/"
+# JPEG dimensions are limited to 65535 pixels per side
+MAX_SHEET_SIDE = 65000
+# The decoded sheet is held whole while frames are pasted and it is encoded; 32 megapixels is about 96 MB of RGB
+MAX_SHEET_PIXELS = 32_000_000
+
+class SheetTooLarge(ValueError):
+    """The frames do not fit one sheet; the request should ask for fewer or smaller frames"""
+
+def timelapse_key(blob_names: Sequence[str], frame_width: int, quality: int) -> str:
+    """Stable key for a sheet: the exact frames and rendering parameters"""
+    digest = hashlib.sha256()
+    digest.update(f"{frame_width}:{quality}\n".encode())
+    for name in blob_names:
+        digest.update(name.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()[:24]
+
+def max_frames(frame_width: int) -> int:
+    """
+    Most frames of landscape captures (no taller than wide) that fit one
+    sheet's pixel budget. Taller frames are only known once the first one is
+    decoded, and then ``sheet_layout`` raises ``SheetTooLarge``.
+    """
+    return MAX_SHEET_PIXELS // (frame_width * frame_width)
+
+def sheet_layout(frame_count: int, frame_width: int, frame_height: int) -> Tuple[int, int]:
+    """Columns and rows for a roughly square sheet that fits JPEG's size limit and the pixel budget"""
+    if frame_count * frame_width * frame_height > MAX_SHEET_PIXELS:
+        raise SheetTooLarge("Too many frames for one sheet")
+    columns = max(1, math.ceil(math.sqrt(frame_count * frame_height / frame_width)))
+    columns = min(columns, MAX_SHEET_SIDE // frame_width)
+    rows = math.ceil(frame_count / columns)
+    if rows * frame_height > MAX_SHEET_SIDE:
+        raise SheetTooLarge("Too many frames for one sheet")
+    return columns, rows
+
+class TimelapseRenderer:
+    """
+    Builds time-lapse sprite sheets: every frame of a range tiled into one JPEG.
+
+    Frames are downloaded with a bounded prefetch window and decoded one at
+    a time, straight into the sheet, so only the sheet and a handful of
+    compressed frames are in memory, and the sheet is capped at
+    ``MAX_SHEET_PIXELS``. When a frame's resized derivative is
+    warm and at least as wide as the frame, it is decoded instead of the
+    full capture. Manifests are stored under timelapse/ keyed by frames and
+    parameters, so each sheet is rendered once. Sheets are named by a hash
+    of their bytes and the manifest names its sheet, so two workers
+    rendering the same key at once cannot pair a manifest with the other's
+    sheet: whichever manifest is stored first wins, along with its sheet.
+    """
+
+    def __init__(self, derivative_cache: DerivativeCache, max_in_flight: int = 8, max_manifests: int = 64):
+        self.derivative_cache = derivative_cache
+        self.max_in_flight = max_in_flight
+        self.max_manifests = max_manifests
+        # key -> (sheet name, manifest)
+        self._manifests: "OrderedDict[str, Tuple[str, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _source(self, blob_name: str, frame_width: int) -> str:
+        for variant in sorted(PRESETS.values(), key=lambda v: v.width):
+            name = derivative_name(blob_name, variant)
+            if variant.width >= frame_width and self.derivative_cache.is_known(name):
+                return name
+        return blob_name
+
+    def get_or_render(
+        self,
+        bucket,
+        frames: Sequence[Tuple[str, datetime]],
+        frame_width: int,
+        quality: int
+    ) -> Tuple[str, dict]:
+        """Return the sheet's blob name and manifest, rendering and storing it if it does not exist yet"""
+        key = timelapse_key([name for name, _ in frames], frame_width, quality)
+        manifest_name = f"{TIMELAPSE_PREFIX}{key}.json"
+
+        with self._lock:
+            cached = self._manifests.get(key)
+            if cached is not None:
+                self._manifests.move_to_end(key)
+        if cached is None:
+            try:
+                stored = self._download_manifest(bucket, manifest_name)
+            except NotFound:
+                sheet, manifest = self.render(bucket, frames, frame_width, quality)
+                sheet_name = f"{TIMELAPSE_PREFIX}{key}-{hashlib.sha256(sheet).hexdigest()[:16]}.jpg"
+                # The sheet goes first, so a stored manifest always names a sheet that exists
+                self._upload(bucket, sheet_name, sheet, "image/jpeg")
+                stored = {"sheet": sheet_name, **manifest}
+                if self._upload(bucket, manifest_name, json.dumps(stored).encode(), "application/json"):
+                    logger.info(f"Rendered time-lapse {key} with {len(manifest['frames'])} frames")
+                else:
+                    # Another worker stored its render first; serve that one
+                    stored = self._download_manifest(bucket, manifest_name)
+            # Sheets stored before manifests named them were called <key>.jpg
+            sheet_name = stored.pop("sheet", f"{TIMELAPSE_PREFIX}{key}.jpg")
+            cached = (sheet_name, stored)
+            with self._lock:
+                self._manifests[key] = cached
+                while len(self._manifests) > self.max_manifests:
+                    self._manifests.popitem(last=False)
+        return cached
+
+    def _download_manifest(self, bucket, name: str) -> dict:
+        with gcs_operation("download"):
+            return json.loads(bucket.blob(name).download_as_bytes())
+
+    def render(
+        self,
+        bucket,
+        frames: Sequence[Tuple[str, datetime]],
+        frame_width: int,
+        quality: int
+    ) -> Tuple[bytes, dict]:
+        """Decode frames one by one into a sheet. Frames that cannot be read are left out."""
+        from PIL import Image
+
+        sources = {self._source(name, frame_width): timestamp for name, timestamp in frames}
+        sheet: Optional[Image.Image] = None
+        frame_height = columns = rows = 0
+        placed: List[datetime] = []
+        for source, data in fetch_blobs(bucket, list(sources), bytes, max_in_flight=self.max_in_flight):
+            try:
+                image = Image.open(io.BytesIO(data))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping time-lapse frame {source}: {e}")
+                continue
+            if sheet is None:
+                # Sized from the first readable frame; a sheet over budget fails the whole render
+                frame_height = max(1, round(frame_width * image.height / image.width))
+                columns, rows = sheet_layout(len(sources), frame_width, frame_height)
+                sheet = Image.new("RGB", (columns * frame_width, rows * frame_height))
+            try:
+                image.draft("RGB", (frame_width, frame_height))
+                frame = image.convert("RGB").resize((frame_width, frame_height), Image.BILINEAR)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping time-lapse frame {source}: {e}")
+                continue
+            position = len(placed)
+            sheet.paste(frame, ((position % columns) * frame_width, (position // columns) * frame_height))
+            placed.append(sources[source])
+
+        if sheet is None:
+            raise ValueError("No frames could be read")
+        used_rows = math.ceil(len(placed) / columns)
+        if used_rows < rows:
+            sheet = sheet.crop((0, 0, sheet.width, used_rows * frame_height))
+        buffer = io.BytesIO()
+        sheet.save(buffer, format="JPEG", quality=quality, optimize=True, progressive=True)
+        manifest = {
+            "columns": columns,
+            "rows": used_rows,
+            "frame_width": frame_width,
+            "frame_height": frame_height,
+            "frames": [timestamp.isoformat() for timestamp in placed],
+        }
+        return buffer.getvalue(), manifest
+
+    def _upload(self, bucket, name: str, data: bytes, content_type: str) -> bool:
+        """Create ``name`` unless it exists. Returns whether this call created it."""
+        blob = bucket.blob(name)
+        blob.cache_control = "public, max-age=31536000, immutable"
+        try:
+            with gcs_operation("upload"):
+                blob.upload_from_string(data, content_type=content_type, if_generation_match=0)
+        except PreconditionFailed:
+            return False
+        return True
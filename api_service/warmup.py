@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (step name, coroutine function) run in order by run_warmup
+Step = Tuple[str, Callable[[], Awaitable[object]]]
+
+class Readiness:
+    """
+    Whether this worker has finished warming up, for /ready.
+
+    A worker starts serving as soon as it has imported, but its first
+    requests would otherwise pay for auth discovery, the first storage
+    client and listing every index. Load balancers that wait for /ready
+    only route to it once those are done.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self.started_at = clock()
+        self.ready_at: Optional[float] = None
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        # Seconds each step took on its successful attempt
+        self.steps: Dict[str, float] = {}
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def mark_ready(self):
+        if self.ready_at is None:
+            self.ready_at = self._clock()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": round((self.ready_at if self.ready else self._clock()) - self.started_at, 3),
+            "attempts": self.attempts,
+            "steps": dict(self.steps),
+            "last_error": self.last_error,
+        }
+
+async def run_warmup(
+    steps: Sequence[Step],
+    readiness: Readiness,
+    retry_seconds: float,
+    clock: Callable[[], float] = time.perf_counter
+):
+    """
+    Run ``steps`` in order, then mark the worker ready. A failed step is
+    retried every ``retry_seconds``, carrying on from that step, until all
+    succeed or the task is cancelled.
+    """
+    pending: List[Step] = list(steps)
+    while pending:
+        readiness.attempts += 1
+        name, step = pending[0]
+        started = clock()
+        try:
+            await step()
+        except Exception as e:
+            readiness.last_error = f"{name}: {e}"
+            logger.error(f"Warm-up step {name} failed, retrying in {retry_seconds}s: {e}")
+            await asyncio.sleep(retry_seconds)
+            continue
+        readiness.steps[name] = round(clock() - started, 3)
+        pending.pop(0)
+    readiness.last_error = None
+    readiness.mark_ready()
+    logger.info(f"Worker ready after {readiness.stats()['warmup_seconds']}s: {readiness.steps}")
@@ -0,0 +1,93 @@
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class PoolSaturated(Exception):
+    """Raised when the worker pool's queue is full and new work is refused"""
+
+class WorkerPool:
+    """
+    Thread pool shared by every request for blocking GCS work.
+
+    The pool lives for the application lifespan, so concurrent requests
+    share ``max_workers`` threads instead of each starting their own. Work
+    waiting for a thread counts towards ``max_queue``; once that is reached
+    new work is refused with ``PoolSaturated`` rather than queued without
+    bound.
+    """
+
+    def __init__(self, max_workers: int = 32, max_queue: int = 256, thread_name_prefix: str = "gcs-worker"):
+        if max_workers < 1:
+            raise ValueError("Worker pool needs at least one worker")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._active = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn: Callable[..., T], *args) -> "Future[T]":
+        """Schedule ``fn(*args)`` on the pool, raising PoolSaturated when the queue is full"""
+        with self._lock:
+            queued = self._pending - self._active
+            if queued >= self.max_queue:
+                self._rejected += 1
+                logger.warning(f"Worker pool saturated: {self._active} active, {queued} queued")
+                raise PoolSaturated(f"{queued} tasks already queued")
+            self._pending += 1
+            self._peak_queued = max(self._peak_queued, queued + 1)
+        try:
+            # Carry the caller's context so per-request metrics see work done on its behalf
+            future = self._executor.submit(contextvars.copy_context().run, self._run, fn, *args)
+        except Exception:
+            self._finished(None)
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run ``fn(*args)`` on the pool and await its result"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _run(self, fn: Callable[..., T], *args) -> T:
+        with self._lock:
+            self._active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def _finished(self, future: Optional[Future]):
+        # Also called for work cancelled before it started, so the queue depth stays accurate
+        with self._lock:
+            self._pending -= 1
+            if future is not None and not future.cancelled():
+                self._completed += 1
+
+    def stats(self) -> dict:
+        """Current utilisation: active workers, queue depth and saturation (active / max_workers)"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": self._pending - self._active,
+                "peak_queued": self._peak_queued,
+                "saturation": self._active / self.max_workers,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
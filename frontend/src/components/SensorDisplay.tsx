@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react';
 import { SensorData } from '@/types';
-import { getLatestSensorData, getSensorHistory } from '@/lib/api';
+import { getSensorHistory, subscribeToSensorData } from '@/lib/api';
 import { format } from 'date-fns';
 import {
   AreaChart,
@@ -18,22 +18,25 @@ export default function SensorDisplay() {
   const [error, setError] = useState<string | null>(null);
 
   useEffect(() => {
-    const fetchData = async () => {
-      try {
-        const [current, history] = await Promise.all([
-          getLatestSensorData(),
-          getSensorHistory(24)
-        ]);
-        setCurrentData(current);
+    getSensorHistory(24)
+      .then(history => {
         setHistoricalData(history);
-      } catch {
-        setError('Failed to fetch sensor data');
-      }
-    };
+        if (history.length > 0) {
+          setCurrentData(current => current ?? history[0]);
+        }
+      })
+      .catch(() => setError('Failed to fetch sensor data'));
 
-    fetchData();
-    const interval = setInterval(fetchData, 60000); // Update every minute
-    return () => clearInterval(interval);
+    // New readings are pushed by the API instead of polled
+    return subscribeToSensorData(reading => {
+      setError(null);
+      setCurrentData(reading);
+      setHistoricalData(history =>
+        history.length > 0 && history[0].timestamp === reading.timestamp
+          ? history
+          : [reading, ...history].slice(0, 24)
+      );
+    });
   }, []);
 
   if (error) {
@@ -82,6 +82,22 @@ export const getSensorHistory = async (limit: number = 24): Promise<SensorData[]
   }
 };
 
+// Push new sensor readings as they arrive; returns a function that closes the stream.
+// EventSource reconnects on its own after network errors.
+export const subscribeToSensorData = (
+  onReading: (data: SensorData) => void,
+  onError?: () => void
+): (() => void) => {
+  const source = new EventSource(`${API_BASE_URL}/sensor/stream`);
+  source.addEventListener('reading', (event) => {
+    onReading(JSON.parse((event as MessageEvent).data) as SensorData);
+  });
+  if (onError) {
+    source.onerror = onError;
+  }
+  return () => source.close();
+};
+
 export const getImages = async (limit: number = 24): Promise<ImageData[]> => {
   try {
     const response = await api.get<ImageData[]>(`/images?limit=${limit}`);